@@ -1,16 +1,22 @@
 import logging
 import os
-import asyncio
 import time
 import aiogram.exceptions
 from aiogram import Bot, types, F
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, FSInputFile
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from decimal import Decimal, InvalidOperation
 from typing import Optional, Dict, List, Tuple
 from contests import create_contest_types_keyboard, format_contest_message, get_contest_keyboard
+from backup import create_backup, list_backups
+from media import send_media
+from bet_queue import get_queue_stats
+from presenter import get_presenter_stats
+from digest import get_digest_stats
+from exposure import get_exposure_stats, room as exposure_room
+from middlewares.outbound import BROADCAST, priority
 from datetime import datetime, timedelta
 
 class AdminStates(StatesGroup):
@@ -75,6 +81,7 @@ def get_admin_panel_keyboard() -> InlineKeyboardMarkup:
         [InlineKeyboardButton(text="📨 Рассылка", callback_data="broadcast")],
         [InlineKeyboardButton(text="📢 Каналы подписки", callback_data="admin_sub_channels")],
         [InlineKeyboardButton(text="🏆 Конкурсы", callback_data="admin_contests")],
+        [InlineKeyboardButton(text="💾 Резервные копии", callback_data="admin_backups")],
         [InlineKeyboardButton(text="🧹 Очистить балансы", callback_data="admin_clear_balances")]
     ])
 
@@ -131,6 +138,33 @@ async def show_users(callback_query: types.CallbackQuery):
     await callback_query.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
     await callback_query.answer()
 
+def _format_queue_stats(queue: Dict, presenter: Dict, digest: Dict) -> str:
+    load = " ".join(f"{u * 100:.0f}%" for u in queue['utilization']) or "—"
+    return (
+        f"<blockquote><b>Очередь ставок:</b>\n"
+        f"• В очереди: <code>{queue['depth']}</code> (игроков: <code>{queue['users']}</code>)\n"
+        f"• В обработке: <code>{queue['in_flight']}/{queue['workers']}</code>\n"
+        f"• Загрузка обработчиков: <code>{load}</code>\n"
+        f"• Обработано: <code>{queue['processed']}</code>, ошибок: <code>{queue['failed']}</code>\n"
+        f"• Показ результатов: в очереди <code>{presenter['queued']}</code>, на повторе <code>{presenter['retrying']}</code>\n"
+        f"• Режим сводок: <code>{'включён' if digest['active'] else 'выключен'}</code>, в буфере <code>{digest['buffered']}</code></blockquote>"
+    )
+
+def _format_exposure_stats(exposure: Dict) -> str:
+    if exposure['treasury'] is None:
+        return "<blockquote><b>Риск казны:</b>\n• Баланс казны ещё не получен, действуют лимиты из правил</blockquote>"
+    games = "".join(
+        f"\n• {game}: <code>{value:.2f}$</code>, свободно <code>{exposure_room(game):.2f}$</code>"
+        for game, value in sorted(exposure['games'].items(), key=lambda item: -item[1])
+    )
+    return (
+        f"<blockquote><b>Риск казны:</b>\n"
+        f"• Казна: <code>{exposure['treasury']:.2f}$</code>\n"
+        f"• Худший исход открытых ставок ({exposure['open']}): <code>{exposure['total']:.2f}$</code>\n"
+        f"• Свободно под новые ставки: <code>{exposure['room']:.2f}$</code>"
+        f"{games}</blockquote>"
+    )
+
 async def show_admin_stats(callback_query: types.CallbackQuery):
     if not await is_admin(callback_query.from_user.id):
         await callback_query.answer("Нет доступа", show_alert=True)
@@ -153,7 +187,9 @@ async def show_admin_stats(callback_query: types.CallbackQuery):
         f"• Выиграно: <code>{stats['week_wins']}</code>\n"
         f"• Проиграно: <code>{stats['week_losses']}</code>\n"
         f"• Оборот: <code>{stats['week_turnover']:.2f}$</code>\n"
-        f"• Прибыль: <code>{stats.get('week_profit', 0):.2f}$</code></blockquote>"
+        f"• Прибыль: <code>{stats.get('week_profit', 0):.2f}$</code></blockquote>\n\n"
+        f"{_format_queue_stats(get_queue_stats(), get_presenter_stats(), get_digest_stats())}\n\n"
+        f"{_format_exposure_stats(get_exposure_stats())}"
     )
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="Обновить", callback_data="admin_stats")],
@@ -429,41 +465,43 @@ async def process_broadcast(callback_query: types.CallbackQuery, state: FSMConte
     )
     start_time = time.time()
     successful = failed = blocked = deleted = 0
-    for i, user in enumerate(users, 1):
-        try:
-            if data['message_type'] == "text":
-                await bot.send_message(user['user_id'], data['text'], parse_mode=data['parse_mode'], reply_markup=keyboard)
-            else:
-                method = getattr(bot, f"send_{data['message_type']}")
-                await method(user['user_id'], data['file_id'], caption=data['text'], reply_markup=keyboard)
-            successful += 1
-        except aiogram.exceptions.TelegramForbiddenError:
-            blocked += 1
-        except aiogram.exceptions.TelegramBadRequest as e:
-            if "chat not found" in str(e).lower():
-                deleted += 1
-            else:
-                failed += 1
-        except Exception as e:
-            failed += 1
-            logging.error(f"Ошибка при рассылке пользователю {user['user_id']}: {e}")
-        if i % 20 == 0 or i == total_users:
-            elapsed = int(time.time() - start_time)
-            progress = (i / total_users) * 100
+    # Рассылка идёт с низким приоритетом: темп задаёт планировщик исходящих запросов,
+    # и результаты ставок отправляются без очереди за ней
+    with priority(BROADCAST):
+        for i, user in enumerate(users, 1):
             try:
-                await status_message.edit_text(
-                    f"📨 Рассылка в процессе...\n\n"
-                    f"⏳ Всего: {total_users}\n"
-                    f"✅ Отправлено: {successful}\n"
-                    f"❌ Ошибок: {failed}\n"
-                    f"🚫 Заблокировали: {blocked}\n"
-                    f"🗑 Удалили: {deleted}\n"
-                    f"⏱ Время: {elapsed} сек\n"
-                    f"📊 Прогресс: {progress:.1f}%"
-                )
-            except aiogram.exceptions.TelegramBadRequest:
-                pass
-        await asyncio.sleep(0.05)
+                if data['message_type'] == "text":
+                    await bot.send_message(user['user_id'], data['text'], parse_mode=data['parse_mode'], reply_markup=keyboard)
+                else:
+                    method = getattr(bot, f"send_{data['message_type']}")
+                    await method(user['user_id'], data['file_id'], caption=data['text'], reply_markup=keyboard)
+                successful += 1
+            except aiogram.exceptions.TelegramForbiddenError:
+                blocked += 1
+            except aiogram.exceptions.TelegramBadRequest as e:
+                if "chat not found" in str(e).lower():
+                    deleted += 1
+                else:
+                    failed += 1
+            except Exception as e:
+                failed += 1
+                logging.error(f"Ошибка при рассылке пользователю {user['user_id']}: {e}")
+            if i % 20 == 0 or i == total_users:
+                elapsed = int(time.time() - start_time)
+                progress = (i / total_users) * 100
+                try:
+                    await status_message.edit_text(
+                        f"📨 Рассылка в процессе...\n\n"
+                        f"⏳ Всего: {total_users}\n"
+                        f"✅ Отправлено: {successful}\n"
+                        f"❌ Ошибок: {failed}\n"
+                        f"🚫 Заблокировали: {blocked}\n"
+                        f"🗑 Удалили: {deleted}\n"
+                        f"⏱ Время: {elapsed} сек\n"
+                        f"📊 Прогресс: {progress:.1f}%"
+                    )
+                except aiogram.exceptions.TelegramBadRequest:
+                    pass
     elapsed = int(time.time() - start_time)
     speed = total_users / elapsed if elapsed > 0 else 0
     await status_message.edit_text(
@@ -792,9 +830,9 @@ async def admin_create_contest_top_limit_btn(callback_query: types.CallbackQuery
     )
     await db.update_contest_settings(contest_id, {"top_limit": top_limit})
     BETS_ID = int(os.getenv("BETS_ID", "-1002403460000"))
-    msg = await bot.send_photo(
+    msg = await send_media(
+        bot.send_photo, "depov.jpg", "photo",
         chat_id=BETS_ID,
-        photo=FSInputFile("depov.jpg"),
         caption=await format_contest_message(db, {
             'id': contest_id,
             'type': contest_type,
@@ -904,6 +942,53 @@ async def admin_delete_contest(callback_query: types.CallbackQuery):
     await callback_query.answer("Конкурс удалён!", show_alert=True)
     await admin_active_contests(callback_query)
 
+def _backups_keyboard() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="▶️ Создать копию", callback_data="admin_backup_now")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_admin")]
+    ])
+
+def _format_backups_list() -> str:
+    backups = list_backups()
+    if not backups:
+        return "Копий пока нет"
+    return "\n".join(
+        f"• <code>{os.path.basename(path)}</code> — {os.path.getsize(path) / 1024 / 1024:.2f} МБ"
+        for path in backups[:10]
+    )
+
+async def admin_backups(callback_query: types.CallbackQuery):
+    if not await is_admin(callback_query.from_user.id):
+        await callback_query.answer("Нет доступа", show_alert=True)
+        return
+    text = "<b>💾 Резервные копии</b>\n\n" + _format_backups_list()
+    try:
+        await callback_query.message.edit_text(text, reply_markup=_backups_keyboard(), parse_mode="HTML")
+    except Exception:
+        pass
+    await callback_query.answer()
+
+async def admin_backup_now(callback_query: types.CallbackQuery):
+    if not await is_admin(callback_query.from_user.id):
+        await callback_query.answer("Нет доступа", show_alert=True)
+        return
+    await callback_query.answer("Создаю копию...")
+    try:
+        result = await create_backup()
+        status = (
+            f"✅ Копия создана: <code>{os.path.basename(result['path'])}</code>\n"
+            f"Размер: <code>{result['size'] / 1024 / 1024:.2f} МБ</code>, "
+            f"время: <code>{result['duration']:.1f}с</code>, проверка: <code>{result['integrity']}</code>"
+        )
+    except Exception as e:
+        logging.error(f"[BACKUP] Ошибка создания копии из админки: {e}", exc_info=True)
+        status = f"❌ Ошибка создания копии: {e}"
+    text = f"<b>💾 Резервные копии</b>\n\n{status}\n\n" + _format_backups_list()
+    try:
+        await callback_query.message.edit_text(text, reply_markup=_backups_keyboard(), parse_mode="HTML")
+    except Exception:
+        pass
+
 def setup_handlers():
     dp.message.register(cmd_admin, Command("admin"))
     dp.callback_query.register(show_users, F.data == "admin_users")
@@ -941,6 +1026,8 @@ def setup_handlers():
     dp.callback_query.register(admin_clear_balances_confirm, F.data == "admin_clear_balances")
     dp.callback_query.register(admin_clear_balances_do, F.data == "admin_clear_balances_confirmed")
     dp.callback_query.register(show_admin_contests, F.data == "admin_contests")
+    dp.callback_query.register(admin_backups, F.data == "admin_backups")
+    dp.callback_query.register(admin_backup_now, F.data == "admin_backup_now")
     dp.callback_query.register(admin_create_contest_start, F.data == "admin_create_contest")
     dp.callback_query.register(admin_create_contest_type, F.data.startswith("contest_type_"), ContestAdminStates.CREATE_TYPE)
     dp.callback_query.register(admin_create_contest_duration, F.data.startswith("contest_duration_"), ContestAdminStates.CREATE_DURATION)
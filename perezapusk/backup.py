@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Эти переменные будут установлены при инициализации
+DB_PATH: Optional[str] = None
+BACKUP_DIR = "backups"
+BACKUP_KEEP = 10
+BACKUP_INTERVAL_HOURS = 6.0
+COPY_TIMEOUT = 120.0
+COPY_ATTEMPTS = 3
+RETRY_PAUSE = 2.0
+
+_lock = asyncio.Lock()
+
+
+def init_backups(db_path: str, backup_dir: str, keep: int, interval_hours: float,
+                 copy_timeout: float = 120.0, copy_attempts: int = 3):
+    """Инициализация модуля резервного копирования"""
+    global DB_PATH, BACKUP_DIR, BACKUP_KEEP, BACKUP_INTERVAL_HOURS, COPY_TIMEOUT, COPY_ATTEMPTS
+    DB_PATH = db_path
+    BACKUP_DIR = backup_dir
+    BACKUP_KEEP = keep
+    BACKUP_INTERVAL_HOURS = interval_hours
+    COPY_TIMEOUT = copy_timeout
+    COPY_ATTEMPTS = max(1, copy_attempts)
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    logging.info(f"[BACKUP] Модуль резервного копирования инициализирован: {BACKUP_DIR}")
+
+
+def _copy_database(src_path: str, dst_path: str):
+    # Копия снимается за один шаг: БД в режиме журнала отката, и пошаговое
+    # копирование начиналось бы заново после каждой записи ставки. Запись
+    # ждёт окончания копирования — для базы бота это доли секунды
+    src = sqlite3.connect(src_path, timeout=30)
+    dst = sqlite3.connect(dst_path)
+    try:
+        src.backup(dst, pages=-1)
+    finally:
+        dst.close()
+        src.close()
+
+
+def _integrity_check(path: str) -> str:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _remove(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+async def _copy_with_retries(src_path: str, dst_path: str):
+    for attempt in range(1, COPY_ATTEMPTS + 1):
+        task = asyncio.ensure_future(asyncio.to_thread(_copy_database, src_path, dst_path))
+        try:
+            await asyncio.wait_for(asyncio.shield(task), COPY_TIMEOUT)
+            return
+        except asyncio.TimeoutError:
+            # Поток копирования не прервать: недописанный файл удаляется, когда он завершится
+            task.add_done_callback(lambda _: _remove(dst_path))
+            raise RuntimeError(f"копирование не завершилось за {COPY_TIMEOUT:.0f}с")
+        except sqlite3.OperationalError as e:
+            _remove(dst_path)
+            if attempt == COPY_ATTEMPTS:
+                raise RuntimeError(f"копирование не удалось за {COPY_ATTEMPTS} попыток: {e}")
+            logging.warning(f"[BACKUP] Попытка {attempt} не удалась: {e}, повтор через {RETRY_PAUSE:.0f}с")
+            await asyncio.sleep(RETRY_PAUSE)
+
+
+def list_backups() -> List[str]:
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    names = [n for n in os.listdir(BACKUP_DIR) if n.startswith("database-") and n.endswith(".db")]
+    return [os.path.join(BACKUP_DIR, n) for n in sorted(names, reverse=True)]
+
+
+def _apply_retention():
+    for path in list_backups()[BACKUP_KEEP:]:
+        try:
+            os.remove(path)
+            logging.info(f"[BACKUP] Удалена старая копия {path}")
+        except OSError as e:
+            logging.error(f"[BACKUP] Не удалось удалить {path}: {e}")
+
+
+async def create_backup() -> Dict:
+    if not DB_PATH:
+        raise RuntimeError("Модуль резервного копирования не инициализирован")
+    async with _lock:
+        name = f"database-{datetime.now().strftime('%Y%m%d-%H%M%S')}.db"
+        path = os.path.join(BACKUP_DIR, name)
+        partial = path + ".partial"
+        started = time.monotonic()
+        try:
+            await _copy_with_retries(DB_PATH, partial)
+            integrity = await asyncio.to_thread(_integrity_check, partial)
+            if integrity != "ok":
+                raise RuntimeError(f"integrity_check: {integrity}")
+            os.replace(partial, path)
+        except Exception:
+            _remove(partial)
+            raise
+        _apply_retention()
+        result = {
+            'path': path,
+            'size': os.path.getsize(path),
+            'duration': time.monotonic() - started,
+            'integrity': integrity
+        }
+        logging.info(f"[BACKUP] Создана копия {path} ({result['size']} байт, {result['duration']:.1f}с)")
+        return result
+
+
+async def backup_schedule():
+    """Цикл создания резервных копий по расписанию"""
+    if not DB_PATH or BACKUP_INTERVAL_HOURS <= 0:
+        logging.info("[BACKUP] Расписание резервного копирования отключено")
+        return
+    logging.info(f"[BACKUP] Запущено резервное копирование каждые {BACKUP_INTERVAL_HOURS}ч")
+    while True:
+        await asyncio.sleep(BACKUP_INTERVAL_HOURS * 3600)
+        try:
+            await create_backup()
+        except Exception as e:
+            logging.error(f"[BACKUP] Ошибка резервного копирования: {e}", exc_info=True)
@@ -0,0 +1,62 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class BetSpec:
+    """Ставка из game_rules.json: id, название, подпись кнопки, число бросков;
+    у авторских игр и КНБ — эмодзи, у авторских — коэффициент и шанс."""
+    __slots__ = ("game", "bet", "name", "dice", "label", "emoji", "coef", "chance")
+
+    def __init__(self, game: str, bet: str, name: str, dice: int = 1, label: Optional[str] = None,
+                 emoji: Optional[str] = None, coef: Optional[int] = None, chance: Optional[float] = None):
+        self.game = game
+        self.bet = bet
+        self.name = name
+        self.dice = dice
+        self.label = label or name[:1].upper() + name[1:]
+        self.emoji = emoji
+        self.coef = coef
+        self.chance = chance
+
+    def __repr__(self):
+        return f"BetSpec({self.game!r}, {self.bet!r})"
+
+
+def normalize(text: str) -> str:
+    """Нижний регистр, ё -> е, без пробелов."""
+    return "".join(text.lower().replace("ё", "е").split())
+
+
+class AliasIndex:
+    """Поиск ставки по id или синониму — в меню (игра известна) и в комментарии к переводу."""
+
+    def __init__(self, specs: Iterable[Tuple[BetSpec, Tuple[str, ...]]], game_names: Dict[str, str],
+                 comment_games: Iterable[str]):
+        self.game_names = game_names
+        self._by_game: Dict[Tuple[str, str], BetSpec] = {}
+        self._by_comment: Dict[str, BetSpec] = {}
+        for spec, aliases in specs:
+            for alias in (spec.bet,) + tuple(aliases):
+                self._by_game[(spec.game, normalize(alias))] = spec
+        # В комментарии игра не указана: синоним, общий для нескольких игр,
+        # достаётся игре, где он является id ставки, иначе — первой по списку
+        comment_games = set(comment_games)
+        for primary in (True, False):
+            for (game, alias), spec in self._by_game.items():
+                if game in comment_games and (alias == spec.bet) == primary:
+                    self._by_comment.setdefault(alias, spec)
+
+    def lookup(self, game: str, bet_type: Optional[str]) -> Optional[BetSpec]:
+        """Ставка игры game по id или синониму."""
+        if not bet_type:
+            return None
+        return self._by_game.get((game, normalize(bet_type)))
+
+    def parse_comment(self, comment: str) -> Optional[BetSpec]:
+        """Игра и ставка по комментарию к переводу."""
+        return self._by_comment.get(normalize(comment))
+
+    def display_names(self, game: Optional[str], bet_type: Optional[str]) -> Tuple[str, Optional[str]]:
+        if not game:
+            return "—", bet_type
+        spec = self.lookup(game, bet_type)
+        return self.game_names.get(game, str(game).lower()), spec.name if spec else bet_type
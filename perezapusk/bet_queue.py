@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+# Эти переменные будут установлены при инициализации
+WORKERS = 4
+OWNER = "local"
+LEASE_SECONDS = 60.0
+_handler: Optional[Callable[[Dict], Awaitable[None]]] = None
+_db = None
+
+# Ставки каждого игрока лежат в своей очереди; в _ready попадает id игрока,
+# а не ставка, и игрок находится там не более одного раза — так ставки
+# одного игрока идут строго по порядку, а разных игроков — параллельно
+_users: Dict[int, Deque[Dict]] = {}
+_ready: Optional[asyncio.Queue] = None
+_known: Set[int] = set()
+_lost: Set[int] = set()
+_tasks: List[asyncio.Task] = []
+_stats: List[Dict] = []
+_started_at = 0.0
+
+
+def init_bet_queue(handler: Callable[[Dict], Awaitable[None]], workers: int = 4,
+                   db=None, owner: str = "local", lease_seconds: float = 60.0):
+    """Инициализация пула обработчиков ставок"""
+    global WORKERS, OWNER, LEASE_SECONDS, _handler, _db, _ready, _started_at
+    WORKERS = max(1, workers)
+    OWNER = owner
+    LEASE_SECONDS = lease_seconds
+    _handler = handler
+    _db = db
+    _ready = asyncio.Queue()
+    _started_at = time.monotonic()
+    logging.info(f"[BET_QUEUE] Пул обработчиков ставок: {WORKERS}, владелец аренды: {OWNER}")
+
+
+def submit(wager: Dict) -> bool:
+    """Ставит ставку в очередь игрока; повторная постановка игнорируется."""
+    wager_id = wager['id']
+    if wager_id in _known:
+        return False
+    _known.add(wager_id)
+    _lost.discard(wager_id)
+    user_id = wager['user_id']
+    pending = _users.get(user_id)
+    if pending is None:
+        _users[user_id] = deque([wager])
+        _ready.put_nowait(user_id)
+    else:
+        pending.append(wager)
+    return True
+
+
+def start_workers():
+    for index in range(WORKERS):
+        _stats.append({'busy': 0.0, 'processed': 0, 'failed': 0, 'current': None})
+        _tasks.append(asyncio.create_task(_worker(index)))
+
+
+async def _worker(index: int):
+    stats = _stats[index]
+    while True:
+        user_id = await _ready.get()
+        pending = _users[user_id]
+        wager = pending.popleft()
+        if wager['id'] in _lost:
+            # Аренду перехватил другой процесс, пока ставка ждала в очереди
+            _lost.discard(wager['id'])
+            _known.discard(wager['id'])
+            if pending:
+                _ready.put_nowait(user_id)
+            else:
+                del _users[user_id]
+            continue
+        stats['current'] = wager['id']
+        started = time.monotonic()
+        try:
+            await _handler(wager)
+            stats['processed'] += 1
+        except Exception as e:
+            stats['failed'] += 1
+            logging.error(f"[BET_QUEUE] Обработчик {index}: ошибка ставки {wager['id']}: {e}", exc_info=True)
+        finally:
+            stats['busy'] += time.monotonic() - started
+            stats['current'] = None
+            _known.discard(wager['id'])
+            if pending:
+                _ready.put_nowait(user_id)
+            else:
+                del _users[user_id]
+
+
+async def lease_loop():
+    """Продлевает аренду своих ставок и забирает брошенные: без аренды, с истёкшей арендой
+    и, при первом проходе, оставшиеся от прошлого запуска этого же владельца."""
+    reclaim_own = True
+    while True:
+        try:
+            lost = await _db.renew_wager_leases(OWNER, list(_known), LEASE_SECONDS)
+            if lost:
+                logging.warning(f"[BET_QUEUE] Потеряна аренда ставок: {lost}")
+                _lost.update(lost)
+            # Ставки в очереди этого процесса не забираются повторно: иначе при первом
+            # проходе свои живые ставки получили бы лишнюю попытку
+            claimed = await _db.claim_wagers(OWNER, LEASE_SECONDS, include_own=reclaim_own, exclude=list(_known))
+            reclaim_own = False
+            for wager in claimed:
+                submit(wager)
+            if claimed:
+                logging.info(f"[BET_QUEUE] Забрано ставок из базы: {len(claimed)}")
+        except Exception as e:
+            logging.error(f"[BET_QUEUE] Ошибка продления аренды: {e}", exc_info=True)
+        await asyncio.sleep(LEASE_SECONDS / 3)
+
+
+def get_queue_stats() -> Dict:
+    uptime = max(time.monotonic() - _started_at, 1e-9)
+    in_flight = sum(1 for s in _stats if s['current'] is not None)
+    return {
+        'workers': WORKERS,
+        'depth': sum(len(q) for q in _users.values()),
+        'in_flight': in_flight,
+        'users': len(_users),
+        'utilization': [min(s['busy'] / uptime, 1.0) for s in _stats],
+        'processed': sum(s['processed'] for s in _stats),
+        'failed': sum(s['failed'] for s in _stats),
+    }
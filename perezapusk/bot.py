@@ -4,8 +4,10 @@ import asyncio
 import re
 import random
 import time
+import socket
 import uuid
 import math
+from functools import lru_cache
 from decimal import Decimal
 from typing import Optional, Dict, Tuple
 from sqlite3 import IntegrityError
@@ -28,12 +30,13 @@ from database import (
     CheckNotFoundError,
     CheckPermissionError
 )
-from games import (
-    CubeGame, GameResult, TwoDiceGame, RockPaperScissorsGame,
-    BasketballGame, DartsGame, SlotsGame, BowlingGame, CustomEmojiGame, FootballGame
-)
+from money import Money, ZERO
+from games import create_game
 from cryptopay import CryptoPayAPI
 from middlewares.subscription import SubscriptionMiddleware
+from middlewares.outbound import OutboundScheduler, BET_RESULT, priority
+from middlewares.chat_cache import ChatCacheMiddleware
+from chat_cache import init_chat_cache, get_chat_info
 from contests import (
     init_contests,
     check_contests_schedule,
@@ -42,6 +45,19 @@ from contests import (
     format_contest_message,
     get_contest_keyboard
 )
+from backup import init_backups, backup_schedule
+from bet_queue import init_bet_queue, start_workers, lease_loop, submit as submit_bet
+from presenter import init_presenter, present
+from media import init_media, send_media
+from templates import render
+from payouts import REFERRAL_SHARE
+from rules import MAX_LEGS, MULTI_SEPARATOR, init_rules, rules_loop, current as current_rules, for_version as rules_for_version
+from channels import init_channels, channel_for, channel_url
+from digest import init_digest, digest_loop, is_active as digest_active, add as add_to_digest
+import fairness
+import exposure
+from exposure import init_exposure, exposure_loop
+from fairness import init_fairness, load_secret, draw as fair_draw
 import admin
 
 swap_assets = ["USDT"]
@@ -90,6 +106,16 @@ CASINO_EMOJI = os.getenv('CASINO_EMOJI', '🎲')
 INVOICE_URL = os.getenv('INVOICE_URL', "https://t.me/vemorr")
 LOGS_ID = int(os.getenv('LOGS_ID', '-1002361786257'))
 BETS_ID = int(os.getenv('BETS_ID', '-1002403460000'))
+BETS_URL = os.getenv('BETS_URL', "https://t.me/+MglBkaT0amdlZGRi")
+BETS_IDS = [int(x) for x in os.getenv('BETS_IDS', '').split(',') if x.strip()] or [BETS_ID]
+BETS_URLS = [x.strip() for x in os.getenv('BETS_URLS', '').split(',') if x.strip()]
+# игра:канал[:ссылка] — ссылка после второго двоеточия, сама может содержать двоеточия
+BETS_GAME_CHANNELS = {
+    game.strip(): (int(channel), url.strip() or None)
+    for game, channel, url in (
+        (pair.split(':', 2) + [''])[:3] for pair in os.getenv('BETS_GAME_CHANNELS', '').split(',') if ':' in pair
+    )
+}
 
 SUPPORT_LINK = os.getenv('SUPPORT_LINK', "https://t.me/vemorr")
 ADAPTER_LINK = os.getenv('ADAPTER_LINK', "https://t.me/vemorr")
@@ -97,6 +123,30 @@ RULES_LINK = os.getenv('RULES_LINK', "https://t.me/vemorr")
 CHAT_LINK = os.getenv('CHAT_LINK', "https://t.me/+lOmGQ05okK5hMzli")
 TUTORIAL_LINK = os.getenv('TUTORIAL_LINK', "https://t.me/vemorr")
 NEWS_LINK = os.getenv('NEWS_LINK', "https://t.me/+ObCMDgP2L4BhMDBi")
+BACKUP_DIR = os.getenv('BACKUP_DIR', 'backups')
+BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', '10'))
+BACKUP_INTERVAL_HOURS = float(os.getenv('BACKUP_INTERVAL_HOURS', '6'))
+BET_WORKERS = int(os.getenv('BET_WORKERS', '4'))
+BOT_INSTANCE_ID = os.getenv('BOT_INSTANCE_ID') or socket.gethostname()
+BET_LEASE_SECONDS = float(os.getenv('BET_LEASE_SECONDS', '60'))
+BET_MAX_ATTEMPTS = int(os.getenv('BET_MAX_ATTEMPTS', '3'))
+OUTBOUND_GLOBAL_RATE = float(os.getenv('OUTBOUND_GLOBAL_RATE', '30'))
+OUTBOUND_GROUP_PER_MINUTE = float(os.getenv('OUTBOUND_GROUP_PER_MINUTE', '20'))
+CHAT_CACHE_TTL = float(os.getenv('CHAT_CACHE_TTL', '600'))
+DIGEST_ENTER_DEPTH = int(os.getenv('DIGEST_ENTER_DEPTH', '20'))
+DIGEST_EXIT_DEPTH = int(os.getenv('DIGEST_EXIT_DEPTH', '5'))
+DIGEST_FLUSH_SECONDS = float(os.getenv('DIGEST_FLUSH_SECONDS', '5'))
+FAIR_SECRET = os.getenv('FAIR_SECRET')
+FAIR_SECRET_FILE = os.getenv('FAIR_SECRET_FILE', 'fair_secret.key')
+FAIR_REVEAL_DELAY = float(os.getenv('FAIR_REVEAL_DELAY', '60'))
+GAME_RULES_PATH = os.getenv('GAME_RULES_PATH', 'game_rules.json')
+RULES_RELOAD_SECONDS = float(os.getenv('RULES_RELOAD_SECONDS', '10'))
+EXPOSURE_TREASURY_SHARE = float(os.getenv('EXPOSURE_TREASURY_SHARE', '0.5'))
+EXPOSURE_GAME_SHARE = float(os.getenv('EXPOSURE_GAME_SHARE', '0.25'))
+EXPOSURE_REFRESH_SECONDS = float(os.getenv('EXPOSURE_REFRESH_SECONDS', '30'))
+AUTO_BET_ROUNDS = [int(x) for x in os.getenv('AUTO_BET_ROUNDS', '10,25,50,100').split(',') if x.strip()]
+# Стоп-лосс и тейк-профит автоставки — в ставках раунда, 0 — без ограничения
+AUTO_BET_LIMITS = (0, 5, 10, 25)
 REFERRALS_PER_PAGE = 20
 INVALID_AMOUNT_FORMAT_MSG = "❌ Неверный формат суммы\nПример: 5.50"
 
@@ -117,16 +167,20 @@ def sanitize_nickname(text: str) -> str:
     sanitized = re.sub(r'[\[\]{}<>|\\/"\'`~$%^&*()=+]', '', text)
     return sanitized.strip()
 
-async def links():
-    return (
-        f'<blockquote>'
-        f'<b><a href="{TUTORIAL_LINK}">Как сделать ставку</a></b> • '
-        f'<b><a href="{CHAT_LINK}">Наш чат</a></b> • '
-        f'<b><a href="{RULES_LINK}">Пользовательское соглашение</a></b> • '
-        f'<b><a href="{SUPPORT_LINK}">Поддержка</a></b> • '
-        f'<b><a href="https://t.me/CasinoDepovBot">Бот</a></b>'
-        f'</blockquote>'
-    )
+LINKS = (
+    f'<blockquote>'
+    f'<b><a href="{TUTORIAL_LINK}">Как сделать ставку</a></b> • '
+    f'<b><a href="{CHAT_LINK}">Наш чат</a></b> • '
+    f'<b><a href="{RULES_LINK}">Пользовательское соглашение</a></b> • '
+    f'<b><a href="{SUPPORT_LINK}">Поддержка</a></b> • '
+    f'<b><a href="https://t.me/CasinoDepovBot">Бот</a></b>'
+    f'</blockquote>'
+)
+
+# Разметка клавиатур неизменяема, поэтому один и тот же объект отдаётся всем вызовам
+BET_CHANNEL_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="⚡️ Сделать ставку", url=INVOICE_URL)]
+])
 
 MAIN_MENU_BUTTONS = [
     "🎲 Сделать ставку",
@@ -136,6 +190,7 @@ MAIN_MENU_BUTTONS = [
     "👤 Профиль"
 ]
 
+@lru_cache(maxsize=None)
 def create_main_keyboard():
     return ReplyKeyboardMarkup(
         keyboard=[
@@ -148,22 +203,37 @@ def create_main_keyboard():
     )
 
 def create_games_keyboard() -> InlineKeyboardMarkup:
+    return _games_keyboard(current_rules())
+
+# Клавиатуры строятся по правилам игр и кэшируются до их смены
+@lru_cache(maxsize=4)
+def _games_keyboard(rules) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="🎲", callback_data="game_cube"),
-            InlineKeyboardButton(text="🎲🎲", callback_data="game_two_dice"),
-            InlineKeyboardButton(text="🏀", callback_data="game_basketball"),
-            InlineKeyboardButton(text="🎯", callback_data="game_darts")
-        ],
-        [
-            InlineKeyboardButton(text="🎳", callback_data="game_bowling"),
-            InlineKeyboardButton(text="🎰", callback_data="game_slots"),
-            InlineKeyboardButton(text="⚽", callback_data="game_football"),
-            InlineKeyboardButton(text="👊✌️🖐", callback_data="game_rock_paper_scissors")
-        ],
-        [InlineKeyboardButton(text="✨ Авторские игры", callback_data="game_custom")]
+        [InlineKeyboardButton(text=rules.games[game].button, callback_data=f"game_{game}") for game in row]
+        for row in rules.menu
     ])
 
+@lru_cache(maxsize=64)
+def _bet_type_keyboard(rules, game_type: str) -> InlineKeyboardMarkup:
+    keyboard_buttons = [
+        [InlineKeyboardButton(text=spec.label, callback_data=f"bet_{spec.bet}") for spec in row]
+        for row in rules.bet_rows(game_type)
+    ]
+    if rules.games[game_type].multi and len(rules.games[game_type].bets) > 1:
+        keyboard_buttons.append([InlineKeyboardButton(text="🧩 Несколько исходов", callback_data="multi_start")])
+    keyboard_buttons.append([InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_games")])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+
+def _multi_bet_keyboard(rules, game_type: str, selected: list) -> InlineKeyboardMarkup:
+    keyboard_buttons = [
+        [InlineKeyboardButton(text=("✅ " if spec.bet in selected else "") + spec.label, callback_data=f"mbet_{spec.bet}")
+         for spec in row]
+        for row in rules.bet_rows(game_type)
+    ]
+    keyboard_buttons.append([InlineKeyboardButton(text=f"✔️ Готово ({len(selected)})", callback_data="mbet_done")])
+    keyboard_buttons.append([InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_bet_type")])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+
 async def send_check_created_message(message: types.Message, text: str, check_id: str):
     bot_username = await get_bot_username()
     check_link = f"https://t.me/{bot_username}?start=check_{check_id}"
@@ -214,7 +284,7 @@ async def show_profile_logic(chat_id: int, user_id: int, state: FSMContext):
     await state.clear()
     user = await db.get_user(user_id)
     if not user:
-        user_info = await bot.get_chat(user_id)
+        user_info = await get_chat_info(user_id)
         username = user_info.username or user_info.full_name
         await db.create_user(user_id, username, user_info.full_name)
         user = await db.get_user(user_id)
@@ -223,9 +293,9 @@ async def show_profile_logic(chat_id: int, user_id: int, state: FSMContext):
         [InlineKeyboardButton(text="🏆 Топ", callback_data="leaderboard_turnover_all")],
         [InlineKeyboardButton(text="🎁 Бонус", callback_data="bonus_program")]
     ])
-    await bot.send_video(
+    await send_media(
+        bot.send_video, "profile.mp4",
         chat_id=chat_id,
-        video=types.FSInputFile("profile.mp4"),
         caption=(
             f"👤 <b>Профиль</b>\n\n"
             f"💰 <b>Баланс:</b> <code>{user['balance']:.2f}$</code>\n\n"
@@ -396,8 +466,8 @@ async def show_wallet(message: types.Message, state: FSMContext):
         [InlineKeyboardButton(text="💰 Пополнить", callback_data="deposit")],
         [InlineKeyboardButton(text="💸 Вывести", callback_data="withdraw")]
     ])
-    await message.answer_video(
-        video=types.FSInputFile("wallet.mp4"),
+    await send_media(
+        message.answer_video, "wallet.mp4",
         caption=(
             f"💰 <b>Кошелек</b>\n\n"
             f"💵 <b>Ваш баланс:</b> <code>{balance:.2f}$</code>{extra}\n\n"
@@ -573,8 +643,8 @@ async def cmd_start(message: types.Message, state: FSMContext):
         f"Испытайте свою удачу и сорвите джекпот!</b></blockquote>"
     )
 
-    await message.answer_video(
-        video=types.FSInputFile("menu.mp4"),
+    await send_media(
+        message.answer_video, "menu.mp4",
         caption=welcome_text,
         reply_markup=create_main_keyboard(),
         parse_mode="HTML"
@@ -656,8 +726,8 @@ async def show_checks_menu(message: types.Message, state: FSMContext):
         [InlineKeyboardButton(text="⚙️ Управление чеками", callback_data="manage_checks_list_0")],
         [InlineKeyboardButton(text="📤 Создать из чата", switch_inline_query="")]
     ])
-    await message.answer_video(
-        video=types.FSInputFile("checks.mp4"),
+    await send_media(
+        message.answer_video, "checks.mp4",
         caption=(
             "🧾 <b>Чеки</b>\n\n"
             "Создавайте чеки и делитесь ими с другими пользователями!\n\n"
@@ -754,7 +824,7 @@ async def create_check_start(callback_query: types.CallbackQuery):
 async def start_public_check(callback_query: types.CallbackQuery, state: FSMContext):
     user = await db.get_user(callback_query.from_user.id)
     balance = user['balance'] if user and 'balance' in user else Decimal('0')
-    bonus_locked = Decimal(str(user.get('bonus_balance', Decimal('0'))))
+    bonus_locked = Money(user.get('bonus_balance'))
     clean_balance = max(balance - bonus_locked, Decimal('0'))
     await callback_query.message.edit_caption(
         caption=(
@@ -777,7 +847,7 @@ async def start_public_check(callback_query: types.CallbackQuery, state: FSMCont
 async def start_multi_check(callback_query: types.CallbackQuery, state: FSMContext):
     user = await db.get_user(callback_query.from_user.id)
     balance = user['balance'] if user and 'balance' in user else Decimal('0')
-    bonus_locked = Decimal(str(user.get('bonus_balance', Decimal('0'))))
+    bonus_locked = Money(user.get('bonus_balance'))
     clean_balance = max(balance - bonus_locked, Decimal('0'))
     await callback_query.message.edit_caption(
         caption=(
@@ -822,12 +892,12 @@ async def process_check_amount(message: types.Message, state: FSMContext):
         return
     user = await db.get_user(message.from_user.id)
     balance = user['balance'] if user and 'balance' in user else Decimal('0')
-    bonus_locked = Decimal(str(user.get('bonus_balance', Decimal('0'))))
+    bonus_locked = Money(user.get('bonus_balance'))
     clean_balance = max(balance - bonus_locked, Decimal('0'))  
     balance = max(balance, Decimal('0'))
     text = message.text.strip().replace(',', '.')
     try:
-        amount = Decimal(text)
+        amount = Money(text)
     except Exception:
         await message.answer(INVALID_AMOUNT_FORMAT_MSG)
         return
@@ -977,7 +1047,7 @@ async def process_deposit_amount(message: types.Message, state: FSMContext):
         return
     text = message.text.strip().replace(',', '.')
     try:
-        amount = Decimal(text)
+        amount = Money(text)
     except Exception:
         await message.answer(INVALID_AMOUNT_FORMAT_MSG)
         return
@@ -1101,7 +1171,7 @@ async def process_withdraw(message: types.Message, state: FSMContext):
     clean_balance = available
     text = message.text.strip().replace(',', '.')
     try:
-        amount = Decimal(text)
+        amount = Money(text)
     except Exception:
         await message.answer(INVALID_AMOUNT_FORMAT_MSG)
         await state.clear()
@@ -1169,8 +1239,8 @@ async def show_referral(message: types.Message, state: FSMContext):
             [InlineKeyboardButton(text="👥 Мои рефералы", callback_data="show_my_referrals")]
         ]
     )
-    await message.answer_video(
-        video=types.FSInputFile("ref.mp4"),
+    await send_media(
+        message.answer_video, "ref.mp4",
         caption=(
             f"👥 <b>Реферальная программа {CASINO_NAME}</b>\n\n"
             f"💰 <b>Баланс:</b> <code>{user.get('ref_balance', 0):.2f}$</code>\n"
@@ -1235,8 +1305,12 @@ async def back_to_ref_menu(callback_query: types.CallbackQuery, state: FSMContex
     await show_referral(DummyMessage(callback_query.message.chat, callback_query.from_user, callback_query.message.answer_video), state)
     await callback_query.answer()
 
-def get_bet_keyboard(amount):
-    betting_channel_url = "https://t.me/+MglBkaT0amdlZGRi"
+def get_bet_keyboard(amount, betting_channel_url: str = BETS_URL):
+    # Ключ кэша — строка суммы: 1 и 1.00 равны как числа, но дают разные callback_data
+    return _bet_keyboard(str(amount), betting_channel_url)
+
+@lru_cache(maxsize=1024)
+def _bet_keyboard(amount: str, betting_channel_url: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [InlineKeyboardButton(text="Канал ставок", url=betting_channel_url)],
@@ -1245,6 +1319,7 @@ def get_bet_keyboard(amount):
                 InlineKeyboardButton(text="🔁", callback_data="repeat_bet"),
                 InlineKeyboardButton(text="⬆️", callback_data=f"increase_bet_{amount}")
             ],
+            [InlineKeyboardButton(text="🤖 Автоставка", callback_data="autobet")],
             [InlineKeyboardButton(text="🎮 В меню игр", callback_data="new_bet")]
         ]
     )
@@ -1268,7 +1343,7 @@ def parse_message(message: types.Message) -> Optional[dict]:
         if "($" in msg_text:
             amount_part = msg_text.split("($")[1].split(').')[0].replace(',', "")
             if amount_part.replace('.', '', 1).isdigit():
-                amount = Decimal(amount_part)
+                amount = Money(amount_part)
         if '💬' in message.text:
             comment = message.text.split("💬 ")[1].lower()
         else:
@@ -1292,7 +1367,7 @@ def parse_invoice_payload(payload: str, user_id: int, amount: Decimal, username:
     game_type = parts[0]
     bet_type = '_'.join(parts[1:-2])
     try:
-        payload_amount = Decimal(parts[-2])
+        payload_amount = Money(parts[-2])
         payload_user_id = int(parts[-1])
     except Exception:
         return None
@@ -1309,68 +1384,106 @@ def parse_invoice_payload(payload: str, user_id: int, amount: Decimal, username:
     }
 
 def parse_game_type_and_bet(comment: str):
-    comment = comment.lower().replace(" ", "").replace("ё", "е")
-    game_bets = {
-        "basketball": {"мимо", "гол", "чистыйгол", "застрял"},
-        "darts": {"белое", "красное", "яблочко", "промах"},
-        "slots": {"казик", "слоты", "777", "джекпот"},
-        "bowling": {"боулинг", "страйк", "боулпобеда", "боулпоражение", "боулпромах"},
-        "cube": {"чет", "нечет", "больше", "меньше", "плинко", "1", "2", "3", "4", "5", "6", "сектор1", "сектор2", "сектор3"},
-        "two_dice": {"ничья", "победа1", "победа2", "2чет", "2нечет", "2меньше", "2больше", "произведение18"},
-        "rock_paper_scissors": {"камень", "ножницы", "бумага"},
-        "football": {"футгол", "футпромах"}
-    }
-    for game, bets in game_bets.items():
-        if comment in bets:
-            return game, comment
-    return None, None
+    spec = current_rules().parse_comment(comment)
+    if spec is None:
+        return None, None
+    return spec.game, spec.bet
 
 def get_russian_names(game_type: str, bet_type: str) -> tuple[str, str]:
-    game_name_map = {
-        "cube": "🎲 кубик",
-        "two_dice": "🎲 2 кубика",
-        "rps": "👊✌️🖐 КНБ",
-        "rock_paper_scissors": "👊✌️🖐 КНБ",
-        "basketball": "🏀 баскетбол",
-        "darts": "🎯 дартс",
-        "slots": "🎰 слоты",
-        "bowling": "🎳 боулинг",
-        "football": "⚽ футбол",
-        "custom": "✨ авторская"
-    }
-    bet_name_map = {
-        "чет": "четное", "нечет": "нечетное", "больше": "больше", "меньше": "меньше",
-        "плинко": "плинко", "победа1": "победа 1", "победа2": "победа 2", "ничья": "ничья", 
-        "камень": "камень", "ножницы": "ножницы", "бумага": "бумага",
-        "гол": "попадание", "мимо": "промах", "чистыйгол": "чистый гол", "застрял": "мяч застрял",
-        "белое": "белое", "красное": "красное", "яблочко": "яблочко", "промах": "промах",
-        "казик": "прокрут", "слоты": "прокрут", "777": "прокрут", "джекпот": "прокрут",
-        "боулинг": "бросок", "боул": "бросок", "страйк": "страйк", "спэр": "спэр",
-        "боулпобеда": "победа", "боулпоражение": "поражение",
-        "2чет": "2 чет", "2нечет": "2 нечет", "2меньше": "2 меньше", "2больше": "2 больше", "произведение18": "произведение ≥ 18",
-        "сектор1": "сектор 1", "сектор2": "сектор 2", "сектор3": "сектор 3",
-        "футгол": "гол", "футпромах": "промах",
-        "custom1": "📞 x2", "custom2": "🌈 x3", "custom3": "🎮 x5", "custom4": "💣 x10",
-        "custom5": "🔮 x20", "custom6": "🔭 x30", "custom7": "📱 x50", "custom8": "🚀 x100"
-    }
-    if not game_type:
-        return "—", bet_type
-    game_name = game_name_map.get(game_type, str(game_type).lower())
-    if game_type == 'cube' and bet_type in {'1', '2', '3', '4', '5', '6'}:
-        bet_name = bet_type
+    return current_rules().display_names(game_type, bet_type)
+
+@dp.message(Command("fair"), StateFilter('*'))
+async def show_fairness(message: types.Message, command: CommandObject, state: FSMContext):
+    await state.clear()
+    args = (command.args or "").strip().lstrip("#")
+    if args.isdigit():
+        await message.answer(await format_wager_fairness(int(args)), parse_mode="HTML")
+        return
+    if args.split(maxsplit=1)[:1] == ["seed"]:
+        await change_fair_seed(message, args[len("seed"):].strip())
+        return
+    seed = await fairness.active_seed(message.from_user.id)
+    lines = [
+        "🔐 <b>Проверка честности</b>",
+        "",
+        "Исходы авторских игр, КНБ и автоставок: HMAC-SHA256(server_seed, \"client_seed:nonce\").",
+        f"Хеш вашего server seed: <code>{seed['seed_hash']}</code>",
+        f"Ваш client seed: <code>{seed['client_seed']}</code>",
+    ]
+    closed = await db.get_closed_fair_seeds(message.from_user.id)
+    if closed:
+        lines.append("\nЗакрытые сиды:")
+        for r in closed:
+            server_seed = fairness.revealed_server_seed(r)
+            lines.append(f"#{r['seed_index']}: <code>{server_seed}</code>" if server_seed
+                         else f"#{r['seed_index']}: ⏳ раскроется через {fairness.REVEAL_DELAY:.0f} с после смены")
+    lines.append("\nСменить client seed и раскрыть server seed: /fair seed [новый_client_seed]")
+    lines.append("Проверить ставку: /fair номер_ставки")
+    await message.answer("\n".join(lines), parse_mode="HTML")
+
+async def change_fair_seed(message: types.Message, client_seed: str):
+    if client_seed and not fairness.CLIENT_SEED_PATTERN.fullmatch(client_seed):
+        await message.answer("❌ Client seed — до 32 латинских букв, цифр, «_» и «-»")
+        return
+    closed, seed = await fairness.rotate(message.from_user.id, client_seed or None)
+    lines = ["🔐 <b>Сиды сменены</b>", ""]
+    if closed:
+        lines.append(
+            f"Server seed #{closed['seed_index']} раскроется в /fair через {fairness.REVEAL_DELAY:.0f} с"
+        )
+    lines.append(f"Хеш нового server seed: <code>{seed['seed_hash']}</code>")
+    lines.append(f"Client seed: <code>{seed['client_seed']}</code>")
+    await message.answer("\n".join(lines), parse_mode="HTML")
+
+async def format_wager_fairness(wager_id: int) -> str:
+    wager = await db.get_wager(wager_id)
+    if not wager or (wager['dice_value'] is None and not wager['outcomes']):
+        return "❌ Ставка не найдена или ещё не сыграна"
+    if wager['fair_seed'] is None:
+        return f"🎲 Исход ставки #{wager_id} определил кубик Telegram"
+    seed = await db.get_fair_seed_by_id(wager['fair_seed'])
+    source = f"Пара сидов #{seed['seed_index']} игрока"
+    server_seed = fairness.revealed_server_seed(seed)
+    game_key = wager['bet_type'] if wager['game'] == 'custom' else wager['game']
+    rules = await rules_for_version(wager['rules_version'])
+    if wager['outcomes']:
+        # Серия автоставок: значения всех раундов — подряд идущие номера пары сидов
+        values = [int(v) for v in wager['outcomes'].split(',')]
+        nonce = wager['fair_nonce']
+        outcome_text = f"nonce {nonce}–{nonce + len(values) - 1}, серия из {wager['rounds']} раундов"
+    else:
+        outcome_text = f"nonce {wager['fair_nonce']}, исход {wager['dice_value']}"
+    text = (
+        f"🔐 Ставка #{wager_id}\n"
+        f"{source}, {outcome_text}\n"
+        f"Хеш сида: <code>{seed['seed_hash']}</code>\n"
+        f"Client seed: <code>{seed['client_seed']}</code>"
+    )
+    if server_seed is None and seed['closed_at'] is not None:
+        return text + (f"\n\n⏳ Пара сидов закрыта, server seed раскроется "
+                       f"через {fairness.REVEAL_DELAY:.0f} с после смены")
+    if server_seed is None:
+        return text + "\n\n⏳ Server seed ещё не раскрыт: игрок может раскрыть его командой /fair seed"
+    if wager['outcomes']:
+        ok = fairness.verify_series(server_seed, seed['seed_hash'], seed['client_seed'],
+                                    wager['fair_nonce'], game_key, values, rules)
     else:
-        bet_name = bet_name_map.get(bet_type, bet_type)
-    return game_name, bet_name
+        ok = fairness.verify(server_seed, seed['seed_hash'], seed['client_seed'],
+                             wager['fair_nonce'], game_key, wager['dice_value'], rules)
+    return (
+        text + f"\nServer seed: <code>{server_seed}</code>\n\n"
+        + ("✅ Исход совпадает с сидом" if ok else "❌ Исход не совпадает с сидом")
+    )
 
 @dp.message(Command("games"), StateFilter('*'))
 @dp.message(F.text == "🎲 Сделать ставку", StateFilter('*'))
 async def choose_game(message: types.Message, state: FSMContext):
     await state.clear()
-    await message.answer_video(
-        video=types.FSInputFile("games.mp4"),
+    await send_media(
+        message.answer_video, "games.mp4",
         caption=(
             "🎮 <b>Выберите игру:</b>\n\n"
-            f"<b>После выбора игры и исхода ваша ставка сыграет в нашем <a href=\"https://t.me/+MglBkaT0amdlZGRi\">канале ставок</a>.</b>"
+            f"<b>После выбора игры и исхода ваша ставка сыграет в нашем <a href=\"{BETS_URL}\">канале ставок</a>.</b>"
         ),
         reply_markup=create_games_keyboard(),
         parse_mode="HTML"
@@ -1381,129 +1494,13 @@ async def choose_game(message: types.Message, state: FSMContext):
 async def choose_bet_type(callback_query: types.CallbackQuery, state: FSMContext):
     game_type = callback_query.data.replace("game_", "")
     await state.update_data(game_type=game_type)
-    bet_options = {
-        "cube": {
-            "title": "🎲 Кубик",
-            "options": [
-                ("Четное", "чет"),
-                ("Нечетное", "нечет"),
-                ("Больше", "больше"),
-                ("Меньше", "меньше"),
-                ("Сектор 1", "сектор1"),
-                ("Сектор 2", "сектор2"),
-                ("Сектор 3", "сектор3"),
-                ("1", "1"),
-                ("2", "2"),
-                ("3", "3"),
-                ("4", "4"),
-                ("5", "5"),
-                ("6", "6"),
-                ("Плинко", "плинко"),
-            ]
-        },
-        "two_dice": {
-            "title": "🎲🎲 Два кубика",
-            "options": [
-                ("Ничья", "ничья"),
-                ("Победа 1", "победа1"),
-                ("Победа 2", "победа2"),
-                ("2 Чет", "2чет"),
-                ("2 Нечет", "2нечет"),
-                ("2 Меньше", "2меньше"),
-                ("2 Больше", "2больше"),
-                ("Произведение ≥ 18", "произведение18")
-            ]
-        },
-        "rock_paper_scissors": {
-            "title": "👊 Камень-ножницы-бумага",
-            "options": [
-                ("👊 Камень", "камень"),
-                ("✋ Бумага", "бумага"),
-                ("✌️ Ножницы", "ножницы")
-            ]
-        },
-        "basketball": {
-            "title": "🏀 Баскетбол",
-            "options": [
-                ("Попадание", "гол"),
-                ("Промах", "мимо"),
-                ("Чистый гол", "чистыйгол"),
-                ("Мяч застрял", "застрял")
-            ]
-        },
-        "darts": {
-            "title": "🎯 Дартс",
-            "options": [
-                ("Белое", "белое"),
-                ("Красное", "красное"),
-                ("Яблочко", "яблочко"),
-                ("Промах", "промах")
-            ]
-        },
-        "slots": {
-            "title": "🎰 Слоты",
-            "options": [
-                ("🎰 Крутить", "казик")
-            ]
-        },
-        "bowling": {
-            "title": "🎳 Боулинг",
-            "options": [
-                ("Бросок", "боулинг"),
-                ("Страйк", "страйк"),
-                ("Промах", "боулпромах"),
-                ("Победа", "боулпобеда"),
-                ("Поражение", "боулпоражение")
-            ]
-        },
-        "football": {
-            "title": "⚽ Футбол",
-            "options": [
-                ("Гол", "футгол"),
-                ("Промах", "футпромах")
-            ]
-        },
-        "custom": {
-            "title": "✨ Авторские игры",
-            "options": [
-                ("📞 x2", "custom1"), ("🌈 x3", "custom2"), ("🎮 x5", "custom3"), ("💣 x10", "custom4"),
-                ("🔮 x20", "custom5"), ("🔭 x30", "custom6"), ("📱 x50", "custom7"), ("🚀 x100", "custom8")
-            ]
-        },
-    }
-    game_info = bet_options.get(game_type)
+    rules = current_rules()
+    game_info = rules.games.get(game_type)
     if not game_info:
         await callback_query.answer("Игра не найдена", show_alert=True)
         return
-    bet_text = f"{game_info['title']}\n\n<b>Выберите тип ставки:</b>"
-    options = game_info['options']
-    if game_type == "custom":
-        keyboard_buttons = [
-            [InlineKeyboardButton(text=opt[0], callback_data=f"bet_{opt[1]}") for opt in options[i:i+4]]
-            for i in range(0, len(options), 4)
-        ]
-    elif game_type == "cube":
-        option_map = {opt[1]: opt[0] for opt in options}
-
-        def cube_button(key: str) -> InlineKeyboardButton:
-            return InlineKeyboardButton(text=option_map[key], callback_data=f"bet_{key}")
-
-        keyboard_buttons = [
-            [cube_button("чет"), cube_button("нечет")],
-            [cube_button("больше"), cube_button("меньше")],
-            [cube_button("сектор1"), cube_button("сектор2")],
-            [cube_button("сектор3")],
-            [cube_button("1"), cube_button("2"), cube_button("3")],
-            [cube_button("4"), cube_button("5"), cube_button("6")],
-            [cube_button("плинко")]
-        ]
-    else:
-        keyboard_buttons = [
-            [InlineKeyboardButton(text=options[i][0], callback_data=f"bet_{options[i][1]}")] +
-            ([InlineKeyboardButton(text=options[i+1][0], callback_data=f"bet_{options[i+1][1]}")] if i + 1 < len(options) else [])            for i in range(0, len(options), 2)
-        ]
-    keyboard_buttons.append([InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_games")])
-    keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+    bet_text = f"{game_info.title}\n\n<b>Выберите тип ставки:</b>"
+    keyboard = _bet_type_keyboard(rules, game_type)
     msg = callback_query.message
     try:
         await msg.edit_caption(
@@ -1532,9 +1529,13 @@ def build_balance_choice_keyboard(clean_balance: Decimal, bonus_balance: Decimal
     buttons.append([InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_bet_type")])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
-async def show_amount_prompt(target_message: types.Message, balance: Decimal, bonus_balance: Decimal, balance_type: str, back_callback: str):
-    balance = Decimal(str(balance))
-    bonus_balance = Decimal(str(bonus_balance))
+async def show_amount_prompt(target_message: types.Message, balance: Decimal, bonus_balance: Decimal, balance_type: str,
+                             back_callback: str, game_type: Optional[str] = None, bet_type: Optional[str] = None):
+    min_bet, _ = current_rules().limits(game_type)
+    max_bet = exposure.max_bet(game_type, bet_type)
+    legs = current_rules().legs(game_type, bet_type) or ()
+    balance = Money(balance)
+    bonus_balance = Money(bonus_balance)
     clean_balance = max(balance - bonus_balance, Decimal('0'))
     if balance_type == 'bonus':
         available = min(bonus_balance, balance)
@@ -1547,9 +1548,10 @@ async def show_amount_prompt(target_message: types.Message, balance: Decimal, bo
         f"<blockquote>"
         f"<b>Баланс:</b> <code>{balance:.2f}$</code>\n"
         f"<b>{balance_label} доступно:</b> <code>{available:.2f}$</code>\n"
-        f"<b>Минимальная ставка:</b> 0.30$\n"
-        f"<b>Максимальная ставка:</b> 1000$\n"
-        f"<b>Пример:</b> 5.50"
+        f"<b>Минимальная ставка:</b> {min_bet:.2f}$\n"
+        f"<b>Максимальная ставка:</b> {max_bet:g}$\n"
+        + (f"<b>Исходов:</b> {len(legs)} — сумма указывается на каждый\n" if len(legs) > 1 else "")
+        + f"<b>Пример:</b> 5.50"
         f"</blockquote>"
     )
     keyboard = InlineKeyboardMarkup(
@@ -1663,7 +1665,7 @@ async def get_management_menu(check_id: str, requester_id: Optional[int] = None)
                 target_user_info = f"ID {target_user_id}"
     
     password_status = "✅ Установлен" if check.get('password') else "❌ Не установлен"
-    turnover_status = f"{check.get('required_turnover', 0):.2f}$" if Decimal(str(check.get('required_turnover', 0))) > 0 else "—"
+    turnover_status = f"{check.get('required_turnover', 0):.2f}$" if Money(check.get('required_turnover', 0)) > 0 else "—"
     premium_status = "✅ Да" if check.get('premium_only') else "❌ Нет"
     wagering_status = f"x{check.get('wagering_multiplier', 0)}" if check.get('wagering_multiplier', 0) and Decimal(str(check.get('wagering_multiplier', 0))) > 0 else "—"
     comment_status = check.get('comment') or '—'
@@ -1724,16 +1726,69 @@ async def get_management_menu(check_id: str, requester_id: Optional[int] = None)
     )
     return text, keyboard
 
+@dp.callback_query(lambda c: c.data == "multi_start")
+async def start_multi_bet(callback_query: types.CallbackQuery, state: FSMContext):
+    game_type = (await state.get_data()).get('game_type')
+    rules = current_rules()
+    game_info = rules.games.get(game_type)
+    if not game_info or not game_info.multi:
+        await callback_query.answer("Сообщение устарело", show_alert=True)
+        return
+    await state.update_data(multi_legs=[])
+    text = (
+        f"{game_info.title}\n\n<b>Выберите до {MAX_LEGS} исходов на один бросок:</b>\n"
+        f"<i>сумма ставки указывается на каждый исход</i>"
+    )
+    keyboard = _multi_bet_keyboard(rules, game_type, [])
+    try:
+        await callback_query.message.edit_caption(caption=text, reply_markup=keyboard, parse_mode="HTML")
+    except aiogram.exceptions.TelegramBadRequest:
+        await callback_query.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+    await callback_query.answer()
+
+@dp.callback_query(lambda c: c.data.startswith("mbet_"))
+async def toggle_multi_leg(callback_query: types.CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    game_type = data.get('game_type')
+    legs = list(data.get('multi_legs') or [])
+    rules = current_rules()
+    if game_type not in rules.games:
+        await callback_query.answer("Сообщение устарело", show_alert=True)
+        return
+    choice = callback_query.data[5:]
+    if choice == "done":
+        if len(legs) < 2:
+            await callback_query.answer("Выберите хотя бы два исхода", show_alert=True)
+            return
+        await ask_balance(callback_query, state, MULTI_SEPARATOR.join(legs))
+        return
+    if choice in legs:
+        legs.remove(choice)
+    else:
+        legs.append(choice)
+        if len(legs) > MAX_LEGS:
+            await callback_query.answer(f"Не больше {MAX_LEGS} исходов", show_alert=True)
+            return
+        if len(legs) > 1 and rules.lookup(game_type, MULTI_SEPARATOR.join(legs)) is None:
+            await callback_query.answer("Эти исходы нельзя сыграть одним броском", show_alert=True)
+            return
+    await state.update_data(multi_legs=legs)
+    await callback_query.message.edit_reply_markup(reply_markup=_multi_bet_keyboard(rules, game_type, legs))
+    await callback_query.answer()
+
 @dp.callback_query(lambda c: c.data.startswith("bet_"))
 async def choose_balance(callback_query: types.CallbackQuery, state: FSMContext):
-    bet_type = callback_query.data[4:]
-    await state.update_data(bet_type=bet_type)
+    await ask_balance(callback_query, state, callback_query.data[4:])
+
+async def ask_balance(callback_query: types.CallbackQuery, state: FSMContext, bet_type: str):
+    spec = current_rules().lookup((await state.get_data()).get('game_type'), bet_type)
+    await state.update_data(bet_type=spec.bet if spec else bet_type)
     user = await db.get_user(callback_query.from_user.id)
     if not user:
         await callback_query.answer("Профиль не найден", show_alert=True)
         return
-    balance = Decimal(str(user.get('balance', 0) or 0))
-    bonus_balance = Decimal(str(user.get('bonus_balance', 0) or 0))
+    balance = Money(user.get('balance'))
+    bonus_balance = Money(user.get('bonus_balance'))
     clean_balance = max(balance - bonus_balance, Decimal('0'))
     msg = callback_query.message
     if bonus_balance > Decimal('0'):
@@ -1761,7 +1816,9 @@ async def choose_balance(callback_query: types.CallbackQuery, state: FSMContext)
         await state.set_state(GameStates.CHOOSE_BALANCE)
     else:
         await state.update_data(balance_type='main', balance_selection_skipped=True)
-        await show_amount_prompt(msg, balance, bonus_balance, 'main', back_callback="back_to_bet_type")
+        state_data = await state.get_data()
+        await show_amount_prompt(msg, balance, bonus_balance, 'main', back_callback="back_to_bet_type",
+                                 game_type=state_data.get('game_type'), bet_type=state_data.get('bet_type'))
         await state.set_state(GameStates.ENTER_AMOUNT)
     await callback_query.answer()
 
@@ -1772,15 +1829,18 @@ async def handle_balance_choice(callback_query: types.CallbackQuery, state: FSMC
     if not user:
         await callback_query.answer("Профиль не найден", show_alert=True)
         return
-    balance = Decimal(str(user.get('balance', 0) or 0))
-    bonus_balance = Decimal(str(user.get('bonus_balance', 0) or 0))
+    balance = Money(user.get('balance'))
+    bonus_balance = Money(user.get('bonus_balance'))
     await state.update_data(balance_type=balance_type, balance_selection_skipped=False)
+    state_data = await state.get_data()
     await show_amount_prompt(
         callback_query.message,
         balance,
         bonus_balance,
         balance_type,
-        back_callback="back_to_balance"
+        back_callback="back_to_balance",
+        game_type=state_data.get('game_type'),
+        bet_type=state_data.get('bet_type')
     )
     await state.set_state(GameStates.ENTER_AMOUNT)
     await callback_query.answer()
@@ -1811,8 +1871,8 @@ async def back_to_balance(callback_query: types.CallbackQuery, state: FSMContext
     if not user:
         await callback_query.answer("Профиль не найден", show_alert=True)
         return
-    balance = Decimal(str(user.get('balance', 0) or 0))
-    bonus_balance = Decimal(str(user.get('bonus_balance', 0) or 0))
+    balance = Money(user.get('balance'))
+    bonus_balance = Money(user.get('bonus_balance'))
     clean_balance = max(balance - bonus_balance, Decimal('0'))
     keyboard = build_balance_choice_keyboard(clean_balance, bonus_balance)
     caption = (
@@ -1852,68 +1912,84 @@ async def create_bet_from_balance(message: types.Message, state: FSMContext):
         return
 
     try:
-        amount = Decimal(message.text.strip().replace(',', '.'))
+        amount = Money(message.text.strip().replace(',', '.'))
     except Exception:
         await message.answer(INVALID_AMOUNT_FORMAT_MSG)
         await state.clear()
         return
 
-    if not Decimal('0.30') <= amount <= Decimal('1000'):
-        await message.answer("❌ Минимальная сумма ставки: 0.30$" if amount < Decimal('0.30') else "❌ Максимальная сумма ставки: 1000$")
-        return
-    user = await db.get_user(message.from_user.id)
-    if not user:
-        await db.create_user(message.from_user.id, message.from_user.full_name, message.from_user.full_name)
-        await message.answer(
-            "❌ <b>Ваш профиль не найден</b>\n\n"
-            "Мы создали новый профиль для вас. Пожалуйста, пополните баланс для совершения ставок.",
-            parse_mode="HTML"
-        )
-        await state.clear()
-        return
     state_data = await state.get_data()
     game_type = state_data.get('game_type')
     bet_type = state_data.get('bet_type', 'unknown')
-    balance_type = state_data.get('balance_type', 'main')
-    balance = Decimal(str(user.get('balance', 0) or 0))
-    bonus_balance = Decimal(str(user.get('bonus_balance', 0) or 0))
-    clean_balance = max(balance - bonus_balance, Decimal('0'))
-    bonus_available = min(bonus_balance, balance)
-    if balance_type == 'bonus':
-        available_funds = bonus_available
-        if available_funds < amount:
-            await message.answer(
-                f"❌ <b>Недостаточно бонусных средств</b>\n\n"
-                f"Бонусный баланс: <code>{bonus_balance:.2f}$</code>\n"
-                f"Требуется: <code>{amount:.2f}$</code>",
-                parse_mode="HTML"
-            )
-            await state.clear()
-            return
-        success = await db.deduct_bonus_funds(message.from_user.id, amount)
-        if not success:
-            await message.answer("❌ Не удалось списать бонусные средства. Попробуйте ещё раз.", parse_mode="HTML")
-            await state.clear()
-            return
-    else:
-        available_funds = clean_balance
-        if available_funds < amount:
+    min_bet, _ = current_rules().limits(game_type)
+    # Лимит из правил, уменьшенный под свободный риск казны
+    max_bet = exposure.max_bet(game_type, bet_type)
+    # В мульти-ставке сумма вводится на каждый исход, списывается общая
+    legs = current_rules().legs(game_type, bet_type) or ()
+    stake = amount
+    amount = stake * max(len(legs), 1)
+    if not (min_bet <= stake and amount <= max_bet):
+        await message.answer(f"❌ Минимальная сумма ставки: {min_bet:.2f}$" if stake < min_bet else f"❌ Максимальная сумма ставки: {max_bet:g}$")
+        return
+    # Риск казны занимается до первого await: параллельные ставки не пройдут проверку на один остаток
+    reservation = reserve_exposure(game_type, bet_type, amount)
+    if reservation is None:
+        await message.answer(f"❌ Максимальная сумма ставки: {max_bet:g}$")
+        return
+    try:
+        user = await db.get_user(message.from_user.id)
+        if not user:
+            await db.create_user(message.from_user.id, message.from_user.full_name, message.from_user.full_name)
             await message.answer(
-                f"❌ <b>Недостаточно средств</b>\n\n"
-                f"Доступно: <code>{available_funds:.2f}$</code>\n"
-                f"Требуется: <code>{amount:.2f}$</code>",
+                "❌ <b>Ваш профиль не найден</b>\n\n"
+                "Мы создали новый профиль для вас. Пожалуйста, пополните баланс для совершения ставок.",
                 parse_mode="HTML"
             )
             await state.clear()
             return
-        await db.update_balance(message.from_user.id, -amount)
-    is_bonus_bet = (balance_type == 'bonus')
-    await state.update_data(last_bet_amount=amount, last_balance_type=balance_type)
-    await db.remove_wagering_if_balance_negative(message.from_user.id)
-    await db.add_transaction(user_id=message.from_user.id, amount=-amount, type='game', game_type=game_type)
-    await db.add_to_queue(user_id=message.from_user.id, amount=amount, game=game_type, bet_type=bet_type, is_bonus_bet=is_bonus_bet)
+        balance_type = state_data.get('balance_type', 'main')
+        balance = Money(user.get('balance'))
+        bonus_balance = Money(user.get('bonus_balance'))
+        clean_balance = max(balance - bonus_balance, Decimal('0'))
+        bonus_available = min(bonus_balance, balance)
+        if balance_type == 'bonus':
+            available_funds = bonus_available
+            if available_funds < amount:
+                await message.answer(
+                    f"❌ <b>Недостаточно бонусных средств</b>\n\n"
+                    f"Бонусный баланс: <code>{bonus_balance:.2f}$</code>\n"
+                    f"Требуется: <code>{amount:.2f}$</code>",
+                    parse_mode="HTML"
+                )
+                await state.clear()
+                return
+            success = await db.deduct_bonus_funds(message.from_user.id, amount)
+            if not success:
+                await message.answer("❌ Не удалось списать бонусные средства. Попробуйте ещё раз.", parse_mode="HTML")
+                await state.clear()
+                return
+        else:
+            available_funds = clean_balance
+            if available_funds < amount:
+                await message.answer(
+                    f"❌ <b>Недостаточно средств</b>\n\n"
+                    f"Доступно: <code>{available_funds:.2f}$</code>\n"
+                    f"Требуется: <code>{amount:.2f}$</code>",
+                    parse_mode="HTML"
+                )
+                await state.clear()
+                return
+            await db.update_balance(message.from_user.id, -amount)
+        is_bonus_bet = (balance_type == 'bonus')
+        await state.update_data(last_bet_amount=amount, last_balance_type=balance_type)
+        await db.remove_wagering_if_balance_negative(message.from_user.id)
+        await db.add_transaction(user_id=message.from_user.id, amount=-amount, type='game', game_type=game_type)
+        await enqueue_wager(user_id=message.from_user.id, amount=amount, game=game_type, bet_type=bet_type,
+                            is_bonus_bet=is_bonus_bet, reservation=reservation)
+    finally:
+        exposure.cancel(reservation)
     game_name_rus, bet_type_rus = get_russian_names(game_type, bet_type)
-    keyboard = get_bet_keyboard(amount)
+    keyboard = get_bet_keyboard(amount, channel_url(channel_for(user_id, game_type)))
     await bot.send_message(
         chat_id=message.from_user.id,
         text=(
@@ -1922,49 +1998,124 @@ async def create_bet_from_balance(message: types.Message, state: FSMContext):
             f"🎮 <b>Игра:</b> {game_name_rus}\n"
             f"🎯 <b>Ставка:</b> {bet_type_rus}\n"
             f"💳 <b>Баланс:</b> {'Бонусный' if is_bonus_bet else 'Основной'}\n"
-            f"💰 <b>Сумма:</b> {amount:.2f}$\n\n"
-            f"Результат смотрите в канале ставок"
+            f"💰 <b>Сумма:</b> {amount:.2f}$"
+            + (f" ({len(legs)} × {stake:.2f}$)" if len(legs) > 1 else "")
+            + f"\n\nРезультат смотрите в канале ставок"
             f"</blockquote>"
         ),
         parse_mode="HTML",
         reply_markup=keyboard
     )
-    asyncio.create_task(process_bet_queue())
     await state.clear()
     user_last_bet_time[user_id] = time.time()
 
-processing_bet = False
+def reserve_exposure(game: str, bet_type: str, amount: Decimal) -> Optional[object]:
+    """Резерв риска казны под ставку; None — ставка больше свободного лимита."""
+    reservation = object()
+    if exposure.reserve(reservation, game, exposure.liability(game, bet_type, amount)):
+        return reservation
+    return None
 
-async def process_bet_queue():
-    global processing_bet
-    if processing_bet:
+async def enqueue_wager(user_id: int, amount: Decimal, game: str, bet_type: str,
+                        is_bonus_bet: bool = False, source: str = 'bot', rounds: Optional[int] = None,
+                        stop_loss: Optional[Decimal] = None, take_profit: Optional[Decimal] = None,
+                        announce: bool = True, reservation: Optional[object] = None):
+    channel_id = channel_for(user_id, game)
+    # Ставка играется по правилам, действовавшим при её приёме
+    rules_version = current_rules().version
+    wager_id = await db.create_wager(user_id=user_id, amount=amount, game=game, bet_type=bet_type,
+                                     is_bonus_bet=is_bonus_bet, source=source,
+                                     lease_owner=BOT_INSTANCE_ID, lease_seconds=BET_LEASE_SECONDS,
+                                     channel_id=channel_id, rules_version=rules_version, rounds=rounds,
+                                     stop_loss=stop_loss, take_profit=take_profit, announce=announce)
+    exposure.confirm(reservation, wager_id)
+    submit_bet({
+        'id': wager_id, 'user_id': user_id, 'amount': amount, 'game': game,
+        'bet_type': bet_type, 'is_bonus_bet': is_bonus_bet, 'attempts': 1,
+        'channel_id': channel_id, 'rules_version': rules_version, 'rounds': rounds,
+        'stop_loss': stop_loss, 'take_profit': take_profit, 'announce': announce
+    })
+
+async def place_external_bet(data: dict, source: str):
+    user_id = data.get('id')
+    if not user_id or user_id == LOGS_ID:
         return
-    processing_bet = True
-    logging.info("[BET_QUEUE] process_bet_queue started")
-    while True:
-        bet = await db.get_next_bet()
-        if not bet:
-            break
-        user = await db.get_user(bet['user_id'])
-        data = {
-            'id': bet['user_id'],
-            'name': user.get('full_name', f"User {bet['user_id']}") or f"User {bet['user_id']}",
-            'usd_amount': bet['amount'],
-            'asset': 'USDT',
-            'comment': bet['bet_type'],
-            'game': bet['game'],
-            'queue_id': bet['id'],
-            'is_bonus_bet': bool(bet.get('is_bonus_bet'))
-        }
+    game_type, bet_type = parse_game_type_and_bet(data.get('comment') or '')
+    if not game_type or not bet_type:
+        await send_bet_error(channel_for(user_id), data['name'])
+        return
+    try:
+        usd_amount = Money(data.get('usd_amount'))
+    except Exception:
+        usd_amount = ZERO
+    max_bet = exposure.max_bet(game_type, bet_type)
+    reservation = reserve_exposure(game_type, bet_type, usd_amount) if usd_amount <= max_bet else None
+    if reservation is None:
+        # Деньги уже получены: ставка сверх лимита не играет, а зачисляется на баланс
+        logging.warning(f"[EXPOSURE] Ставка {usd_amount}$ от {user_id} больше лимита {max_bet}$, зачислена на баланс")
+        if not await db.get_user(user_id):
+            await db.create_user(user_id, data.get('name') or '')
         try:
-            await process_bet(data)
-            pending_bet = await db.get_user_pending_bet(bet['user_id'])
-            if pending_bet and pending_bet.get('id') == bet['id']:
-                await db.mark_user_pending_bets_processed(bet['user_id'])
+            await process_successful_deposit(user_id, usd_amount)
+            await bot.send_message(
+                chat_id=user_id,
+                text=f"⚠️ <b>Ставка больше текущего лимита {max_bet:g}$ и не сыграна.</b>\nСумма зачислена на баланс бота",
+                parse_mode="HTML"
+            )
         except Exception as e:
-            logging.error(f"[BET_QUEUE] Ошибка в process_bet_queue: {e}")
-    processing_bet = False
-    logging.info("[BET_QUEUE] process_bet_queue finished")
+            logging.error(f"[EXPOSURE] Не удалось уведомить {user_id}: {e}")
+        return
+    try:
+        await enqueue_wager(user_id=user_id, amount=usd_amount, game=game_type, bet_type=bet_type, source=source,
+                            reservation=reservation)
+    finally:
+        exposure.cancel(reservation)
+
+async def run_wager(bet):
+    data = {
+        'id': bet['user_id'],
+        'name': f"User {bet['user_id']}",
+        'usd_amount': bet['amount'],
+        'asset': 'USDT',
+        'comment': bet['bet_type'],
+        'game': bet['game'],
+        'wager_id': bet['id'],
+        'is_bonus_bet': bool(bet.get('is_bonus_bet')),
+        'message_id': bet.get('message_id'),
+        'channel_id': bet.get('channel_id'),
+        'rules_version': bet.get('rules_version'),
+        'dice_value': bet.get('dice_value'),
+        'second_dice_value': bet.get('second_dice_value'),
+        'rounds': bet.get('rounds'),
+        'stop_loss': bet.get('stop_loss'),
+        'take_profit': bet.get('take_profit'),
+        'announce': bet.get('announce', True),
+        'fair_seed': bet.get('fair_seed'),
+        'fair_nonce': bet.get('fair_nonce'),
+        'outcomes': bet.get('outcomes')
+    }
+    try:
+        with priority(BET_RESULT):
+            await process_bet(data)
+    except Exception:
+        if (bet.get('attempts') or 1) < BET_MAX_ATTEMPTS:
+            # Аренда снимается, и ставку заберёт следующий проход lease_loop
+            await db.release_wager(bet['id'], BOT_INSTANCE_ID)
+        else:
+            refund = await db.fail_wager_with_refund(bet['id'])
+            exposure.release(bet['id'])
+            if refund is not None:
+                logging.error(f"[BET_QUEUE] Ставка {bet['id']} не обработана за {BET_MAX_ATTEMPTS} попыток, возврат {refund}$")
+                try:
+                    await bot.send_message(
+                        chat_id=bet['user_id'],
+                        text=f"⚠️ <b>Ставку не удалось обработать.</b>\n💰 <b>Сумма {refund:.2f}$ возвращена на баланс</b>",
+                        parse_mode="HTML"
+                    )
+                except Exception:
+                    pass
+        raise
+    exposure.release(bet['id'])
 
 @dp.callback_query(lambda c: c.data == "new_bet")
 async def new_bet(callback_query: types.CallbackQuery, state: FSMContext):
@@ -1989,49 +2140,48 @@ async def repeat_bet_callback(callback_query: types.CallbackQuery, state: FSMCon
         await callback_query.answer(f'⏳ Флуд-контроль. Сделайте ставку через {seconds_left} секунд', show_alert=True)
         return
 
-    last_bet = await db.get_last_bet(user_id)
-    if not last_bet or not last_bet.get('bet_type'):
+    last_bet = await get_last_bet_params(user_id, state)
+    if last_bet is None:
         await callback_query.answer("Нет предыдущей ставки для повторения.", show_alert=True)
         return
-    state_data = await state.get_data()
-    last_bet_amount = state_data.get('last_bet_amount')
-    if last_bet_amount is not None:
-        amount = last_bet_amount
-    else:
-        amount = last_bet['amount']
-    game = last_bet.get('game') or last_bet.get('game_type')
-    bet_type = last_bet.get('bet_type')
-    raw_bonus_flag = last_bet.get('is_bonus_bet')
+    game, bet_type, amount, is_bonus_bet = last_bet
+    max_bet = exposure.max_bet(game, bet_type)
+    if amount > max_bet:
+        await callback_query.answer(f"❌ Максимальная сумма ставки сейчас: {max_bet:g}$", show_alert=True)
+        return
+    reservation = reserve_exposure(game, bet_type, amount)
+    if reservation is None:
+        await callback_query.answer(f"❌ Максимальная сумма ставки сейчас: {max_bet:g}$", show_alert=True)
+        return
     try:
-        is_bonus_bet = bool(int(raw_bonus_flag))
-    except (TypeError, ValueError):
-        is_bonus_bet = bool(raw_bonus_flag)
-    user = await db.get_user(user_id)
-    balance = Decimal(str(user.get('balance', 0) or 0))
-    bonus_balance = Decimal(str(user.get('bonus_balance', 0) or 0))
-    clean_balance = max(balance - bonus_balance, Decimal('0'))
-    bonus_available = min(bonus_balance, balance)
-    if is_bonus_bet:
-        if bonus_available < amount:
-            await callback_query.answer("❌ Недостаточно бонусных средств для повторения ставки.", show_alert=True)
-            return
-        success = await db.deduct_bonus_funds(user_id, amount)
-        if not success:
-            await callback_query.answer("❌ Не удалось списать бонусные средства.", show_alert=True)
-            return
-        balance_type = 'bonus'
-    else:
-        if clean_balance < amount:
-            await callback_query.answer("❌ Недостаточно средств для повторения ставки.", show_alert=True)
-            return
-        await db.update_balance(user_id, -amount)
-        balance_type = 'main'
-    await db.mark_user_pending_bets_processed(user_id)
-    await db.add_transaction(user_id=user_id, amount=-amount, type='game', game_type=game)
-    await db.add_to_queue(user_id=user_id, amount=amount, game=game, bet_type=bet_type, is_bonus_bet=is_bonus_bet)
+        user = await db.get_user(user_id)
+        balance = Money(user.get('balance'))
+        bonus_balance = Money(user.get('bonus_balance'))
+        clean_balance = max(balance - bonus_balance, Decimal('0'))
+        bonus_available = min(bonus_balance, balance)
+        if is_bonus_bet:
+            if bonus_available < amount:
+                await callback_query.answer("❌ Недостаточно бонусных средств для повторения ставки.", show_alert=True)
+                return
+            success = await db.deduct_bonus_funds(user_id, amount)
+            if not success:
+                await callback_query.answer("❌ Не удалось списать бонусные средства.", show_alert=True)
+                return
+            balance_type = 'bonus'
+        else:
+            if clean_balance < amount:
+                await callback_query.answer("❌ Недостаточно средств для повторения ставки.", show_alert=True)
+                return
+            await db.update_balance(user_id, -amount)
+            balance_type = 'main'
+        await db.add_transaction(user_id=user_id, amount=-amount, type='game', game_type=game)
+        await enqueue_wager(user_id=user_id, amount=amount, game=game, bet_type=bet_type, is_bonus_bet=is_bonus_bet,
+                            reservation=reservation)
+    finally:
+        exposure.cancel(reservation)
     await state.update_data(game_type=game, bet_type=bet_type, last_bet_amount=amount, last_balance_type=balance_type)
     game_name_rus, bet_type_rus = get_russian_names(game, bet_type)
-    keyboard = get_bet_keyboard(amount)
+    keyboard = get_bet_keyboard(amount, channel_url(channel_for(user_id, game)))
     await bot.send_message(
         chat_id=user_id,
         text=(
@@ -2047,10 +2197,157 @@ async def repeat_bet_callback(callback_query: types.CallbackQuery, state: FSMCon
         parse_mode="HTML",
         reply_markup=keyboard
     )
-    asyncio.create_task(process_bet_queue())
     await callback_query.answer("Ставка повторена!")
     user_last_bet_time[user_id] = time.time()
 
+async def get_last_bet_params(user_id: int, state: FSMContext) -> Optional[tuple]:
+    """Игра, ставка, сумма одного раунда и баланс последней ставки игрока."""
+    last_bet = await db.get_last_bet(user_id)
+    if not last_bet or not last_bet.get('bet_type'):
+        return None
+    amount = (await state.get_data()).get('last_bet_amount')
+    if amount is None:
+        amount = Money(last_bet['amount'])
+        if last_bet.get('rounds'):
+            # У серии автоставок сумма — резерв или, после расчёта, сумма сыгранных раундов
+            amount = amount / (last_bet.get('rounds_played') or last_bet['rounds'])
+    raw_bonus_flag = last_bet.get('is_bonus_bet')
+    try:
+        is_bonus_bet = bool(int(raw_bonus_flag))
+    except (TypeError, ValueError):
+        is_bonus_bet = bool(raw_bonus_flag)
+    return last_bet.get('game'), last_bet.get('bet_type'), amount, is_bonus_bet
+
+def _cycle(options, value):
+    options = list(options)
+    return options[(options.index(value) + 1) % len(options)] if value in options else options[0]
+
+def autobet_text(settings: dict) -> str:
+    game_name_rus, bet_type_rus = get_russian_names(settings['game'], settings['bet'])
+    stake = Money(settings['stake'])
+    return (
+        f"🤖 <b>Автоставка</b>\n\n"
+        f"<blockquote>"
+        f"🎮 <b>Игра:</b> {game_name_rus}\n"
+        f"🎯 <b>Ставка:</b> {bet_type_rus}\n"
+        f"💳 <b>Баланс:</b> {'Бонусный' if settings['bonus'] else 'Основной'}\n"
+        f"💰 <b>Ставка раунда:</b> {stake:.2f}$\n"
+        f"🔒 <b>Резерв:</b> {stake * settings['rounds']:.2f}$"
+        f"</blockquote>\n\n"
+        f"<i>Сумма на все раунды списывается сразу, за несыгранные раунды возвращается. "
+        f"Серия останавливается по стоп-лоссу (проигрыш от начала серии) или тейк-профиту (выигрыш).</i>"
+    )
+
+def autobet_keyboard(settings: dict) -> InlineKeyboardMarkup:
+    stake = Money(settings['stake'])
+    stop = f"{stake * settings['stop']:.2f}$" if settings['stop'] else "нет"
+    take = f"{stake * settings['take']:.2f}$" if settings['take'] else "нет"
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=f"🔢 Раундов: {settings['rounds']}", callback_data="autobet_rounds")],
+        [
+            InlineKeyboardButton(text=f"🛑 Стоп-лосс: {stop}", callback_data="autobet_stop"),
+            InlineKeyboardButton(text=f"🎯 Тейк-профит: {take}", callback_data="autobet_take")
+        ],
+        [InlineKeyboardButton(text=f"📢 В канал: {'да' if settings['announce'] else 'нет'}", callback_data="autobet_announce")],
+        [
+            InlineKeyboardButton(text="▶️ Запустить", callback_data="autobet_start"),
+            InlineKeyboardButton(text="❌ Отмена", callback_data="autobet_cancel")
+        ]
+    ])
+
+@dp.callback_query(lambda c: c.data == "autobet")
+async def autobet_menu(callback_query: types.CallbackQuery, state: FSMContext):
+    last_bet = await get_last_bet_params(callback_query.from_user.id, state)
+    if last_bet is None:
+        await callback_query.answer("Нет предыдущей ставки для автоставки.", show_alert=True)
+        return
+    game, bet_type, amount, is_bonus_bet = last_bet
+    settings = {
+        'game': game, 'bet': bet_type, 'stake': str(amount), 'bonus': is_bonus_bet,
+        'rounds': AUTO_BET_ROUNDS[0], 'stop': 0, 'take': 0, 'announce': True
+    }
+    await state.update_data(autobet=settings)
+    await callback_query.message.answer(autobet_text(settings), reply_markup=autobet_keyboard(settings), parse_mode="HTML")
+    await callback_query.answer()
+
+@dp.callback_query(lambda c: c.data in ("autobet_rounds", "autobet_stop", "autobet_take", "autobet_announce"))
+async def autobet_option(callback_query: types.CallbackQuery, state: FSMContext):
+    settings = (await state.get_data()).get('autobet')
+    if not settings:
+        await callback_query.answer("Сообщение устарело", show_alert=True)
+        return
+    option = callback_query.data[len("autobet_"):]
+    if option == "rounds":
+        settings['rounds'] = _cycle(AUTO_BET_ROUNDS, settings['rounds'])
+    elif option == "announce":
+        settings['announce'] = not settings['announce']
+    else:
+        settings[option] = _cycle(AUTO_BET_LIMITS, settings[option])
+    await state.update_data(autobet=settings)
+    await callback_query.message.edit_text(autobet_text(settings), reply_markup=autobet_keyboard(settings), parse_mode="HTML")
+    await callback_query.answer()
+
+@dp.callback_query(lambda c: c.data == "autobet_cancel")
+async def autobet_cancel(callback_query: types.CallbackQuery, state: FSMContext):
+    await state.update_data(autobet=None)
+    await callback_query.message.delete()
+    await callback_query.answer()
+
+@dp.callback_query(lambda c: c.data == "autobet_start")
+async def autobet_start(callback_query: types.CallbackQuery, state: FSMContext):
+    user_id = callback_query.from_user.id
+    settings = (await state.get_data()).get('autobet')
+    if not settings:
+        await callback_query.answer("Сообщение устарело", show_alert=True)
+        return
+    if await db.get_user_pending_bet(user_id):
+        await callback_query.answer("❗️ У вас уже есть необработанная ставка. Дождитесь завершения предыдущей!", show_alert=True)
+        return
+    game, bet_type, is_bonus_bet, rounds = settings['game'], settings['bet'], settings['bonus'], settings['rounds']
+    if current_rules().lookup(game, bet_type) is None:
+        await callback_query.answer("❌ Эта ставка больше недоступна.", show_alert=True)
+        return
+    stake = Money(settings['stake'])
+    min_bet, max_bet = current_rules().limits(game)
+    if not min_bet <= stake <= max_bet:
+        await callback_query.answer(f"❌ Ставка раунда должна быть от {min_bet:.2f}$ до {max_bet:g}$", show_alert=True)
+        return
+    amount = stake * rounds
+    reservation = reserve_exposure(game, bet_type, amount)
+    if reservation is None:
+        await callback_query.answer("❌ Серия слишком крупная для текущего лимита, уменьшите ставку или число раундов.", show_alert=True)
+        return
+    try:
+        user = await db.get_user(user_id)
+        balance = Money(user.get('balance'))
+        bonus_balance = Money(user.get('bonus_balance'))
+        available = min(bonus_balance, balance) if is_bonus_bet else max(balance - bonus_balance, Decimal('0'))
+        if available < amount:
+            await callback_query.answer(f"❌ Недостаточно средств: нужно {amount:.2f}$ на {rounds} раундов.", show_alert=True)
+            return
+        if is_bonus_bet:
+            if not await db.deduct_bonus_funds(user_id, amount):
+                await callback_query.answer("❌ Не удалось списать бонусные средства.", show_alert=True)
+                return
+        else:
+            await db.update_balance(user_id, -amount)
+        await db.add_transaction(user_id=user_id, amount=-amount, type='game', game_type=game)
+        await enqueue_wager(user_id=user_id, amount=amount, game=game, bet_type=bet_type, is_bonus_bet=is_bonus_bet,
+                            rounds=rounds, stop_loss=stake * settings['stop'] or None,
+                            take_profit=stake * settings['take'] or None, announce=settings['announce'],
+                            reservation=reservation)
+    finally:
+        exposure.cancel(reservation)
+    await state.update_data(autobet=None, game_type=game, bet_type=bet_type, last_bet_amount=stake,
+                            last_balance_type='bonus' if is_bonus_bet else 'main')
+    await callback_query.message.edit_text(
+        f"🤖 <b>Автоставка запущена:</b> {rounds} × {stake:.2f}$\n"
+        f"Итог придёт одним сообщением",
+        parse_mode="HTML"
+    )
+    await callback_query.answer()
+    user_last_bet_time[user_id] = time.time()
+
 async def get_bet_state(callback_query, state):
     state_data = await state.get_data()
     game_type = state_data.get('game_type')
@@ -2076,26 +2373,27 @@ async def get_bet_state(callback_query, state):
 @dp.callback_query(lambda c: c.data.startswith("increase_bet_"))
 async def increase_bet(callback_query: types.CallbackQuery, state: FSMContext):
     try:
-        current_amount = Decimal(callback_query.data.split("_")[-1])
+        current_amount = Money(callback_query.data.split("_")[-1])
     except Exception:
         _, _, current_amount = await get_bet_state(callback_query, state)
         if not current_amount:
             current_amount = Decimal('1')
     new_amount = current_amount * 2
-    if new_amount > 1000:
-        await callback_query.answer("Максимальная ставка: 1000$", show_alert=True)
+    game_type, bet_type, _ = await get_bet_state(callback_query, state)
+    if not game_type or not bet_type:
+        await callback_query.answer("Ошибка: не выбрана игра или тип ставки.", show_alert=True)
+        return
+    max_bet = exposure.max_bet(game_type, bet_type)
+    if new_amount > max_bet:
+        await callback_query.answer(f"Максимальная ставка: {max_bet:g}$", show_alert=True)
         return
     user = await db.get_user(callback_query.from_user.id)
     balance = user.get('balance', Decimal('0'))
     if balance < new_amount:
         await callback_query.answer("Недостаточно средств", show_alert=True)
         return
-    game_type, bet_type, _ = await get_bet_state(callback_query, state)
-    if not game_type or not bet_type:
-        await callback_query.answer("Ошибка: не выбрана игра или тип ставки.", show_alert=True)
-        return
     await state.update_data(last_bet_amount=new_amount, game_type=game_type, bet_type=bet_type)
-    keyboard = get_bet_keyboard(new_amount)
+    keyboard = get_bet_keyboard(new_amount, channel_url(channel_for(callback_query.from_user.id, game_type)))
     game_name_rus, bet_type_rus = get_russian_names(game_type, bet_type)
     await callback_query.message.edit_text(
         f"🔁 <b>Ставка увеличена!</b>\n\n"
@@ -2113,21 +2411,22 @@ async def increase_bet(callback_query: types.CallbackQuery, state: FSMContext):
 @dp.callback_query(lambda c: c.data.startswith("decrease_bet_"))
 async def decrease_bet(callback_query: types.CallbackQuery, state: FSMContext):
     try:
-        current_amount = Decimal(callback_query.data.split("_")[-1])
+        current_amount = Money(callback_query.data.split("_")[-1])
     except Exception:
         _, _, current_amount = await get_bet_state(callback_query, state)
         if not current_amount:
             current_amount = Decimal('1')
     new_amount = current_amount / 2
-    if new_amount < Decimal('0.3'):
-        await callback_query.answer("Минимальная ставка: 0.30$", show_alert=True)
-        return
     game_type, bet_type, _ = await get_bet_state(callback_query, state)
     if not game_type or not bet_type:
         await callback_query.answer("Ошибка: не выбрана игра или тип ставки.", show_alert=True)
         return
+    min_bet, _ = current_rules().limits(game_type)
+    if new_amount < min_bet:
+        await callback_query.answer(f"Минимальная ставка: {min_bet:.2f}$", show_alert=True)
+        return
     await state.update_data(last_bet_amount=new_amount, game_type=game_type, bet_type=bet_type)
-    keyboard = get_bet_keyboard(new_amount)
+    keyboard = get_bet_keyboard(new_amount, channel_url(channel_for(callback_query.from_user.id, game_type)))
     game_name_rus, bet_type_rus = get_russian_names(game_type, bet_type)
     await callback_query.message.edit_text(
         f"🔁 <b>Ставка уменьшена!</b>\n\n"
@@ -2146,7 +2445,7 @@ async def decrease_bet(callback_query: types.CallbackQuery, state: FSMContext):
 async def back_to_games(callback_query: types.CallbackQuery, state: FSMContext):
     games_text = (
         "🎮 <b>Выберите игру:</b>\n\n"
-        f"<b>После выбора игры и исхода ваша ставка сыграет в нашем <a href=\"https://t.me/+MglBkaT0amdlZGRi\">канале ставок</a>.</b>"
+        f"<b>После выбора игры и исхода ваша ставка сыграет в нашем <a href=\"{BETS_URL}\">канале ставок</a>.</b>"
     )
     msg = callback_query.message
     try:
@@ -2171,8 +2470,7 @@ async def check_messages(message: types.Message):
     if "отправил(а)" in message.text and "💬" in message.text:
         payment_data = parse_message(message)
         if payment_data:
-            payment_data.setdefault('is_bonus_bet', False)
-            await process_bet(payment_data)
+            await place_external_bet(payment_data, 'transfer')
     elif "пополнен на" in message.text and "USDT" in message.text:
         await crypto_pay.get_balance()
         admin_id = os.getenv("ADMIN_USER_ID")
@@ -2212,325 +2510,309 @@ async def handle_payment_notification(message: types.Message):
     amount_match = re.search(r'(\d+\.?\d*)\s*USDT', message.text)
     if not amount_match:
         return
-    amount = Decimal(amount_match.group(1))
+    amount = Money(amount_match.group(1))
     user_id = message.from_user.id
     if await db.get_bet_by_invoice(invoice_id):
         return
     await db.mark_invoice_processed(invoice_id, user_id)
     await process_successful_deposit(user_id, amount, invoice_id)
 
+LOSE_PHRASES = [
+    "без жертвы — нет победы",
+    "казино любит смелых",
+    "лудоман всегда в игре",
+    "ставка — путь к удаче",
+    "проиграл сегодня — выиграешь завтра",
+    "рискуй красиво — выигрывай громко",
+    "удача уже рядом",
+    "каждая ставка — новый шанс"
+]
+
 async def process_bet(data: dict):
     user_id = data.get('id')
-    queue_id = data.get('queue_id')
-    if user_id == LOGS_ID:
-        return
-    user_info = await bot.get_chat(user_id)
+    wager_id = data['wager_id']
+    user_info = await get_chat_info(user_id)
     username = user_info.username or user_info.full_name
     full_name = user_info.full_name
     await db.update_user(user_id, {"username": username, "full_name": full_name})
     data["name"] = full_name or username or f"User {user_id}"
-    raw_bonus_flag = data.get('is_bonus_bet')
-    try:
-        is_bonus_bet = bool(int(raw_bonus_flag))
-    except (TypeError, ValueError):
-        is_bonus_bet = bool(raw_bonus_flag)
     bot_username = await get_bot_username()
     user_link = f'<a href="https://t.me/{bot_username}?start=userstats_{user_id}">{sanitize_nickname(data["name"])}</a>'
-    game_classes = {
-        'cube': CubeGame, 'two_dice': TwoDiceGame, 'rock_paper_scissors': RockPaperScissorsGame,
-        'basketball': BasketballGame, 'darts': DartsGame, 'slots': SlotsGame, 'bowling': BowlingGame,
-        'football': FootballGame, 'custom': CustomEmojiGame
-    }
     game_type = data.get('game')
     bet_type = data.get('comment')
-    if game_type == 'custom':
-        game = CustomEmojiGame(Decimal(str(data['usd_amount'])), bet_type)
-        game_name_rus, bet_type_rus = get_russian_names(game_type, bet_type)
+    usd_amount = Money(data['usd_amount'])
+    # Ставка доигрывается по правилам той версии, по которой была принята
+    rules = await rules_for_version(data.get('rules_version'))
+    game = create_game(game_type, usd_amount, bet_type, rules)
+    game_name_rus, bet_type_rus = rules.display_names(game_type, bet_type)
+    # Ставки, созданные до появления пула каналов, играли в основном канале
+    channel_id = data.get('channel_id') or BETS_ID
+    if data.get('rounds'):
+        await process_series(data, rules, game, user_link, game_name_rus, bet_type_rus, channel_id)
+        return
+    # Под нагрузкой ставка показывается строкой в общей сводке: без анонса,
+    # пауз и видео, но кубики Telegram по-прежнему бросаются в канале
+    compact = digest_active()
+    bet_msg_id = data.get('message_id')
+    if bet_msg_id is None and not compact:
         bet_msg = await bot.send_message(
-            chat_id=BETS_ID,
-            text=(
-                f"<b>Принята новая ставка!</b>\n\n"
-                f"<blockquote>"
-                f"👤 <i>Игрок:</i> <b>{user_link}</b>\n"
-                f"💰 <i>Сумма:</i> <b>{data['usd_amount']:.2f} $</b>\n"
-                f"🕹️ <i>Игра:</i> <b>{game_name_rus}</b>\n"
-                f"✨ <i>Исход:</i> <b>{bet_type_rus}</b>\n\n"
-                f"<b>⌛️ Ставка обрабатывается...</b>"
-                f"</blockquote>"
-            ),
+            chat_id=channel_id,
+            text=render("bet_accepted", user_link=user_link, amount=usd_amount,
+                        game=game_name_rus, bet=bet_type_rus),
             parse_mode="HTML",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="⚡️ Сделать ставку", url=INVOICE_URL)]
-            ]),
+            reply_markup=BET_CHANNEL_KEYBOARD,
             disable_web_page_preview=True
         )
-        await bot.send_message(chat_id=BETS_ID, text=game.emoji, reply_to_message_id=bet_msg.message_id)
-        await asyncio.sleep(2)
-        win_value = game.win_value
-        coef = game.coef
-        chance = {2: 0.4, 3: 0.25, 5: 0.15, 10: 0.08, 20: 0.05, 30: 0.03, 50: 0.02, 100: 0.01}.get(coef, 0.01)
-        dice_value = win_value if random.random() < chance else random.choice([v for v in range(1, win_value + 1) if v != win_value])
-        result = await game.process(bet_type, dice_value)
-        await asyncio.sleep(2)
-        bot_username = await get_bot_username()
-        user_link = f'<a href="https://t.me/{bot_username}?start=userstats_{user_id}">{sanitize_nickname(data["name"])}</a>'
-        game_name_rus, _ = get_russian_names(game_type, bet_type)
-        if result.won:
-            win_amount = result.amount
-            message_text = (
-                f"🎰 <b>Победа!</b>\n"
-                f"<b>{user_link} выиграл {win_amount:.2f}$ в игре {game_name_rus}.</b>\n\n"
-                f"<blockquote><b>Выпало: {dice_value} из {game.coef}, нужно было: {game.win_value}</b></blockquote>\n\n"
-                f"{await links()}"
-            )
-        else:
-            message_text = (
-                f"🚫 <b>Поражение!</b>\n"
-                f"<b>{user_link} проиграл в игре {game_name_rus}.</b>\n\n"
-                f"<blockquote><b>Выпало: {dice_value} из {game.coef}, нужно было: {game.win_value}</b></blockquote>\n\n"
-                f"{await links()}"
-            )
-        await bot.send_video(
-            chat_id=BETS_ID,
-            video=types.FSInputFile("win.mp4") if result.won else types.FSInputFile("lose.mp4"),
-            caption=message_text,
-            parse_mode="HTML",
-            reply_to_message_id=bet_msg.message_id,
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="⚡️ Сделать ставку", url=INVOICE_URL)]
-            ])
-        )
-        if result.won:
-            wager_contribution = Decimal(str(data['usd_amount']))
-            await db.update_balance(data['id'], win_amount)
-            if is_bonus_bet:
-                await db.increase_bonus_balance(data['id'], win_amount)
-            await db.add_transaction(
-                user_id=data['id'],
-                amount=win_amount,
-                type='win',
-                game_type=game_type
-            )
-            await db.update_wagering_on_bet(data['id'], wager_contribution)
-            await bot.send_message(
-                chat_id=data['id'],
-                text=f"✅ <b>На ваш баланс зачислен выигрыш</b>\n💰 <b>Сумма: {win_amount:.2f}$</b>",
-                parse_mode="HTML"
-            )
+        bet_msg_id = bet_msg.message_id
+        if not await db.mark_wager_rolling(wager_id, BOT_INSTANCE_ID, bet_msg_id):
+            logging.warning(f"[BET_QUEUE] Аренда ставки {wager_id} потеряна, обработка прекращена")
+            return
+
+    # Исход: кубики Telegram бросаются сразу, потому что значение приходит
+    # только в ответе send_dice; у игр со случайным исходом показ уходит в presenter
+    reveal = []
+    dice_value = data.get('dice_value')
+    second_dice_value = data.get('second_dice_value')
+    if dice_value is None:
+        fair_seed = fair_nonce = None
+        if game_type == 'custom':
+            dice_value, fair_seed, fair_nonce = await fair_draw(user_id, bet_type, rules)
+            reveal = [
+                lambda: bot.send_message(chat_id=channel_id, text=game.emoji, reply_to_message_id=bet_msg_id),
+            ]
+        elif game_type == 'rock_paper_scissors':
+            dice_value, fair_seed, fair_nonce = await fair_draw(user_id, 'rock_paper_scissors', rules)
+            player_emoji = game.get_emoji(bet_type)
+            bot_emoji = game.choice_emoji(dice_value)
+            reveal = [
+                lambda: bot.send_message(chat_id=channel_id, text=player_emoji, reply_to_message_id=bet_msg_id),
+                lambda: asyncio.sleep(2),
+                lambda: bot.send_message(chat_id=channel_id, text=bot_emoji, reply_to_message_id=bet_msg_id),
+            ]
         else:
-            await db.remove_wagering_if_balance_negative(data['id'])
-        await db.mark_user_pending_bets_processed(user_id)
-        await db.mark_queue_bet_processed(queue_id)
-        await db.add_bet(
-            user_id=user_id,
-            amount=data['usd_amount'],
-            game_type=game_type,
-            bet_type=bet_type,
-            message_id=bet_msg.message_id,
-            is_bonus_bet=is_bonus_bet
-        )
-        try:
-            await process_bet_for_contests(user_id, Decimal(str(data['usd_amount'])))
-        except Exception as e:
-            logging.error(f"[CONTESTS] Ошибка process_bet_for_contests: {e}")
-        return
-    if game_type not in game_classes:
-        game_type, bet_type = parse_game_type_and_bet(data.get('comment', ''))
-    else:
-        bet_type = data.get('comment')
-    if not game_type or not bet_type:
-        await send_bet_error(BETS_ID, data['name'])
-        return
-    usd_amount = data.get('usd_amount', Decimal('0'))
-    if not isinstance(usd_amount, Decimal):
-        try:
-            usd_amount = Decimal(usd_amount)
-        except Exception:
-            usd_amount = Decimal('0')
-    await db.add_to_queue(user_id=user_id, amount=usd_amount, game=game_type, bet_type=bet_type, is_bonus_bet=False)
-    game_name_rus, bet_type_rus = get_russian_names(game_type, bet_type)
-    bet_msg = await bot.send_message(
-        chat_id=BETS_ID,
-        text=(
-            f"<b>Принята новая ставка!</b>\n\n"
-            f"<blockquote>"
-            f"👤 <i>Игрок:</i> <b>{user_link}</b>\n"
-            f"💰 <i>Сумма:</i> <b>{usd_amount:.2f} $</b>\n"
-            f"🕹️ <i>Игра:</i> <b>{game_name_rus}</b>\n"
-            f"✨ <i>Исход:</i> <b>{bet_type_rus}</b>\n\n"
-            f"<b>⌛️ Ставка обрабатывается...</b>"
-            f"</blockquote>"
-        ),
-        parse_mode="HTML",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="⚡️ Сделать ставку", url=INVOICE_URL)]
-        ]),
-        disable_web_page_preview=True
-    )
-    game = game_classes[game_type](usd_amount)
-    dice_value = None
-    second_dice_value = None
-    if game_type == 'rock_paper_scissors':
-        player_emoji = game.get_emoji(bet_type)
-        await bot.send_message(chat_id=BETS_ID, text=player_emoji, reply_to_message_id=bet_msg.message_id)
-        await asyncio.sleep(2)
-        bot_choice_value = random.randint(1, 3)
-        bot_emoji = game.BET_EMOJIS[{1: "камень", 2: "ножницы", 3: "бумага"}.get(bot_choice_value, "камень")]
-        await bot.send_message(chat_id=BETS_ID, text=bot_emoji, reply_to_message_id=bet_msg.message_id)
-        dice_value = bot_choice_value
-    elif game_type in {'basketball', 'darts', 'slots', 'bowling', 'football'}:
-        emoji_map = {'basketball': '🏀', 'darts': '🎯', 'slots': '🎰', 'bowling': '🎳', 'football': '⚽'}
-        dice_msg = await bot.send_dice(
-            chat_id=BETS_ID,
-            emoji=emoji_map[game_type],
-            reply_to_message_id=bet_msg.message_id
-        )
-        dice_value = dice_msg.dice.value
-        if game_type == 'bowling' and any(x in bet_type for x in ("боулпобеда", "боулпоражение", "боулингпобеда", "боулингпоражение", "победа", "поражение")):
-            await asyncio.sleep(2)
-            second_dice_msg = await bot.send_dice(
-                chat_id=BETS_ID,
-                emoji='🎳',
-                reply_to_message_id=bet_msg.message_id
-            )
-            second_dice_value = second_dice_msg.dice.value
-    else:
-        emoji = game.get_emoji(bet_type) if hasattr(game, 'get_emoji') else game.EMOJI
-        dice_msg = await bot.send_dice(
-            chat_id=BETS_ID,
-            emoji=emoji,
-            reply_to_message_id=bet_msg.message_id
-        )
-        dice_value = dice_msg.dice.value
-        if game_type == 'two_dice':
-            await asyncio.sleep(2)
-            second_dice_msg = await bot.send_dice(
-                chat_id=BETS_ID,
+            # Кубик Telegram с эмодзи игры; второй бросок — для ставок на два кубика и дуэлей
+            emoji = game.get_emoji(bet_type)
+            dice_msg = await bot.send_dice(
+                chat_id=channel_id,
                 emoji=emoji,
-                reply_to_message_id=bet_msg.message_id
+                reply_to_message_id=bet_msg_id
             )
-            second_dice_value = second_dice_msg.dice.value
-    if game_type == 'two_dice' or (game_type == 'bowling' and second_dice_value is not None):
-        result = await game.process(bet_type, dice_value, second_dice_value)
+            dice_value = dice_msg.dice.value
+            bet_spec = rules.lookup(game_type, bet_type)
+            if bet_spec is not None and bet_spec.dice == 2:
+                second_dice_msg = await bot.send_dice(
+                    chat_id=channel_id,
+                    emoji=emoji,
+                    reply_to_message_id=bet_msg_id
+                )
+                second_dice_value = second_dice_msg.dice.value
+        if not await db.record_wager_roll(wager_id, BOT_INSTANCE_ID, dice_value, second_dice_value,
+                                          fair_seed, fair_nonce):
+            logging.warning(f"[BET_QUEUE] Аренда ставки {wager_id} потеряна, обработка прекращена")
+            return
+        if compact:
+            reveal = []
+    # Текст GameResult здесь не нужен — подписи собираются из шаблонов ниже
+    outcome = dice_value if second_dice_value is None else (dice_value, second_dice_value)
+    legs = rules.legs(game_type, bet_type) or ()
+    if len(legs) > 1:
+        # Мульти-ставка: сумма делится поровну, все исходы считаются по одному броску
+        result = game.evaluate_multi([spec.bet for spec in legs], outcome)
+        legs_text = render("multi_legs", lines="\n".join(
+            render("multi_leg_win", bet=spec.name, amount=leg.amount, mult=leg.multiplier) if leg.won
+            else render("multi_leg_lose", bet=spec.name)
+            for spec, leg in zip(legs, result.legs)
+        ))
     else:
-        result = await game.process(bet_type, dice_value)
-    await asyncio.sleep(2)
-    referrer_id = await db.get_referrer(data['id'])
+        result = game.evaluate(bet_type, outcome)
+        legs_text = ""
+
+    # Расчёт: баланс, журнал и реферальная часть одной транзакцией
+    referrer_id = None
     ref_reward = None
+    if result.won and game_type != 'custom':
+        referrer_id = await db.get_referrer(user_id)
+        if referrer_id:
+            ref_reward = result.amount * REFERRAL_SHARE
+    settled = await db.settle_wager(
+        wager_id,
+        BOT_INSTANCE_ID,
+        dice_value=dice_value,
+        second_dice_value=second_dice_value,
+        won=result.won,
+        payout=result.amount,
+        referrer_id=referrer_id,
+        ref_reward=ref_reward
+    )
+    if not settled:
+        logging.warning(f"[BET_QUEUE] Ставка {wager_id} уже рассчитана или аренда потеряна, расчёт пропущен")
+        return
+    try:
+        await process_bet_for_contests(user_id, usd_amount)
+    except Exception as e:
+        logging.error(f"[CONTESTS] Ошибка process_bet_for_contests: {e}")
+
+    # Показ: канал и личные сообщения, с повторами независимо от расчёта
+    win_amount = result.amount
     ref_text = ""
-    if referrer_id and result.won:
-        ref_user = await db.get_user(referrer_id)
-        ref_display = None
-        if ref_user:
-            if ref_user.get('username'):
-                ref_display = f"@{ref_user['username']}"
-            elif ref_user.get('full_name'):
-                ref_display = sanitize_nickname(ref_user['full_name'])
-            else:
-                ref_display = f"ID {referrer_id}"
-        else:
-            ref_display = f"ID {referrer_id}"
-        ref_reward = result.amount * Decimal('0.15')
-        win_amount = result.amount * Decimal('0.85')
-        await db.update_ref_balance(referrer_id, ref_reward)
-        await bot.send_message(
+    steps = [] if compact else reveal + [lambda: asyncio.sleep(2)]
+    if ref_reward is not None:
+        ref_text = render("ref_cut", amount=ref_reward, referrer=await referrer_display(referrer_id))
+        steps.append(lambda: bot.send_message(
             chat_id=referrer_id,
-            text=f"💵 Ваш Реф.Баланс пополнен на <code>{ref_reward:.2f}$</code> из-за выигрыша <code>{sanitize_nickname(data['name'])}</code>",
+            text=render("ref_credited", amount=ref_reward, name=sanitize_nickname(data['name'])),
             parse_mode="HTML"
-        )
-        ref_text = f"\n<b>15% ({ref_reward:.2f}$) от выигрыша отправлено вашему рефереру: {ref_display}.</b>"
-    else:
-        win_amount = result.amount
-    lose_phrases = [
-        "без жертвы — нет победы",
-        "казино любит смелых",
-        "лудоман всегда в игре",
-        "ставка — путь к удаче",
-        "проиграл сегодня — выиграешь завтра",
-        "рискуй красиво — выигрывай громко",
-        "удача уже рядом",
-        "каждая ставка — новый шанс"
-    ]
+        ))
     if result.won:
-        win_amount = result.amount
-        wager_contribution = Decimal(str(data['usd_amount']))
-        await db.update_balance(data['id'], win_amount)
-        if is_bonus_bet:
-            await db.increase_bonus_balance(data['id'], win_amount)
-        await db.add_transaction(
-            user_id=data['id'],
-            amount=win_amount,
-            type='win',
-            game_type=game_type
-        )
-        await db.update_wagering_on_bet(data['id'], wager_contribution)
-        await bot.send_message(
-            chat_id=data['id'],
-            text=f"✅ <b>На ваш баланс зачислен выигрыш</b>\n💰 <b>Сумма: {win_amount:.2f}$</b>{ref_text}",
+        steps.append(lambda: bot.send_message(
+            chat_id=user_id,
+            text=render("win_credited", amount=win_amount, ref_text=ref_text),
             parse_mode="HTML"
+        ))
+    if compact:
+        value = dice_value if second_dice_value is None else f"{dice_value} и {second_dice_value}"
+        add_to_digest(channel_id, wager_id, render(
+            "digest_win" if result.won else "digest_lose",
+            user_link=user_link, game=game_name_rus, bet=bet_type_rus, amount=usd_amount,
+            payout=win_amount, outcome=render("digest_outcome", value=value)
+        ))
+        present(f"ставка {wager_id}", steps)
+        return
+    if game_type == 'custom':
+        message_text = render(
+            "custom_win" if result.won else "custom_lose",
+            user_link=user_link, amount=win_amount, game=game_name_rus,
+            value=dice_value, coef=game.coef, win_value=game.win_value
         )
-        bot_username = (await bot.get_me()).username
-        bot_link = f"https://t.me/{bot_username}"
-        if win_amount < usd_amount:
-            message_text = (
-                f"🤝 <b>Ничья</b>!\n"
-                f"<b>{user_link} выиграл {win_amount:.2f}$ в игре {game_name_rus}.</b>\n\n"
-                f"<blockquote><b>⚡️ Его выигрыш с комиссией 30 процентов зачислен на баланс в <a href='{bot_link}'>боте</a>.</b></blockquote>\n\n"
-                f"{await links()}"
-            )
-        else:
-            message_text = (
-                f"🎰 <b>Победа!</b>\n"
-                f"<b>{user_link} выиграл {win_amount:.2f}$ в игре {game_name_rus}.</b>\n\n"
-                f"<blockquote><b>⚡️ Его выигрыш зачислен на баланс в <a href='{bot_link}'>боте</a>.</b></blockquote>\n\n"
-                f"{await links()}"
-            )
-        await bot.send_video(
-            chat_id=BETS_ID,
-            video=types.FSInputFile("win.mp4"),
-            caption=message_text,
-            parse_mode="HTML",
-            reply_to_message_id=bet_msg.message_id,
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="⚡️ Сделать ставку", url=INVOICE_URL)]
-            ])
+    elif result.won:
+        message_text = render(
+            "bet_draw" if win_amount < usd_amount else "bet_win",
+            user_link=user_link, amount=win_amount, game=game_name_rus,
+            bot_link=f"https://t.me/{bot_username}"
         )
     else:
-        random_phrase = random.choice(lose_phrases)
-        bot_username = await get_bot_username()
-        user_link = f'<a href="https://t.me/{bot_username}?start=userstats_{user_id}">{sanitize_nickname(data["name"])}</a>'
-        game_name_rus, _ = get_russian_names(game_type, bet_type)
-        message_text = (
-            f"🚫 <b>Поражение!</b>\n"
-            f"<b>{user_link} проиграл в игре {game_name_rus}.</b>\n\n"
-            f"<blockquote><b>😔 Не расстраивайся, {random_phrase}.</b></blockquote>\n\n"
-            f"{await links()}"
-        )
-        await bot.send_video(
-            chat_id=BETS_ID,
-            video=types.FSInputFile("lose.mp4"),
-            caption=message_text,
+        message_text = render("bet_lose", user_link=user_link, game=game_name_rus,
+                              phrase=random.choice(LOSE_PHRASES))
+    message_text += legs_text
+
+    async def post_result():
+        result_msg = await send_media(
+            bot.send_video, "win.mp4" if result.won else "lose.mp4",
+            chat_id=channel_id,
+            caption=render("result_caption", text=message_text, links=LINKS),
             parse_mode="HTML",
-            reply_to_message_id=bet_msg.message_id,
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="⚡️ Сделать ставку", url=INVOICE_URL)]
-            ])
+            reply_to_message_id=bet_msg_id,
+            reply_markup=BET_CHANNEL_KEYBOARD
         )
-    await db.mark_user_pending_bets_processed(user_id)
-    await db.mark_queue_bet_processed(queue_id)
-    await db.add_bet(
-        user_id=user_id,
-        amount=usd_amount,
-        game_type=game_type,
-        bet_type=bet_type,
-        message_id=bet_msg.message_id,
-        is_bonus_bet=is_bonus_bet
+        await db.set_wager_result_message(wager_id, result_msg.message_id)
+
+    steps.append(post_result)
+    present(f"ставка {wager_id}", steps)
+
+async def referrer_display(referrer_id: int) -> str:
+    ref_user = await db.get_user(referrer_id)
+    if ref_user and ref_user.get('username'):
+        return f"@{ref_user['username']}"
+    if ref_user and ref_user.get('full_name'):
+        return sanitize_nickname(ref_user['full_name'])
+    return f"ID {referrer_id}"
+
+async def process_series(data: dict, rules, game, user_link: str, game_name_rus: str, bet_type_rus: str,
+                         channel_id: int):
+    """Серия автоставок: исходы всех раундов берутся одним блоком из цепочки сидов
+    и считаются пакетом, затем серия обрезается по стоп-лоссу или тейк-профиту.
+    Резерв несыгранных раундов возвращается тем же расчётом."""
+    user_id = data['id']
+    wager_id = data['wager_id']
+    game_type = data.get('game')
+    bet_type = data.get('comment')
+    rounds = data['rounds']
+    stake = Money(data['usd_amount']) / rounds
+    legs = rules.legs(game_type, bet_type) or ()
+    bets = [spec.bet for spec in legs] or [bet_type]
+    dice = legs[0].dice if legs else 1
+    game_key = bets[0] if game_type == 'custom' else game_type
+
+    if data.get('outcomes'):
+        values = [int(v) for v in data['outcomes'].split(',')]
+    else:
+        values, fair_seed, fair_nonce = await fairness.draw_series(user_id, game_key, rounds * dice, rules)
+        if not await db.record_wager_roll(wager_id, BOT_INSTANCE_ID, None, None, fair_seed, fair_nonce,
+                                          outcomes=",".join(map(str, values))):
+            logging.warning(f"[BET_QUEUE] Аренда серии {wager_id} потеряна, обработка прекращена")
+            return
+    outcomes = [tuple(values[i:i + dice]) for i in range(0, rounds * dice, dice)]
+    # Все раунды и исходы мульти-ставки — один пакетный расчёт
+    leg_stake = stake / len(bets)
+    evaluations = game.evaluate_many(
+        [(bet, leg_stake) for _ in outcomes for bet in bets],
+        (outcome for outcome in outcomes for _ in bets)
+    )
+
+    stop_loss = data.get('stop_loss')
+    take_profit = data.get('take_profit')
+    payout = net = ZERO
+    played = wins = 0
+    reason = ""
+    for i in range(rounds):
+        round_payout = sum((e.amount for e in evaluations[i * len(bets):(i + 1) * len(bets)]), ZERO)
+        played += 1
+        wins += round_payout > 0
+        payout += round_payout
+        net += round_payout - stake
+        if stop_loss and net <= -stop_loss:
+            reason = render("autobet_reason_stop")
+            break
+        if take_profit and net >= take_profit:
+            reason = render("autobet_reason_take")
+            break
+    refund = stake * (rounds - played)
+
+    referrer_id = None
+    ref_reward = None
+    if payout and game_type != 'custom':
+        referrer_id = await db.get_referrer(user_id)
+        if referrer_id:
+            ref_reward = payout * REFERRAL_SHARE
+    settled = await db.settle_wager(
+        wager_id, BOT_INSTANCE_ID, dice_value=None, second_dice_value=None, won=bool(payout), payout=payout,
+        referrer_id=referrer_id, ref_reward=ref_reward, refund=refund, rounds_played=played
     )
+    if not settled:
+        logging.warning(f"[BET_QUEUE] Серия {wager_id} уже рассчитана или аренда потеряна, расчёт пропущен")
+        return
     try:
-        await process_bet_for_contests(user_id, usd_amount)
+        await process_bet_for_contests(user_id, stake * played)
     except Exception as e:
         logging.error(f"[CONTESTS] Ошибка process_bet_for_contests: {e}")
 
+    ref_text = ""
+    steps = []
+    if ref_reward is not None:
+        ref_text = render("ref_cut", amount=ref_reward, referrer=await referrer_display(referrer_id))
+        steps.append(lambda: bot.send_message(
+            chat_id=referrer_id,
+            text=render("ref_credited", amount=ref_reward, name=sanitize_nickname(data['name'])),
+            parse_mode="HTML"
+        ))
+    summary = render(
+        "autobet_summary", reason=reason, game=game_name_rus, bet=bet_type_rus, played=played,
+        rounds=rounds, wins=wins, staked=stake * played, payout=payout, net=net,
+        refund_text=render("autobet_refund", amount=refund) if refund else "", ref_text=ref_text
+    )
+    steps.append(lambda: bot.send_message(chat_id=user_id, text=summary, parse_mode="HTML"))
+    if data.get('announce'):
+        line = render("autobet_channel", user_link=user_link, game=game_name_rus, bet=bet_type_rus,
+                      played=played, stake=stake, payout=payout)
+        if digest_active():
+            add_to_digest(channel_id, wager_id, line)
+        else:
+            steps.append(lambda: bot.send_message(
+                chat_id=channel_id, text=line, parse_mode="HTML",
+                reply_markup=BET_CHANNEL_KEYBOARD, disable_web_page_preview=True
+            ))
+    present(f"серия {wager_id}", steps)
+
 async def check_paid_invoices():
     while True:
         invoices_data = await crypto_pay.get_invoices(status="paid", asset="USDT", count=100)
@@ -2550,7 +2832,7 @@ async def check_paid_invoices():
             if payload and 'admintopup' in payload:
                 await db.mark_invoice_processed(str(invoice_id), 0)
                 continue
-            amount = Decimal(invoice.get('amount', '0'))
+            amount = Money(invoice.get('amount', '0'))
             if amount <= 0:
                 continue
             user_id = None
@@ -2567,12 +2849,11 @@ async def check_paid_invoices():
             await db.mark_invoice_processed(str(invoice_id), user_id)
             bet_data = None
             if payload and not payload.startswith("deposit_"):
-                user_info = await bot.get_chat(user_id)
+                user_info = await get_chat_info(user_id)
                 full_name = user_info.full_name
                 bet_data = parse_invoice_payload(payload, user_id, amount, full_name)
             if bet_data:
-                bet_data.setdefault('is_bonus_bet', False)
-                await process_bet(bet_data)
+                await place_external_bet(bet_data, 'invoice')
             else:
                 await db.mark_invoice_processed(str(invoice_id), user_id)
                 await process_successful_deposit(user_id, amount, str(invoice_id))
@@ -2589,11 +2870,32 @@ async def main():
         types.BotCommand(command="ref", description="👥 Реферальная система"),
         types.BotCommand(command="wallet", description="💰 Кошелек"),
         types.BotCommand(command="games", description="🎲 Сделать ставку"),
-        types.BotCommand(command="checks", description="🧾 Чеки")
+        types.BotCommand(command="checks", description="🧾 Чеки"),
+        types.BotCommand(command="fair", description="🔐 Проверка честности")
     ])
+    outbound = OutboundScheduler(
+        global_rate=OUTBOUND_GLOBAL_RATE,
+        group_per_minute=OUTBOUND_GROUP_PER_MINUTE
+    )
+    bot.session.middleware(outbound)
     await db.init()
-    await db.clear_all_pending_bets()
+    await init_rules(db, GAME_RULES_PATH)
+    asyncio.create_task(rules_loop(RULES_RELOAD_SECONDS))
+    await init_exposure(db, crypto_pay, EXPOSURE_TREASURY_SHARE, EXPOSURE_GAME_SHARE, EXPOSURE_REFRESH_SECONDS)
+    asyncio.create_task(exposure_loop())
+    await init_fairness(db, load_secret(FAIR_SECRET, FAIR_SECRET_FILE), FAIR_REVEAL_DELAY)
+    init_chat_cache(bot, CHAT_CACHE_TTL)
+    await init_media(db)
+    init_channels(BETS_ID, BETS_URL, BETS_IDS, BETS_URLS, BETS_GAME_CHANNELS)
+    init_presenter(BET_WORKERS)
+    init_bet_queue(run_wager, BET_WORKERS, db=db, owner=BOT_INSTANCE_ID, lease_seconds=BET_LEASE_SECONDS)
+    start_workers()
+    asyncio.create_task(lease_loop())
+    init_digest(bot, db, outbound, DIGEST_ENTER_DEPTH, DIGEST_EXIT_DEPTH, DIGEST_FLUSH_SECONDS,
+                footer=LINKS, reply_markup=BET_CHANNEL_KEYBOARD)
+    asyncio.create_task(digest_loop())
     dp.errors.register(handle_blocked_by_user, F.exception.is_(aiogram.exceptions.TelegramForbiddenError))
+    dp.update.middleware(ChatCacheMiddleware())
     dp.update.middleware(SubscriptionMiddleware(db=db))
     admin.init(bot, dp, db, crypto_pay, LOGS_ID, SUPPORT_LINK)
     
@@ -2606,6 +2908,8 @@ async def main():
     except Exception as e:
         logging.error(f"[MAIN] Ошибка инициализации модуля конкурсов: {e}", exc_info=True)
     
+    init_backups(db.db_path, BACKUP_DIR, BACKUP_KEEP, BACKUP_INTERVAL_HOURS)
+    asyncio.create_task(backup_schedule())
     asyncio.create_task(check_paid_invoices())
     await dp.start_polling(bot)
 
@@ -2622,15 +2926,14 @@ async def generate_leaderboard_view(category: str, period: str):
     title += f" {period_map.get(period, '')}:"
     medals = ['🥇', '🥈', '🥉']
     leaderboard_text = ""
-    for i, user_data in enumerate(data_list[:3] if data_list else []):
-        user_id = user_data.get('user_id') or user_data.get('referrer_id')
+    top = data_list[:3] if data_list else []
+    user_ids = [user_data.get('user_id') or user_data.get('referrer_id') for user_data in top]
+    infos = await asyncio.gather(*(get_chat_info(user_id) for user_id in user_ids), return_exceptions=True)
+    for i, (user_data, user_id, user_info) in enumerate(zip(top, user_ids, infos)):
         username = user_data.get('username') or f"User {user_id}"
-        try:
-            user_info = await bot.get_chat(user_id)
+        if not isinstance(user_info, BaseException):
             username = user_info.full_name
-        except Exception:
-            pass
-        value = f"{Decimal(user_data.get('total_turnover', '0')):.2f} $" if category == 'turnover' else f"{user_data.get('referral_count', 0)} чел."
+        value = f"{Money(user_data.get('total_turnover', '0')):.2f} $" if category == 'turnover' else f"{user_data.get('referral_count', 0)} чел."
         leaderboard_text += f"{medals[i]} <a href=\"https://t.me/{bot_username}?start=userstats_{user_id}\">{sanitize_nickname(username)}</a> - <b>{value}</b>\n"
     if not leaderboard_text:
         leaderboard_text = "<i>Никого нет в топе. Будьте первым!</i>"
@@ -2714,10 +3017,10 @@ async def handle_inline_query(inline_query: types.InlineQuery):
             return
         bot_username = await get_bot_username()
         check_link = f"https://t.me/{bot_username}?start=check_{query}"
-        amount = Decimal(str(check['amount']))
+        amount = Money(check['amount'])
         if check.get('is_multi'):
             activations_total = int(check.get('activations_total', 1))
-            amount_per_user = amount / Decimal(str(activations_total))
+            amount_per_user = amount / Decimal(activations_total)
             title = f"👨‍👩‍👧‍👦 Мульти-чек на {activations_total} по {amount_per_user:.2f}$"
             description = f"Осталось активаций: {activations_total}"
             message_text = f"<b>👨‍👩‍👧‍👦 Мульти-чек на {activations_total} по {amount_per_user:.2f}$</b>"
@@ -2762,7 +3065,7 @@ async def handle_inline_query(inline_query: types.InlineQuery):
     amount_str = parts[0].replace(',', '.')
     amount = None
     try:
-        amount = Decimal(amount_str)
+        amount = Money(amount_str)
     except Exception:
         return
     check_type = 'public'
@@ -2788,8 +3091,8 @@ async def handle_inline_query(inline_query: types.InlineQuery):
     if not user:
         await db.create_user(user_id, inline_query.from_user.full_name, inline_query.from_user.full_name)
         user = await db.get_user(user_id)
-    balance = Decimal(str(user.get('balance', 0) or 0))
-    bonus_locked = Decimal(str(user.get('bonus_balance', 0) or 0))
+    balance = Money(user.get('balance'))
+    bonus_locked = Money(user.get('bonus_balance'))
     clean_balance = max(balance - bonus_locked, Decimal('0'))
     if amount <= 0 or amount > clean_balance:
         if amount > clean_balance:
@@ -2872,7 +3175,7 @@ async def handle_chosen_inline_result(chosen_result: types.ChosenInlineResult):
         return
     amount_str = parts[0].replace(',', '.')
     try:
-        amount = Decimal(amount_str)
+        amount = Money(amount_str)
     except Exception:
         return
     check_type = 'public'
@@ -2897,8 +3200,8 @@ async def handle_chosen_inline_result(chosen_result: types.ChosenInlineResult):
     user = await db.get_user(user_id)
     if not user:
         return
-    balance = Decimal(str(user.get('balance', 0) or 0))
-    bonus_locked = Decimal(str(user.get('bonus_balance', 0) or 0))
+    balance = Money(user.get('balance'))
+    bonus_locked = Money(user.get('bonus_balance'))
     if bonus_locked > 0:
         return
     if amount > balance:
@@ -3016,10 +3319,10 @@ async def process_set_wagering(message: types.Message, state: FSMContext):
     update_data = {"wagering_multiplier": wagering}
     if wagering > 0:
         if not check.get("cashed_by_id"):
-            amount = Decimal(str(check["amount"]))
+            amount = Money(check["amount"])
             if check.get("is_multi"):
                 activations_total = int(check.get("activations_total", 1))
-                amount = amount / Decimal(str(activations_total))
+                amount = amount / Decimal(activations_total)
             update_data["wagering_left"] = amount
     else:
         update_data["wagering_left"] = 0
@@ -3127,7 +3430,7 @@ async def process_set_turnover(message: types.Message, state: FSMContext):
     menu_message_id = data.get('menu_message_id')
     inline_message_id = data.get('inline_message_id')
     try:
-        turnover = Decimal(message.text.strip().replace(',', '.'))
+        turnover = Money(message.text.strip().replace(',', '.'))
     except Exception:
         await message.answer(INVALID_AMOUNT_FORMAT_MSG)
         return
@@ -3210,8 +3513,8 @@ async def bonus_program(callback_query: types.CallbackQuery, state: FSMContext):
     user_id = callback_query.from_user.id
     user = await db.get_user(user_id)
     stats = await db.get_user_stats(user_id)
-    current_turnover = Decimal(str(stats.get('turnover', '0')))
-    last_claimed = Decimal(str(user.get('last_claimed_turnover', '0')))
+    current_turnover = Money(stats.get('turnover', '0'))
+    last_claimed = Money(user.get('last_claimed_turnover', '0'))
     unclaimed_turnover = current_turnover - last_claimed
     bonus_milestones = int(unclaimed_turnover // Decimal('1000'))
     available_bonus = Decimal(bonus_milestones) * Decimal('7.5')
@@ -3238,8 +3541,8 @@ async def claim_bonus(callback_query: types.CallbackQuery, state: FSMContext):
     user_id = callback_query.from_user.id
     user = await db.get_user(user_id)
     stats = await db.get_user_stats(user_id)
-    current_turnover = Decimal(str(stats.get('turnover', '0')))
-    last_claimed = Decimal(str(user.get('last_claimed_turnover', '0')) if user.get('last_claimed_turnover') is not None else '0')
+    current_turnover = Money(stats.get('turnover', '0'))
+    last_claimed = Money(user.get('last_claimed_turnover'))
     new_last_claimed = (current_turnover // Decimal('1000')) * Decimal('1000')
     bonus_milestones = int((new_last_claimed - last_claimed) // Decimal('1000'))
     if bonus_milestones <= 0:
@@ -3253,8 +3556,8 @@ async def claim_bonus(callback_query: types.CallbackQuery, state: FSMContext):
     await state.clear()
     user = await db.get_user(user_id)
     stats = await db.get_user_stats(user_id)
-    current_turnover = Decimal(str(stats.get('turnover', '0')))
-    last_claimed = Decimal(str(user.get('last_claimed_turnover', '0')))
+    current_turnover = Money(stats.get('turnover', '0'))
+    last_claimed = Money(user.get('last_claimed_turnover', '0'))
     unclaimed_turnover = current_turnover - last_claimed
     bonus_milestones = int(unclaimed_turnover // Decimal('1000'))
     available_bonus = Decimal(bonus_milestones) * Decimal('7.5')
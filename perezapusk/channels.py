@@ -0,0 +1,67 @@
+import bisect
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+# Эти переменные будут установлены при инициализации
+PRIMARY_ID = None
+PRIMARY_URL = None
+
+_urls: Dict[int, str] = {}
+_by_game: Dict[str, int] = {}
+_ring: List[Tuple[int, int]] = []
+_points: List[int] = []
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+def init_channels(primary_id: int, primary_url: str, channel_ids: Optional[List[int]] = None,
+                  urls: Optional[List[str]] = None,
+                  game_channels: Optional[Dict[str, Tuple[int, Optional[str]]]] = None,
+                  replicas: int = 64):
+    """Инициализация пула каналов ставок.
+
+    Конкурсы остаются в основном канале; ставки распределяются по пулу:
+    игра с закреплённым каналом идёт туда, остальные — по хешу игрока.
+    game_channels — игра: (канал, ссылка); ссылку можно не указывать, если канал
+    есть в пуле. Канал без ссылки — ошибка конфигурации: игрок ушёл бы не в тот канал."""
+    global PRIMARY_ID, PRIMARY_URL, _ring, _points
+    PRIMARY_ID = primary_id
+    PRIMARY_URL = primary_url
+    pool = list(dict.fromkeys(channel_ids or [primary_id]))
+    _urls.clear()
+    _urls[primary_id] = primary_url
+    for channel_id, url in zip(pool, urls or []):
+        _urls[channel_id] = url
+    _by_game.clear()
+    for game, (channel_id, url) in (game_channels or {}).items():
+        if url:
+            _urls[channel_id] = url
+        _by_game[game] = channel_id
+    missing = sorted({channel_id for channel_id in [*pool, *_by_game.values()] if channel_id not in _urls})
+    if missing:
+        raise ValueError(f"нет ссылок на каналы ставок {missing}: задайте их в BETS_URLS или BETS_GAME_CHANNELS")
+    # Кольцо с виртуальными узлами: при добавлении канала переезжает
+    # только часть игроков, а не все
+    _ring = sorted((_hash(f"{channel_id}:{i}"), channel_id) for channel_id in pool for i in range(replicas))
+    _points = [point for point, _ in _ring]
+    logging.info(f"[CHANNELS] Каналов ставок: {len(pool)}, закреплено игр: {len(_by_game)}")
+
+
+def channel_for(user_id: int, game: Optional[str] = None) -> int:
+    """Канал, в котором играют ставки игрока на игру game."""
+    channel_id = _by_game.get(game)
+    if channel_id is not None:
+        return channel_id
+    if not _ring:
+        return PRIMARY_ID
+    index = bisect.bisect(_points, _hash(str(user_id))) % len(_ring)
+    return _ring[index][1]
+
+
+def channel_url(channel_id: int) -> str:
+    """Ссылка на канал; канал не из конфигурации (например, у старой ставки) —
+    ссылка на основной."""
+    return _urls.get(channel_id, PRIMARY_URL)
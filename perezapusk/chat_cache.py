@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Эти переменные будут установлены при инициализации
+bot = None
+TTL = 600.0
+MAX_SIZE = 10000
+
+_cache: "OrderedDict[int, Tuple[float, ChatInfo]]" = OrderedDict()
+_inflight: Dict[int, asyncio.Future] = {}
+
+
+class ChatInfo:
+    __slots__ = ("id", "username", "full_name")
+
+    def __init__(self, chat_id: int, username: Optional[str], full_name: Optional[str]):
+        self.id = chat_id
+        self.username = username
+        self.full_name = full_name
+
+
+def init_chat_cache(bot_instance, ttl: float = 600.0, max_size: int = 10000):
+    """Инициализация кеша get_chat"""
+    global bot, TTL, MAX_SIZE
+    bot = bot_instance
+    TTL = ttl
+    MAX_SIZE = max_size
+
+
+def _store(info: ChatInfo):
+    _cache[info.id] = (time.monotonic() + TTL, info)
+    _cache.move_to_end(info.id)
+    while len(_cache) > MAX_SIZE:
+        _cache.popitem(last=False)
+
+
+def remember_user(user) -> None:
+    """Обновляет кеш по from_user входящего апдейта."""
+    _store(ChatInfo(user.id, user.username, user.full_name))
+
+
+async def _fetch(chat_id: int, future: asyncio.Future):
+    try:
+        chat = await bot.get_chat(chat_id)
+        info = ChatInfo(chat.id, chat.username, chat.full_name)
+        _store(info)
+        future.set_result(info)
+    except Exception as e:
+        future.set_exception(e)
+        # Исключение забирается здесь, чтобы не было предупреждения, если ждущих нет
+        future.exception()
+    finally:
+        _inflight.pop(chat_id, None)
+
+
+async def get_chat_info(chat_id: int) -> ChatInfo:
+    """bot.get_chat с кешем: одновременные запросы одного чата идут в Telegram одним вызовом."""
+    entry = _cache.get(chat_id)
+    if entry and entry[0] > time.monotonic():
+        _cache.move_to_end(chat_id)
+        return entry[1]
+    future = _inflight.get(chat_id)
+    if future is None:
+        future = asyncio.get_running_loop().create_future()
+        _inflight[chat_id] = future
+        asyncio.create_task(_fetch(chat_id, future))
+    try:
+        return await asyncio.shield(future)
+    except Exception:
+        if entry:
+            # Telegram недоступен — лучше устаревшее имя, чем ошибка
+            logging.warning(f"[CHAT_CACHE] get_chat({chat_id}) не удался, используется устаревшая запись")
+            return entry[1]
+        raise
@@ -2,6 +2,10 @@ import logging
 import asyncio
 from datetime import datetime, timedelta
 from decimal import Decimal
+from functools import lru_cache
+
+from money import Money
+from middlewares.outbound import CONTEST, priority
 
 from aiogram import types, Router, F
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
@@ -32,7 +36,7 @@ def create_contest_types_keyboard():
     ])
 
 def get_prizes_list(prize_total, count):
-    prize_total = Decimal(prize_total)
+    prize_total = Money(prize_total)
     if count == 1:
         return [prize_total]
     if count == 2:
@@ -54,9 +58,9 @@ def get_prizes_list(prize_total, count):
         p4 = (prize_total * Decimal('0.12')).quantize(Decimal('1.'))
         return [p1, p2, p3, p4, prize_total - p1 - p2 - p3 - p4]
     base = []
-    percents = [0.35, 0.25, 0.18, 0.12, 0.10]
+    percents = [Decimal('0.35'), Decimal('0.25'), Decimal('0.18'), Decimal('0.12'), Decimal('0.10')]
     for i in range(min(count, 5)):
-        base.append((prize_total * Decimal(str(percents[i]))).quantize(Decimal('1.')))
+        base.append((prize_total * percents[i]).quantize(Decimal('1.')))
     rest = prize_total - sum(base)
     rest_count = count - 5
     if rest_count > 0:
@@ -124,8 +128,10 @@ async def format_contest_message(db, contest: dict) -> str:
     return message
 
 async def get_contest_keyboard(contest: dict) -> InlineKeyboardMarkup:
-    contest_id = contest.get('id')
-    is_completed = contest.get('status') == 'completed'
+    return _contest_keyboard(contest.get('id'), contest.get('status') == 'completed')
+
+@lru_cache(maxsize=256)
+def _contest_keyboard(contest_id, is_completed: bool) -> InlineKeyboardMarkup:
     buttons = [
         [InlineKeyboardButton(text="🏛 Сделать ставку", url=INVOICE_URL)],
         [InlineKeyboardButton(text="🎲 Сделать ставку через бота", url="https://t.me/CasinoDepovBot?start=games")],
@@ -150,25 +156,26 @@ async def update_contest_message(contest_id: int):
         message_text = await format_contest_message(db, contest)
         keyboard = await get_contest_keyboard(contest)
         
-        try:
-            await bot.edit_message_caption(
-                chat_id=BETS_ID,
-                message_id=contest.get("channel_message_id"),
-                caption=message_text,
-                reply_markup=keyboard,
-                parse_mode="HTML"
-            )
-        except Exception:
+        with priority(CONTEST):
             try:
-                await bot.edit_message_text(
-                    message_text,
+                await bot.edit_message_caption(
                     chat_id=BETS_ID,
                     message_id=contest.get("channel_message_id"),
+                    caption=message_text,
                     reply_markup=keyboard,
                     parse_mode="HTML"
                 )
-            except Exception as e:
-                logging.error(f"[CONTESTS] Ошибка обновления сообщения конкурса #{contest_id}: {e}")
+            except Exception:
+                try:
+                    await bot.edit_message_text(
+                        message_text,
+                        chat_id=BETS_ID,
+                        message_id=contest.get("channel_message_id"),
+                        reply_markup=keyboard,
+                        parse_mode="HTML"
+                    )
+                except Exception as e:
+                    logging.error(f"[CONTESTS] Ошибка обновления сообщения конкурса #{contest_id}: {e}")
     except Exception as e:
         logging.error(f"[CONTESTS] Критическая ошибка в update_contest_message: {e}", exc_info=True)
 
@@ -204,7 +211,7 @@ async def check_contests_schedule():
                     
                     # Получаем участников и призы
                     participants = await db.get_contest_participants(contest_id, top_limit)
-                    prize = Decimal(contest.get('prize'))
+                    prize = Money(contest.get('prize'))
                     winners_count = min(top_limit, len(participants))
                     winners = participants[:winners_count] if winners_count > 0 else []
                     prizes = get_prizes_list(prize, winners_count) if winners_count > 0 else []
@@ -264,7 +271,7 @@ async def check_contests_schedule():
         
         await asyncio.sleep(60)
 
-async def process_bet_for_contests(user_id: int, amount: Decimal):
+async def process_bet_for_contests(user_id: int, amount: Money):
     """Обрабатывает ставку для всех активных конкурсов"""
     if not db:
         return
@@ -277,7 +284,7 @@ async def process_bet_for_contests(user_id: int, amount: Decimal):
                 contest_type = contest.get('type')
                 
                 # Обновляем участие в конкурсе
-                await db.update_contest_participant(contest_id, user_id, float(amount), contest_type)
+                await db.update_contest_participant(contest_id, user_id, Money(amount), contest_type)
                 
                 logging.debug(f"[CONTESTS] Ставка {amount}$ от пользователя {user_id} обработана для конкурса #{contest_id}")
             except Exception as e:
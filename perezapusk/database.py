@@ -1,9 +1,16 @@
 import aiosqlite
 import os
+import time
+from contextlib import asynccontextmanager
 from decimal import Decimal
 from typing import Optional, List, Dict
 import logging
 from cryptopay import CryptoPayAPI
+from querylog import ProfiledConnection, SlowQueryLog
+from money import Money, ZERO
+from records import (
+    records, user_records, check_records, wager_records, contest_records, participant_records
+)
 import sqlite3
 
 
@@ -33,16 +40,31 @@ class CheckPermissionError(DatabaseError):
 def adapt_decimal(d: Decimal) -> str:
     return str(d)
 
-def convert_decimal(b: bytes) -> Decimal:
-    return Decimal(b.decode())
+def convert_decimal(b: bytes) -> Money:
+    return Money(b.decode())
 
 aiosqlite.register_adapter(Decimal, adapt_decimal)
+aiosqlite.register_adapter(Money, adapt_decimal)
 aiosqlite.register_converter("DECIMAL", convert_decimal)
 
 class Database:
-    def __init__(self, db_path: str = "database.db"):
+    def __init__(self, db_path: str = "database.db", slow_query_ms: Optional[float] = None,
+                 slow_query_log: Optional[str] = None):
         self.db_path = db_path
         self.connect_params = {"detect_types": sqlite3.PARSE_DECLTYPES}
+        if slow_query_ms is None:
+            slow_query_ms = float(os.getenv('SLOW_QUERY_MS', '100'))
+        self.slow_log = None
+        if slow_query_ms > 0:
+            self.slow_log = SlowQueryLog(
+                slow_query_ms,
+                slow_query_log or os.getenv('SLOW_QUERY_LOG', 'slow_queries.log')
+            )
+
+    @asynccontextmanager
+    async def _connect(self):
+        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+            yield ProfiledConnection(db, self.slow_log) if self.slow_log else db
 
     async def _get_clean_balance_snapshot(self, db, user_id: int):
         async with db.execute(
@@ -52,15 +74,15 @@ class Database:
             row = await cursor.fetchone()
         if not row:
             return None, None, None
-        balance = Decimal(str(row[0]))
-        locked = Decimal(str(row[1] or 0))
+        balance = Money(row[0])
+        locked = Money(row[1])
         clean_balance = balance - locked
         if clean_balance < Decimal('0'):
             clean_balance = Decimal('0')
         return balance, locked, clean_balance
 
     async def _apply_bonus_lock_in_tx(self, db, user_id: int, amount: Decimal, multiplier: Decimal) -> Decimal:
-        amount = Decimal(str(amount))
+        amount = Money(amount)
         multiplier = Decimal(str(multiplier))
         if amount <= 0 or multiplier <= 0:
             return Decimal('0')
@@ -91,7 +113,7 @@ class Database:
             )
 
     async def _consume_bonus_wager_in_tx(self, db, user_id: int, bet_amount: Decimal):
-        bet_amount = Decimal(str(bet_amount))
+        bet_amount = Money(bet_amount)
         if bet_amount <= 0:
             return
         async with db.execute(
@@ -101,7 +123,7 @@ class Database:
             row = await cursor.fetchone()
         if not row:
             return
-        left = Decimal(str(row[0] or '0'))
+        left = Money(row[0])
         if left <= 0:
             return
         new_left = left - bet_amount
@@ -123,14 +145,14 @@ class Database:
         activations_total: int = 1,
         comment: Optional[str] = None
     ) -> Dict:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = check_records
             await db.execute("BEGIN IMMEDIATE")
             balance, locked, clean_balance = await self._get_clean_balance_snapshot(db, creator_id)
             if balance is None:
                 await db.rollback()
                 raise CheckPermissionError("USER_NOT_FOUND")
-            amount_dec = Decimal(str(amount))
+            amount_dec = Money(amount)
             if amount_dec <= 0:
                 await db.rollback()
                 raise ValueError("Amount must be positive")
@@ -155,23 +177,23 @@ class Database:
             await db.commit()
             async with db.execute("SELECT * FROM checks WHERE check_id = ?", (check_id,)) as cursor:
                 row = await cursor.fetchone()
-                return dict(row) if row else {}
+                return row if row else {}
 
     async def activate_check_atomic(self, check_id: str, user_id: int) -> Dict:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = check_records
             await db.execute("BEGIN IMMEDIATE")
             async with db.execute("SELECT * FROM checks WHERE check_id = ?", (check_id,)) as cursor:
                 row = await cursor.fetchone()
             if not row:
                 await db.rollback()
                 raise CheckNotFoundError("CHECK_NOT_FOUND")
-            check = dict(row)
+            check = row
             if check.get("status") == "cashed":
                 await db.rollback()
                 raise CheckAlreadyCashedError("CHECK_ALREADY_CASHED")
             multiplier = Decimal(str(check.get("wagering_multiplier") or '0'))
-            amount_total = Decimal(str(check.get("amount") or '0'))
+            amount_total = Money(check.get("amount"))
             if amount_total <= 0:
                 await db.rollback()
                 raise ValueError("Invalid check amount")
@@ -216,7 +238,7 @@ class Database:
                     )
                     remaining_activations = 0
                 else:
-                    amount_to_credit = amount_total / Decimal(str(activations_total))
+                    amount_to_credit = amount_total / Decimal(activations_total)
                     await db.execute(
                         "UPDATE users SET balance = balance + ? WHERE user_id = ?",
                         (amount_to_credit, user_id)
@@ -254,7 +276,7 @@ class Database:
                 credited_to_bonus = requirement_added > 0
             await db.commit()
             async with db.execute("SELECT * FROM checks WHERE check_id = ?", (check_id,)) as cursor:
-                updated_check = dict(await cursor.fetchone())
+                updated_check = await cursor.fetchone()
             return {
                 "check": updated_check,
                 "amount": amount_to_credit,
@@ -264,15 +286,15 @@ class Database:
             }
 
     async def delete_check_with_refund(self, check_id: str, user_id: int) -> Decimal:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = check_records
             await db.execute("BEGIN IMMEDIATE")
             async with db.execute("SELECT * FROM checks WHERE check_id = ?", (check_id,)) as cursor:
                 row = await cursor.fetchone()
             if not row:
                 await db.rollback()
                 raise CheckNotFoundError("CHECK_NOT_FOUND")
-            check = dict(row)
+            check = row
             if check.get("creator_id") != user_id:
                 await db.rollback()
                 raise CheckPermissionError("NOT_CREATOR")
@@ -280,7 +302,7 @@ class Database:
                 await db.rollback()
                 raise CheckAlreadyCashedError("CHECK_ALREADY_CASHED")
             refund_amount = Decimal('0')
-            amount_total = Decimal(str(check.get("amount") or '0'))
+            amount_total = Money(check.get("amount"))
             if check.get("is_multi"):
                 activations_total = int(check.get("activations_total") or 1)
                 if activations_total <= 0:
@@ -290,7 +312,7 @@ class Database:
                     (check_id,)
                 ) as cursor:
                     activations_count = (await cursor.fetchone())[0]
-                amount_per_activation = amount_total / Decimal(str(activations_total))
+                amount_per_activation = amount_total / Decimal(activations_total)
                 refund_amount = amount_total - (Decimal(activations_count) * amount_per_activation)
             else:
                 refund_amount = amount_total
@@ -307,7 +329,7 @@ class Database:
             return refund_amount
 
     async def recalc_all_user_stats(self):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             async with db.execute("SELECT user_id FROM users") as cursor:
                 user_ids = [row[0] for row in await cursor.fetchall()]
             for user_id in user_ids:
@@ -315,7 +337,7 @@ class Database:
             await db.commit()
 
     async def init(self):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS users (
                     user_id INTEGER PRIMARY KEY,
@@ -572,16 +594,125 @@ class Database:
                 if 'wagering_total' not in columns:
                     await db.execute("ALTER TABLE check_activations ADD COLUMN wagering_total DECIMAL DEFAULT 0")
             await db.commit()
+            async with db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'wagers'") as cursor:
+                wagers_exists = await cursor.fetchone() is not None
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS wagers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    amount DECIMAL,
+                    game TEXT,
+                    bet_type TEXT,
+                    is_bonus_bet INTEGER DEFAULT 0,
+                    source TEXT DEFAULT 'bot',
+                    state TEXT DEFAULT 'pending',
+                    dice_value INTEGER,
+                    second_dice_value INTEGER,
+                    won INTEGER,
+                    payout DECIMAL,
+                    ref_reward DECIMAL,
+                    message_id INTEGER,
+                    result_message_id INTEGER,
+                    channel_id INTEGER,
+                    fair_seed INTEGER,
+                    fair_nonce INTEGER,
+                    rules_version INTEGER,
+                    rounds INTEGER,
+                    rounds_played INTEGER,
+                    stop_loss DECIMAL,
+                    take_profit DECIMAL,
+                    announce INTEGER DEFAULT 1,
+                    outcomes TEXT,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    settled_at TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users(user_id)
+                )
+            """)
+            async with db.execute("PRAGMA table_info(wagers)") as cursor:
+                columns = [row[1] for row in await cursor.fetchall()]
+                if 'lease_owner' not in columns:
+                    await db.execute("ALTER TABLE wagers ADD COLUMN lease_owner TEXT")
+                    await db.execute("ALTER TABLE wagers ADD COLUMN lease_expires REAL")
+                    await db.execute("ALTER TABLE wagers ADD COLUMN attempts INTEGER DEFAULT 0")
+                if 'channel_id' not in columns:
+                    await db.execute("ALTER TABLE wagers ADD COLUMN channel_id INTEGER")
+                if 'fair_seed' not in columns:
+                    await db.execute("ALTER TABLE wagers ADD COLUMN fair_seed INTEGER")
+                if 'fair_nonce' not in columns:
+                    await db.execute("ALTER TABLE wagers ADD COLUMN fair_nonce INTEGER")
+                if 'rules_version' not in columns:
+                    await db.execute("ALTER TABLE wagers ADD COLUMN rules_version INTEGER")
+                if 'rounds' not in columns:
+                    await db.execute("ALTER TABLE wagers ADD COLUMN rounds INTEGER")
+                    await db.execute("ALTER TABLE wagers ADD COLUMN rounds_played INTEGER")
+                    await db.execute("ALTER TABLE wagers ADD COLUMN stop_loss DECIMAL")
+                    await db.execute("ALTER TABLE wagers ADD COLUMN take_profit DECIMAL")
+                    await db.execute("ALTER TABLE wagers ADD COLUMN announce INTEGER DEFAULT 1")
+                    await db.execute("ALTER TABLE wagers ADD COLUMN outcomes TEXT")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_wagers_state ON wagers(state, id)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_wagers_user ON wagers(user_id, id)")
+            if not wagers_exists:
+                await self._migrate_legacy_bets(db)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS media_cache (
+                    file_hash TEXT PRIMARY KEY,
+                    path TEXT,
+                    file_id TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            # Пары сидов игроков: server seed в БД не хранится вовсе — он выводится
+            # из секрета вне БД по номеру пары игрока и показывается после закрытия пары
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS fair_seeds (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    seed_index INTEGER NOT NULL,
+                    seed_hash TEXT NOT NULL,
+                    client_seed TEXT NOT NULL,
+                    next_nonce INTEGER DEFAULT 0,
+                    closed_at REAL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (user_id, seed_index)
+                )
+            """)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS game_rules (
+                    version INTEGER PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            await db.commit()
+
+    async def _migrate_legacy_bets(self, db):
+        # Сыгранные ставки переносятся из bets, ожидающие — из queue;
+        # старые таблицы остаются нетронутыми
+        await db.execute("""
+            INSERT INTO wagers (user_id, amount, game, bet_type, is_bonus_bet, source, state, message_id, created_at, settled_at)
+            SELECT user_id, amount, game_type, bet_type, COALESCE(is_bonus_bet, 0), 'legacy', 'settled',
+                   message_id, created_at, COALESCE(processed_at, created_at)
+            FROM bets ORDER BY id
+        """)
+        await db.execute("""
+            INSERT INTO wagers (user_id, amount, game, bet_type, is_bonus_bet, source, state, created_at)
+            SELECT user_id, amount, game, bet_type, COALESCE(is_bonus_bet, 0), 'bot', 'pending', created_at
+            FROM queue WHERE status = 'pending' ORDER BY id
+        """)
+        logging.info("Legacy queue/bets rows migrated to 'wagers'.")
 
     async def get_user(self, user_id: int) -> Optional[Dict]:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = user_records
             async with db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)) as cursor:
                 row = await cursor.fetchone()
-                return dict(row) if row else None
+                return row
 
     async def create_user(self, user_id: int, username: str, full_name: str = None, referrer_id: Optional[int] = None) -> None:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute(
                 "INSERT OR REPLACE INTO users (user_id, username, full_name, referrer_id) VALUES (?, ?, ?, ?)",
                 (user_id, username, full_name, referrer_id)
@@ -591,7 +722,7 @@ class Database:
                 await self.update_ref_count(referrer_id, 1)
 
     async def update_balance(self, user_id: int, amount: Decimal) -> bool:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute(
                 """
                 UPDATE users
@@ -604,10 +735,10 @@ class Database:
             return True
 
     async def deduct_bonus_funds(self, user_id: int, amount: Decimal) -> bool:
-        amount = Decimal(str(amount))
+        amount = Money(amount)
         if amount <= 0:
             return True
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             await db.execute("BEGIN IMMEDIATE")
             async with db.execute(
@@ -618,8 +749,8 @@ class Database:
             if not row:
                 await db.rollback()
                 return False
-            balance = Decimal(str(row['balance'] or '0'))
-            bonus_balance = Decimal(str(row['bonus_balance'] or '0'))
+            balance = Money(row['balance'])
+            bonus_balance = Money(row['bonus_balance'])
             if balance < amount or bonus_balance < amount:
                 await db.rollback()
                 return False
@@ -636,10 +767,10 @@ class Database:
             return True
 
     async def refund_bonus_funds(self, user_id: int, amount: Decimal) -> bool:
-        amount = Decimal(str(amount))
+        amount = Money(amount)
         if amount <= 0:
             return True
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute(
                 """
                 UPDATE users
@@ -653,10 +784,10 @@ class Database:
             return True
 
     async def increase_bonus_balance(self, user_id: int, amount: Decimal) -> bool:
-        amount = Decimal(str(amount))
+        amount = Money(amount)
         if amount == 0:
             return True
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute(
                 """
                 UPDATE users
@@ -672,7 +803,7 @@ class Database:
             return True
 
     async def update_ref_balance(self, user_id: int, amount: Decimal) -> bool:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             if amount > 0:
                 await db.execute(
                     "UPDATE users SET ref_balance = ref_balance + ?, ref_earnings = ref_earnings + ? WHERE user_id = ?",
@@ -687,7 +818,7 @@ class Database:
             return True
 
     async def update_ref_count(self, user_id: int, count_increment: int) -> bool:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute(
                 "UPDATE users SET ref_count = ref_count + ? WHERE user_id = ?",
                 (count_increment, user_id)
@@ -695,41 +826,362 @@ class Database:
             await db.commit()
             return True
 
+    async def get_media_file_ids(self) -> Dict[str, str]:
+        async with self._connect() as db:
+            async with db.execute("SELECT file_hash, file_id FROM media_cache") as cursor:
+                return {row[0]: row[1] for row in await cursor.fetchall()}
+
+    async def set_media_file_id(self, file_hash: str, path: str, file_id: str) -> None:
+        async with self._connect() as db:
+            await db.execute(
+                """
+                INSERT INTO media_cache (file_hash, path, file_id) VALUES (?, ?, ?)
+                ON CONFLICT(file_hash) DO UPDATE SET path = excluded.path, file_id = excluded.file_id,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                (file_hash, path, file_id)
+            )
+            await db.commit()
+
+    async def delete_media_file_id(self, file_hash: str) -> None:
+        async with self._connect() as db:
+            await db.execute("DELETE FROM media_cache WHERE file_hash = ?", (file_hash,))
+            await db.commit()
+
+    async def get_game_rules(self, version: int) -> Optional[str]:
+        async with self._connect() as db:
+            async with db.execute("SELECT source FROM game_rules WHERE version = ?", (version,)) as cursor:
+                row = await cursor.fetchone()
+                return row[0] if row else None
+
+    async def save_game_rules(self, version: int, source: str) -> None:
+        # Текст каждой версии правил хранится, чтобы ставки, принятые по ней, доигрывались после перезапуска
+        async with self._connect() as db:
+            await db.execute(
+                "INSERT OR REPLACE INTO game_rules (version, source) VALUES (?, ?)", (version, source)
+            )
+            await db.commit()
+
+    async def get_fair_seed(self, user_id: int) -> Optional[Dict]:
+        """Последняя пара сидов игрока — действующая, если ещё не закрыта."""
+        async with self._connect() as db:
+            db.row_factory = records
+            async with db.execute(
+                "SELECT * FROM fair_seeds WHERE user_id = ? ORDER BY seed_index DESC LIMIT 1", (user_id,)
+            ) as cursor:
+                return await cursor.fetchone()
+
+    async def get_fair_seed_by_id(self, seed_id: int) -> Optional[Dict]:
+        async with self._connect() as db:
+            db.row_factory = records
+            async with db.execute("SELECT * FROM fair_seeds WHERE id = ?", (seed_id,)) as cursor:
+                return await cursor.fetchone()
+
+    async def get_closed_fair_seeds(self, user_id: int, limit: int = 5) -> List[Dict]:
+        async with self._connect() as db:
+            db.row_factory = records
+            async with db.execute(
+                """
+                SELECT * FROM fair_seeds WHERE user_id = ? AND closed_at IS NOT NULL
+                ORDER BY seed_index DESC LIMIT ?
+                """,
+                (user_id, limit)
+            ) as cursor:
+                return await cursor.fetchall()
+
+    async def create_fair_seed(self, user_id: int, seed_index: int, seed_hash: str, client_seed: str) -> None:
+        # Пару могут создать одновременно несколько процессов — побеждает первый
+        async with self._connect() as db:
+            await db.execute(
+                """
+                INSERT OR IGNORE INTO fair_seeds (user_id, seed_index, seed_hash, client_seed)
+                VALUES (?, ?, ?, ?)
+                """,
+                (user_id, seed_index, seed_hash, client_seed)
+            )
+            await db.commit()
+
+    async def reserve_fair_nonces(self, user_id: int, count: int) -> Optional[Dict]:
+        """Резервирует count подряд идущих номеров действующей пары сидов игрока
+        за один запрос; возвращает пару с next_nonce уже после резерва или None,
+        если открытой пары нет."""
+        async with self._connect() as db:
+            db.row_factory = records
+            async with db.execute(
+                """
+                UPDATE fair_seeds SET next_nonce = next_nonce + ?
+                WHERE user_id = ? AND closed_at IS NULL
+                RETURNING *
+                """,
+                (count, user_id)
+            ) as cursor:
+                row = await cursor.fetchone()
+            await db.commit()
+            return row
+
+    async def rotate_fair_seed(self, seed_id: int, user_id: int, seed_index: int,
+                               seed_hash: str, client_seed: str) -> bool:
+        """Закрывает пару seed_id и открывает следующую одной транзакцией;
+        False, если пару уже закрыл другой процесс."""
+        async with self._connect() as db:
+            await db.execute("BEGIN IMMEDIATE")
+            cursor = await db.execute(
+                "UPDATE fair_seeds SET closed_at = ? WHERE id = ? AND closed_at IS NULL",
+                (time.time(), seed_id)
+            )
+            if cursor.rowcount == 0:
+                await db.rollback()
+                return False
+            await db.execute(
+                """
+                INSERT OR IGNORE INTO fair_seeds (user_id, seed_index, seed_hash, client_seed)
+                VALUES (?, ?, ?, ?)
+                """,
+                (user_id, seed_index, seed_hash, client_seed)
+            )
+            await db.commit()
+            return True
+
     async def get_referrer(self, user_id: int) -> Optional[int]:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             async with db.execute("SELECT referrer_id FROM users WHERE user_id = ?", (user_id,)) as cursor:
                 row = await cursor.fetchone()
                 return row[0] if row and row[0] else None
 
-    async def add_to_queue(self, user_id: int, amount: Decimal, game: str, bet_type: str, is_bonus_bet: bool = False) -> int:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+    async def create_wager(self, user_id: int, amount: Decimal, game: str, bet_type: str,
+                           is_bonus_bet: bool = False, source: str = 'bot',
+                           lease_owner: Optional[str] = None, lease_seconds: float = 0,
+                           channel_id: Optional[int] = None, rules_version: Optional[int] = None,
+                           rounds: Optional[int] = None, stop_loss: Optional[Decimal] = None,
+                           take_profit: Optional[Decimal] = None, announce: bool = True) -> int:
+        # Ставка сразу создаётся с арендой процесса, который её принял,
+        # чтобы другие процессы не забрали её до истечения аренды.
+        # У серии автоставок amount — сумма, зарезервированная на все раунды
+        lease_expires = time.time() + lease_seconds if lease_owner else None
+        async with self._connect() as db:
             cursor = await db.execute(
-                "INSERT INTO queue (user_id, amount, game, bet_type, is_bonus_bet) VALUES (?, ?, ?, ?, ?)",
-                (user_id, amount, game, bet_type, 1 if is_bonus_bet else 0)
+                """
+                INSERT INTO wagers (user_id, amount, game, bet_type, is_bonus_bet, source, channel_id,
+                                    rules_version, rounds, stop_loss, take_profit, announce,
+                                    lease_owner, lease_expires, attempts)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (user_id, amount, game, bet_type, 1 if is_bonus_bet else 0, source, channel_id,
+                 rules_version, rounds, stop_loss, take_profit, 1 if announce else 0,
+                 lease_owner, lease_expires, 1 if lease_owner else 0)
             )
             await db.commit()
             return cursor.lastrowid
 
-    async def get_next_bet(self) -> Optional[Dict]:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+    async def claim_wagers(self, owner: str, lease_seconds: float, include_own: bool = False,
+                           exclude: Optional[List[int]] = None, limit: int = 50) -> List[Dict]:
+        """Забирает незавершённые ставки без аренды или с истёкшей арендой; include_own — и свои собственные.
+        exclude — ставки, которые процесс уже обрабатывает: их аренда и попытки не трогаются."""
+        now = time.time()
+        exclude = exclude or []
+        placeholders = ", ".join("?" for _ in exclude)
+        async with self._connect() as db:
+            db.row_factory = wager_records
+            await db.execute("BEGIN IMMEDIATE")
             async with db.execute(
-                "SELECT * FROM queue WHERE status = 'pending' ORDER BY created_at ASC LIMIT 1"
+                f"""
+                SELECT * FROM wagers
+                WHERE state IN ('pending', 'rolling')
+                  AND (lease_owner IS NULL OR lease_expires < ? OR (? AND lease_owner = ?))
+                  AND id NOT IN ({placeholders})
+                ORDER BY id ASC LIMIT ?
+                """,
+                (now, 1 if include_own else 0, owner, *exclude, limit)
             ) as cursor:
-                row = await cursor.fetchone()
-                return dict(row) if row else None
+                rows = await cursor.fetchall()
+            for row in rows:
+                await db.execute(
+                    "UPDATE wagers SET lease_owner = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                    (owner, now + lease_seconds, row['id'])
+                )
+                row['lease_owner'] = owner
+                row['lease_expires'] = now + lease_seconds
+                row['attempts'] = (row.get('attempts') or 0) + 1
+            await db.commit()
+            return rows
+
+    async def renew_wager_leases(self, owner: str, wager_ids: List[int], lease_seconds: float) -> List[int]:
+        """Продлевает аренду; возвращает id ставок, аренду которых удержать не удалось."""
+        if not wager_ids:
+            return []
+        placeholders = ", ".join("?" for _ in wager_ids)
+        async with self._connect() as db:
+            await db.execute("BEGIN IMMEDIATE")
+            await db.execute(
+                f"""
+                UPDATE wagers SET lease_expires = ?
+                WHERE lease_owner = ? AND state IN ('pending', 'rolling') AND id IN ({placeholders})
+                """,
+                (time.time() + lease_seconds, owner, *wager_ids)
+            )
+            async with db.execute(
+                f"""
+                SELECT id FROM wagers
+                WHERE state IN ('pending', 'rolling') AND lease_owner IS NOT ? AND id IN ({placeholders})
+                """,
+                (owner, *wager_ids)
+            ) as cursor:
+                lost = [row[0] for row in await cursor.fetchall()]
+            await db.commit()
+        return lost
 
-    async def mark_bet_processed(self, bet_id: int) -> bool:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+    async def release_wager(self, wager_id: int, owner: str) -> None:
+        async with self._connect() as db:
+            await db.execute(
+                "UPDATE wagers SET lease_owner = NULL, lease_expires = NULL WHERE id = ? AND lease_owner = ?",
+                (wager_id, owner)
+            )
+            await db.commit()
+
+    async def mark_wager_rolling(self, wager_id: int, owner: str, message_id: Optional[int]) -> bool:
+        # Записи по ставке делает только держатель аренды; False — аренду перехватили
+        async with self._connect() as db:
+            cursor = await db.execute(
+                "UPDATE wagers SET state = 'rolling', message_id = ? WHERE id = ? AND lease_owner = ?",
+                (message_id, wager_id, owner)
+            )
+            await db.commit()
+            return cursor.rowcount > 0
+
+    async def record_wager_roll(self, wager_id: int, owner: str, dice_value: Optional[int],
+                                second_dice_value: Optional[int] = None,
+                                fair_seed: Optional[int] = None, fair_nonce: Optional[int] = None,
+                                outcomes: Optional[str] = None) -> bool:
+        # Выпавшее значение сохраняется до расчёта: повтор после сбоя не перебрасывает кубик.
+        # У серии автоставок outcomes — все значения серии через запятую
+        async with self._connect() as db:
+            cursor = await db.execute(
+                """
+                UPDATE wagers SET dice_value = ?, second_dice_value = ?, fair_seed = ?, fair_nonce = ?, outcomes = ?
+                WHERE id = ? AND lease_owner = ?
+                """,
+                (dice_value, second_dice_value, fair_seed, fair_nonce, outcomes, wager_id, owner)
+            )
+            await db.commit()
+            return cursor.rowcount > 0
+
+    async def get_open_wagers(self) -> List[Dict]:
+        async with self._connect() as db:
+            db.row_factory = wager_records
+            async with db.execute(
+                "SELECT id, game, bet_type, amount, rules_version FROM wagers WHERE state IN ('pending', 'rolling')"
+            ) as cursor:
+                return await cursor.fetchall()
+
+    async def get_wager(self, wager_id: int) -> Optional[Dict]:
+        async with self._connect() as db:
+            db.row_factory = wager_records
+            async with db.execute("SELECT * FROM wagers WHERE id = ?", (wager_id,)) as cursor:
+                return await cursor.fetchone()
+
+    async def settle_wager(self, wager_id: int, owner: str, dice_value: Optional[int], second_dice_value: Optional[int],
+                           won: bool, payout: Decimal, referrer_id: Optional[int] = None,
+                           ref_reward: Optional[Decimal] = None, refund: Decimal = ZERO,
+                           rounds_played: Optional[int] = None) -> bool:
+        """Расчёт ставки одной транзакцией: выигрыш, бонусный отыгрыш, реферальная часть и статус.
+        refund — резерв несыгранных раундов серии: возвращается игроку, а сумма ставки
+        уменьшается до сыгранной. Повторный вызов для уже рассчитанной ставки и расчёт
+        без аренды owner ничего не меняют и возвращают False."""
+        async with self._connect() as db:
+            db.row_factory = wager_records
+            await db.execute("BEGIN IMMEDIATE")
+            async with db.execute(
+                "SELECT * FROM wagers WHERE id = ? AND lease_owner = ?", (wager_id, owner)
+            ) as cursor:
+                wager = await cursor.fetchone()
+            if not wager or wager['state'] not in ('pending', 'rolling'):
+                await db.rollback()
+                return False
+            user_id = wager['user_id']
+            payout = Money(payout)
+            refund = Money(refund)
+            if refund:
+                await db.execute("UPDATE users SET balance = balance + ? WHERE user_id = ?", (refund, user_id))
+                if wager['is_bonus_bet']:
+                    await db.execute(
+                        "UPDATE users SET bonus_balance = COALESCE(bonus_balance, 0) + ? WHERE user_id = ?",
+                        (refund, user_id)
+                    )
+                await db.execute(
+                    "INSERT INTO transactions (user_id, amount, type, game_type) VALUES (?, ?, 'refund', ?)",
+                    (user_id, refund, wager['game'])
+                )
+            if won:
+                await db.execute(
+                    "UPDATE users SET balance = MAX(balance + ?, 0) WHERE user_id = ?",
+                    (payout, user_id)
+                )
+                if wager['is_bonus_bet']:
+                    await db.execute(
+                        "UPDATE users SET bonus_balance = COALESCE(bonus_balance, 0) + ? WHERE user_id = ?",
+                        (payout, user_id)
+                    )
+                await db.execute(
+                    "INSERT INTO transactions (user_id, amount, type, game_type) VALUES (?, ?, 'win', ?)",
+                    (user_id, payout, wager['game'])
+                )
+                await self._consume_bonus_wager_in_tx(db, user_id, Money(wager['amount']) - refund)
+                if referrer_id and ref_reward:
+                    await db.execute(
+                        "UPDATE users SET ref_balance = ref_balance + ?, ref_earnings = ref_earnings + ? WHERE user_id = ?",
+                        (ref_reward, ref_reward, referrer_id)
+                    )
+            else:
+                await self._remove_wagering_if_balance_negative_in_tx(db, user_id)
             await db.execute(
-                "UPDATE bets SET processed = 1, processed_at = datetime('now') WHERE id = ?",
-                (bet_id,)
+                """
+                UPDATE wagers
+                SET state = 'settled', dice_value = ?, second_dice_value = ?, won = ?, payout = ?,
+                    ref_reward = ?, amount = ?, rounds_played = ?, settled_at = CURRENT_TIMESTAMP,
+                    lease_owner = NULL, lease_expires = NULL
+                WHERE id = ? AND lease_owner = ?
+                """,
+                (dice_value, second_dice_value, 1 if won else 0, payout, ref_reward,
+                 Money(wager['amount']) - refund, rounds_played, wager_id, owner)
             )
             await db.commit()
             return True
 
+    async def set_wager_result_message(self, wager_id: int, message_id: int) -> None:
+        async with self._connect() as db:
+            await db.execute("UPDATE wagers SET result_message_id = ? WHERE id = ?", (message_id, wager_id))
+            await db.commit()
+
+    async def fail_wager_with_refund(self, wager_id: int) -> Optional[Decimal]:
+        """Помечает ставку проваленной и возвращает сумму игроку; None, если ставка уже завершена."""
+        async with self._connect() as db:
+            db.row_factory = wager_records
+            await db.execute("BEGIN IMMEDIATE")
+            async with db.execute("SELECT * FROM wagers WHERE id = ?", (wager_id,)) as cursor:
+                wager = await cursor.fetchone()
+            if not wager or wager['state'] not in ('pending', 'rolling'):
+                await db.rollback()
+                return None
+            amount = Money(wager['amount'])
+            await db.execute(
+                "UPDATE wagers SET state = 'failed', lease_owner = NULL, lease_expires = NULL, settled_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (wager_id,)
+            )
+            await db.execute("UPDATE users SET balance = balance + ? WHERE user_id = ?", (amount, wager['user_id']))
+            if wager['is_bonus_bet']:
+                await db.execute(
+                    "UPDATE users SET bonus_balance = COALESCE(bonus_balance, 0) + ? WHERE user_id = ?",
+                    (amount, wager['user_id'])
+                )
+            await db.execute(
+                "INSERT INTO transactions (user_id, amount, type, game_type) VALUES (?, ?, 'refund', ?)",
+                (wager['user_id'], amount, wager['game'])
+            )
+            await db.commit()
+            return amount
+
     async def add_transaction(self, user_id: int, amount: Decimal, type: str, game_type: Optional[str] = None) -> None:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute(
                 "INSERT INTO transactions (user_id, amount, type, game_type) VALUES (?, ?, ?, ?)",
                 (user_id, amount, type, game_type)
@@ -737,7 +1189,7 @@ class Database:
             await db.commit()
 
     async def get_user_transactions(self, user_id: int, limit: int = 10) -> List[Dict]:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             async with db.execute(
                 "SELECT * FROM transactions WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
@@ -747,18 +1199,18 @@ class Database:
                 return [dict(row) for row in rows]
 
     async def get_user_stats(self, user_id: int) -> dict:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             cursor = await db.execute("SELECT COUNT(*) FROM transactions WHERE user_id = ? AND type = 'game'", (user_id,))
             total_games = (await cursor.fetchone())[0] or 0
             cursor = await db.execute("SELECT COUNT(*) FROM transactions WHERE user_id = ? AND type = 'win'", (user_id,))
             wins = (await cursor.fetchone())[0] or 0
             losses = total_games - wins
             cursor = await db.execute("SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE user_id = ? AND type = 'win'", (user_id,))
-            total_won = Decimal(str((await cursor.fetchone())[0] or '0'))
+            total_won = Money((await cursor.fetchone())[0])
             cursor = await db.execute("SELECT COALESCE(SUM(ABS(amount)), 0) FROM transactions WHERE user_id = ? AND type = 'game'", (user_id,))
-            turnover = Decimal(str((await cursor.fetchone())[0] or '0'))
+            turnover = Money((await cursor.fetchone())[0])
             cursor = await db.execute("SELECT COALESCE(SUM(ABS(amount)), 0) FROM transactions WHERE user_id = ? AND type = 'game' AND amount < 0", (user_id,))
-            total_lost = Decimal(str((await cursor.fetchone())[0] or '0'))
+            total_lost = Money((await cursor.fetchone())[0])
             win_rate = (wins / total_games * 100) if total_games > 0 else 0
             return {
                 'total_games': total_games,
@@ -771,7 +1223,7 @@ class Database:
             }
 
     async def create_withdrawal(self, user_id: int, amount: Decimal, network: str, address: str) -> int:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             cursor = await db.execute(
                 "INSERT INTO withdrawals (user_id, amount, network, address) VALUES (?, ?, ?, ?)",
                 (user_id, amount, network, address)
@@ -780,7 +1232,7 @@ class Database:
             return cursor.lastrowid
 
     async def get_pending_withdrawals(self) -> List[Dict]:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             async with db.execute(
                 "SELECT w.*, u.username FROM withdrawals w JOIN users u ON w.user_id = u.user_id WHERE w.status = 'pending' ORDER BY w.created_at ASC"
@@ -789,7 +1241,7 @@ class Database:
                 return [dict(row) for row in rows]
 
     async def mark_withdrawal_processed(self, withdrawal_id: int) -> None:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute(
                 "UPDATE withdrawals SET status = 'processed', processed_at = CURRENT_TIMESTAMP WHERE id = ?",
                 (withdrawal_id,)
@@ -797,7 +1249,7 @@ class Database:
             await db.commit()
 
     async def cancel_withdrawal(self, withdrawal_id: int) -> None:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             async with db.execute("SELECT user_id, amount FROM withdrawals WHERE id = ?", (withdrawal_id,)) as cursor:
                 row = await cursor.fetchone()
                 if row:
@@ -810,7 +1262,7 @@ class Database:
                     await db.commit()
 
     async def get_user_withdrawals(self, user_id: int, limit: int = 10) -> List[Dict]:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             async with db.execute(
                 "SELECT * FROM withdrawals WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
@@ -820,7 +1272,7 @@ class Database:
                 return [dict(row) for row in rows]
 
     async def get_admin_stats(self) -> Dict:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             stats = {}
             async with db.execute(
@@ -850,8 +1302,8 @@ class Database:
                     stats['today_games'] = today_stats_raw['games']
                     stats['today_wins'] = today_stats_raw['wins']
                     stats['today_losses'] = max(0, stats['today_games'] - stats['today_wins'])
-                    today_turnover = Decimal(str(today_stats_raw['turnover']))
-                    today_winnings = Decimal(str(today_stats_raw['winnings']))
+                    today_turnover = Money(today_stats_raw['turnover'])
+                    today_winnings = Money(today_stats_raw['winnings'])
                     stats['today_turnover'] = today_turnover
                     stats['today_profit'] = today_turnover - today_winnings
                 else:
@@ -872,8 +1324,8 @@ class Database:
                     stats['week_games'] = week_stats_raw['games']
                     stats['week_wins'] = week_stats_raw['wins']
                     stats['week_losses'] = max(0, stats['week_games'] - stats['week_wins'])
-                    week_turnover = Decimal(str(week_stats_raw['turnover']))
-                    week_winnings = Decimal(str(week_stats_raw['winnings']))
+                    week_turnover = Money(week_stats_raw['turnover'])
+                    week_winnings = Money(week_stats_raw['winnings'])
                     stats['week_turnover'] = week_turnover
                     stats['week_profit'] = week_turnover - week_winnings
                 else:
@@ -881,17 +1333,17 @@ class Database:
             return stats
 
     async def get_all_users(self, limit: int = 100, offset: int = 0) -> List[Dict]:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = user_records
             async with db.execute(
                 "SELECT u.*, (SELECT username FROM users WHERE user_id = u.referrer_id) as referrer_username FROM users u ORDER BY u.created_at DESC LIMIT ? OFFSET ?",
                 (limit, offset)
             ) as cursor:
                 rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
+                return rows
 
     async def update_user(self, user_id: int, updates: Dict) -> bool:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             fields = [f"{key} = ?" for key in updates]
             values = list(updates.values())
             if not fields:
@@ -903,32 +1355,24 @@ class Database:
             return True
 
     async def delete_user(self, user_id: int) -> bool:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute("DELETE FROM transactions WHERE user_id = ?", (user_id,))
             await db.execute("DELETE FROM withdrawals WHERE user_id = ?", (user_id,))
             await db.execute("DELETE FROM queue WHERE user_id = ?", (user_id,))
+            await db.execute("DELETE FROM wagers WHERE user_id = ?", (user_id,))
             await db.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
             await db.commit()
             return True
 
     async def search_users(self, query: str) -> List[Dict]:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = user_records
             async with db.execute(
                 "SELECT u.*, (SELECT username FROM users WHERE user_id = u.referrer_id) as referrer_username FROM users u WHERE u.username LIKE ? OR CAST(u.user_id AS TEXT) LIKE ? ORDER BY u.created_at DESC LIMIT 50",
                 (f"%{query}%", f"%{query}%")
             ) as cursor:
                 rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
-
-    async def add_bet(self, user_id: int, amount: Decimal, game_type: str, bet_type: str, message_id: int, is_bonus_bet: bool = False) -> int:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            cursor = await db.execute(
-                "INSERT INTO bets (user_id, amount, game_type, bet_type, is_bonus_bet, message_id, created_at, processed) VALUES (?, ?, ?, ?, ?, ?, datetime('now'), 0)",
-                (user_id, amount, game_type, bet_type, 1 if is_bonus_bet else 0, message_id)
-            )
-            await db.commit()
-            return cursor.lastrowid
+                return rows
 
     async def get_current_balance(self) -> Decimal:
         try:
@@ -944,7 +1388,7 @@ class Database:
             return Decimal('0')
 
     async def save_win_check_token(self, token: str, user_id: int, amount: Decimal):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute(
                 "INSERT OR REPLACE INTO win_check_tokens (token, user_id, amount, used) VALUES (?, ?, ?, 0)",
                 (token, user_id, amount)
@@ -952,7 +1396,7 @@ class Database:
             await db.commit()
 
     async def get_win_check_token(self, token: str):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             async with db.execute(
                 "SELECT * FROM win_check_tokens WHERE token = ? AND used = 0",
@@ -962,7 +1406,7 @@ class Database:
                 return dict(row) if row else None
 
     async def mark_win_check_token_used(self, token: str):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute(
                 "UPDATE win_check_tokens SET used = 1 WHERE token = ?",
                 (token,)
@@ -970,7 +1414,7 @@ class Database:
             await db.commit()
 
     async def get_bet_by_invoice(self, invoice_id: str):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             async with db.execute(
                 "SELECT * FROM processed_invoices WHERE invoice_id = ?",
@@ -980,7 +1424,7 @@ class Database:
                 return dict(row) if row else None
 
     async def mark_invoice_processed(self, invoice_id: str, user_id: int):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute(
                 "INSERT OR IGNORE INTO processed_invoices (invoice_id, user_id) VALUES (?, ?)",
                 (invoice_id, user_id)
@@ -988,7 +1432,7 @@ class Database:
             await db.commit()
 
     async def create_check(self, check_id: str, creator_id: int, amount: Decimal, target_user_id: Optional[int] = None, is_multi: bool = False, activations_total: int = 1, comment: Optional[str] = None) -> None:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute(
                 "INSERT INTO checks (check_id, creator_id, amount, target_user_id, is_multi, activations_total, comment) VALUES (?, ?, ?, ?, ?, ?, ?)",
                 (check_id, creator_id, amount, target_user_id, is_multi, activations_total, comment)
@@ -996,14 +1440,14 @@ class Database:
             await db.commit()
 
     async def get_check(self, check_id: str) -> Optional[Dict]:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = check_records
             async with db.execute("SELECT * FROM checks WHERE check_id = ?", (check_id,)) as cursor:
                 row = await cursor.fetchone()
-                return dict(row) if row else None
+                return row
 
     async def cash_check(self, check_id: str, cashed_by_id: int) -> None:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute(
                 "UPDATE checks SET status = 'cashed', cashed_by_id = ?, cashed_at = CURRENT_TIMESTAMP WHERE check_id = ?",
                 (cashed_by_id, check_id)
@@ -1011,7 +1455,7 @@ class Database:
             await db.commit()
 
     async def clean_empty_wagerings(self, user_id: int):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute(
                 """
                 UPDATE users
@@ -1026,7 +1470,7 @@ class Database:
 
     async def add_check_activation(self, check_id: str, user_id: int, wagering_left: Decimal = Decimal('0'), wagering_total: Decimal = Decimal('0')):
         await self.clean_empty_wagerings(user_id)
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute(
                 "INSERT INTO check_activations (check_id, user_id, wagering_left, wagering_total) VALUES (?, ?, ?, ?)",
                 (check_id, user_id, wagering_left, wagering_total)
@@ -1034,28 +1478,28 @@ class Database:
             await db.commit()
 
     async def get_check_activations_count(self, check_id: str) -> int:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             async with db.execute("SELECT COUNT(*) FROM check_activations WHERE check_id = ?", (check_id,)) as cursor:
                 row = await cursor.fetchone()
                 return row[0] if row else 0
 
     async def has_user_activated_check(self, check_id: str, user_id: int) -> bool:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             async with db.execute("SELECT 1 FROM check_activations WHERE check_id = ? AND user_id = ?", (check_id, user_id)) as cursor:
                 return await cursor.fetchone() is not None
 
     async def get_user_by_username(self, username: str) -> Optional[Dict]:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = user_records
             async with db.execute(
                 "SELECT * FROM users WHERE username = ?",
                 (username,)
             ) as cursor:
                 row = await cursor.fetchone()
-                return dict(row) if row else None
+                return row
 
     async def update_check_settings(self, check_id: str, settings: Dict) -> bool:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             allowed_fields = ['password', 'required_turnover', 'premium_only', 'wagering_multiplier', 'wagering_left', 'comment', 'target_user_id']
             fields = [f"{key} = ?" for key in settings if key in allowed_fields]
             values = [settings[key] for key in settings if key in allowed_fields]
@@ -1068,18 +1512,18 @@ class Database:
             return True
 
     async def get_user_checks(self, creator_id: int, limit: int = 5, offset: int = 0) -> List[Dict]:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = check_records
             async with db.execute(
                 "SELECT * FROM checks WHERE creator_id = ? AND status = 'active' ORDER BY created_at DESC LIMIT ? OFFSET ?",
                 (creator_id, limit, offset)
             ) as cursor:
                 rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
+                return rows
 
     async def get_top_users_by_turnover(self, period: str, limit: int = 10) -> List[Dict]:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = user_records
             period_filter = ""
             if period == 'today':
                 period_filter = "AND date(t.created_at) = date('now')"
@@ -1100,15 +1544,11 @@ class Database:
                 LIMIT ?
             """
             async with db.execute(query, (limit,)) as cursor:
-                rows = await cursor.fetchall()
-                return [
-                    {**dict(row), 'total_turnover': Decimal(str(row['total_turnover']))}
-                    for row in rows
-                ]
+                return await cursor.fetchall()
 
     async def get_top_users_by_referrals(self, period: str, limit: int = 10) -> List[Dict]:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = user_records
             if period == 'all':
                 join_clause = "LEFT JOIN users r ON r.referrer_id = u.user_id"
             else:
@@ -1135,10 +1575,10 @@ class Database:
             '''
             async with db.execute(query, (limit,)) as cursor:
                 rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
+                return rows
 
     async def add_subscription_channel(self, channel_id: int, channel_url: str, button_text: str):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute(
                 "INSERT INTO subscription_channels (channel_id, channel_url, button_text) VALUES (?, ?, ?)",
                 (channel_id, channel_url, button_text)
@@ -1146,62 +1586,40 @@ class Database:
             await db.commit()
 
     async def get_subscription_channels(self) -> List[Dict]:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             async with db.execute("SELECT * FROM subscription_channels") as cursor:
                 rows = await cursor.fetchall()
                 return [dict(row) for row in rows]
 
     async def delete_subscription_channel(self, channel_id: int):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute("DELETE FROM subscription_channels WHERE channel_id = ?", (channel_id,))
             await db.commit()
 
     async def delete_check(self, check_id: str) -> bool:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute("DELETE FROM check_activations WHERE check_id = ?", (check_id,))
             await db.execute("DELETE FROM checks WHERE check_id = ?", (check_id,))
             await db.commit()
             return True
 
     async def get_user_pending_bet(self, user_id: int) -> Optional[Dict]:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = wager_records
             async with db.execute(
-                "SELECT * FROM queue WHERE user_id = ? AND status = 'pending' LIMIT 1",
+                "SELECT * FROM wagers WHERE user_id = ? AND state IN ('pending', 'rolling') LIMIT 1",
                 (user_id,)
             ) as cursor:
-                row = await cursor.fetchone()
-                return dict(row) if row else None
-
-    async def mark_user_pending_bets_processed(self, user_id: int):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            await db.execute(
-                "UPDATE queue SET status = 'processed' WHERE user_id = ? AND status = 'pending'",
-                (user_id,)
-            )
-            await db.commit()
-
-    async def clear_all_pending_bets(self):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            await db.execute("UPDATE queue SET status = 'processed' WHERE status = 'pending'")
-            await db.commit()
-
-    async def mark_queue_bet_processed(self, queue_id: int):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            await db.execute(
-                "UPDATE queue SET status = 'processed' WHERE id = ?",
-                (queue_id,)
-            )
-            await db.commit()
+                return await cursor.fetchone()
 
     async def clear_all_user_balances(self):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute("UPDATE users SET balance = 0")
             await db.commit()
 
     async def create_contest(self, type, title, description, prize, end_time, status='active'):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             cursor = await db.execute(
                 "INSERT INTO contests (type, title, description, prize, end_time, status) VALUES (?, ?, ?, ?, ?, ?)",
                 (type, title, description, prize, end_time, status)
@@ -1210,31 +1628,31 @@ class Database:
             return cursor.lastrowid
 
     async def get_contest_by_id(self, contest_id):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = contest_records
             async with db.execute("SELECT * FROM contests WHERE id = ?", (contest_id,)) as cursor:
                 row = await cursor.fetchone()
-                return dict(row) if row else None
+                return row
 
     async def get_active_contests(self):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = contest_records
             async with db.execute("SELECT * FROM contests WHERE status = 'active'") as cursor:
-                return [dict(row) for row in await cursor.fetchall()]
+                return await cursor.fetchall()
 
     async def get_completed_contests(self):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = contest_records
             async with db.execute("SELECT * FROM contests WHERE status = 'completed'") as cursor:
-                return [dict(row) for row in await cursor.fetchall()]
+                return await cursor.fetchall()
 
     async def set_contest_channel_message(self, contest_id, message_id):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute("UPDATE contests SET channel_message_id = ? WHERE id = ?", (message_id, contest_id))
             await db.commit()
 
     async def update_contest_participant(self, contest_id, user_id, value, contest_type):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             if contest_type == 'biggest_bet':
                 await db.execute(
                     """
@@ -1258,37 +1676,37 @@ class Database:
             await db.commit()
 
     async def get_contest_participants(self, contest_id, limit=3):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = participant_records
             async with db.execute(
                 "SELECT cp.user_id, cp.value, u.username, u.full_name FROM contest_participants cp JOIN users u ON cp.user_id = u.user_id WHERE cp.contest_id = ? ORDER BY cp.value DESC LIMIT ?",
                 (contest_id, limit)
             ) as cursor:
-                return [dict(row) for row in await cursor.fetchall()]
+                return await cursor.fetchall()
 
     async def get_contest_winner(self, contest_id, contest_type):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = participant_records
             async with db.execute(
                 "SELECT user_id, value FROM contest_participants WHERE contest_id = ? ORDER BY value DESC LIMIT 1", (contest_id,)
             ) as cursor:
                 row = await cursor.fetchone()
-                return dict(row) if row else None
+                return row
 
     async def complete_contest(self, contest_id, winner_id):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute("UPDATE contests SET status = 'completed', winner_id = ? WHERE id = ?", (winner_id, contest_id))
             await db.commit()
 
     async def delete_contest(self, contest_id: int) -> bool:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute("DELETE FROM contest_participants WHERE contest_id = ?", (contest_id,))
             await db.execute("DELETE FROM contests WHERE id = ?", (contest_id,))
             await db.commit()
             return True
 
     async def update_contest_settings(self, contest_id: int, settings: Dict) -> bool:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             fields = [f"{key} = ?" for key in settings if key in ['top_limit', 'custom_link', 'bet_channel_url', 'bot_deeplink']]
             values = [settings[key] for key in settings if key in ['top_limit', 'custom_link', 'bet_channel_url', 'bot_deeplink']]
             if not fields:
@@ -1300,17 +1718,17 @@ class Database:
             return True
 
     async def get_users_invited_by(self, referrer_id: int) -> list:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = user_records
             async with db.execute(
                 "SELECT user_id, username FROM users WHERE referrer_id = ? ORDER BY created_at ASC",
                 (referrer_id,)
             ) as cursor:
                 rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
+                return rows
 
     async def debug_referral_system(self) -> dict:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             cursor = await db.execute("SELECT COUNT(*) FROM users")
             total_users = (await cursor.fetchone())[0]
             cursor = await db.execute("SELECT COUNT(*) FROM users WHERE ref_count > 0")
@@ -1329,17 +1747,17 @@ class Database:
             }
 
     async def get_last_bet(self, user_id: int) -> Optional[Dict]:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = wager_records
             async with db.execute(
-                "SELECT * FROM bets WHERE user_id = ? ORDER BY created_at DESC LIMIT 1",
+                "SELECT * FROM wagers WHERE user_id = ? ORDER BY id DESC LIMIT 1",
                 (user_id,)
             ) as cursor:
                 row = await cursor.fetchone()
-                return dict(row) if row else None
+                return row
 
     async def count_user_checks(self, creator_id: int) -> int:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             async with db.execute(
                 "SELECT COUNT(*) FROM checks WHERE creator_id = ? AND status = 'active'",
                 (creator_id,)
@@ -1348,7 +1766,7 @@ class Database:
                 return row[0] if row else 0
 
     async def get_user_wagering_info(self, user_id: int) -> dict:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             async with db.execute(
                 "SELECT bonus_wager_left, bonus_wager_total FROM users WHERE user_id = ?",
@@ -1357,52 +1775,54 @@ class Database:
                 row = await cursor.fetchone()
                 if not row:
                     return {'left': Decimal('0'), 'total': Decimal('0')}
-                left = Decimal(str(row['bonus_wager_left'] or '0'))
-                total = Decimal(str(row['bonus_wager_total'] or '0'))
+                left = Money(row['bonus_wager_left'])
+                total = Money(row['bonus_wager_total'])
                 if total <= Decimal('0'):
                     total = left
                 return {'left': left, 'total': total}
 
     async def set_wagering_left_on_cash(self, check_id: str, amount: Decimal, multiplier: Decimal):
         total_to_wager = amount * multiplier
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute("UPDATE checks SET wagering_left = ? WHERE check_id = ?", (total_to_wager, check_id))
             await db.commit()
 
     async def update_wagering_on_bet(self, user_id: int, bet_amount: Decimal):
-        bet_amount = Decimal(str(bet_amount))
+        bet_amount = Money(bet_amount)
         if bet_amount <= 0:
             return
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
+        async with self._connect() as db:
             await db.execute("BEGIN IMMEDIATE")
             await self._consume_bonus_wager_in_tx(db, user_id, bet_amount)
             await db.commit()
 
+    async def _remove_wagering_if_balance_negative_in_tx(self, db, user_id: int):
+        async with db.execute("SELECT balance, bonus_balance FROM users WHERE user_id = ?", (user_id,)) as cursor:
+            row = await cursor.fetchone()
+        if not row:
+            return
+        balance = Money(row[0])
+        bonus_balance = Money(row[1])
+        if bonus_balance > 0 and balance <= bonus_balance:
+            await db.execute(
+                """
+                UPDATE users
+                SET bonus_balance = 0,
+                    bonus_wager_left = 0,
+                    bonus_wager_total = 0
+                WHERE user_id = ?
+                """,
+                (user_id,)
+            )
+
     async def remove_wagering_if_balance_negative(self, user_id: int):
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
-            async with db.execute("SELECT balance, bonus_balance FROM users WHERE user_id = ?", (user_id,)) as cursor:
-                row = await cursor.fetchone()
-                if not row:
-                    return
-                balance = Decimal(str(row['balance'] or '0'))
-                bonus_balance = Decimal(str(row['bonus_balance'] or '0'))
-            if bonus_balance > 0 and balance <= bonus_balance:
-                await db.execute(
-                    """
-                    UPDATE users
-                    SET bonus_balance = 0,
-                        bonus_wager_left = 0,
-                        bonus_wager_total = 0
-                    WHERE user_id = ?
-                    """,
-                    (user_id,)
-                )
-                await db.commit()
+        async with self._connect() as db:
+            await self._remove_wagering_if_balance_negative_in_tx(db, user_id)
+            await db.commit()
 
     async def get_user_referrals(self, user_id: int) -> list:
-        async with aiosqlite.connect(self.db_path, **self.connect_params) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._connect() as db:
+            db.row_factory = user_records
             async with db.execute("SELECT user_id, username, full_name FROM users WHERE referrer_id = ? ORDER BY created_at ASC", (user_id,)) as cursor:
                 rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
\ No newline at end of file
+                return rows
\ No newline at end of file
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from bet_queue import get_queue_stats
+from presenter import get_presenter_stats, present
+from templates import render
+
+# Эти переменные будут установлены при инициализации
+bot = None
+db = None
+scheduler = None
+ENTER_DEPTH = 20
+EXIT_DEPTH = 5
+FLUSH_SECONDS = 5.0
+MAX_ITEMS = 20
+MAX_TEXT = 3500
+FOOTER = ""
+REPLY_MARKUP = None
+
+_active = False
+# Строки сводки по каналам: (id ставки, строка)
+_buffers: Dict[int, List[Tuple[int, str]]] = {}
+
+
+def init_digest(bot_instance, db_instance, outbound_scheduler, enter_depth: int = 20, exit_depth: int = 5,
+                flush_seconds: float = 5.0, footer: str = "", reply_markup=None):
+    """Инициализация сводок результатов для режима высокой нагрузки"""
+    global bot, db, scheduler, ENTER_DEPTH, EXIT_DEPTH, FLUSH_SECONDS, FOOTER, REPLY_MARKUP
+    bot = bot_instance
+    db = db_instance
+    scheduler = outbound_scheduler
+    ENTER_DEPTH = enter_depth
+    EXIT_DEPTH = min(exit_depth, enter_depth)
+    FLUSH_SECONDS = flush_seconds
+    FOOTER = footer
+    REPLY_MARKUP = reply_markup
+    logging.info(f"[DIGEST] Сводки включаются с {ENTER_DEPTH}, выключаются при {EXIT_DEPTH} ожидающих")
+
+
+def _load() -> int:
+    load = get_queue_stats()['depth'] + get_presenter_stats()['queued']
+    if scheduler is not None:
+        load = max(load, scheduler.get_stats()['waiting'])
+    return load
+
+
+def is_active() -> bool:
+    """Нужно ли сейчас показывать ставки сводкой. Порог включения выше порога
+    выключения, чтобы режим не переключался на каждой ставке."""
+    global _active
+    if ENTER_DEPTH <= 0:
+        return False
+    load = _load()
+    if not _active and load >= ENTER_DEPTH:
+        _active = True
+        logging.warning(f"[DIGEST] Нагрузка {load}: результаты публикуются сводками")
+    elif _active and load <= EXIT_DEPTH:
+        _active = False
+        logging.info(f"[DIGEST] Нагрузка {load}: возврат к отдельным сообщениям")
+    return _active
+
+
+def add(channel_id: int, wager_id: int, line: str):
+    buffer = _buffers.setdefault(channel_id, [])
+    # Сообщение Telegram ограничено 4096 символами
+    if buffer and sum(len(item) for _, item in buffer) + len(line) + len(FOOTER) > MAX_TEXT:
+        _flush(channel_id)
+        buffer = _buffers.setdefault(channel_id, [])
+    buffer.append((wager_id, line))
+    if len(buffer) >= MAX_ITEMS:
+        _flush(channel_id)
+
+
+def _flush(channel_id: int):
+    items = _buffers.pop(channel_id, None)
+    if not items:
+        return
+    text = render("digest", count=len(items), lines="\n".join(line for _, line in items), links=FOOTER)
+    message: Dict[str, Optional[int]] = {'id': None}
+
+    async def send():
+        message['id'] = (await bot.send_message(
+            chat_id=channel_id,
+            text=text,
+            parse_mode="HTML",
+            reply_markup=REPLY_MARKUP,
+            disable_web_page_preview=True
+        )).message_id
+
+    async def link():
+        for wager_id, _ in items:
+            await db.set_wager_result_message(wager_id, message['id'])
+
+    present(f"сводка {channel_id}", [send, link])
+
+
+async def digest_loop():
+    """Публикует накопленные сводки и выходит из режима сводок, когда нагрузка спала."""
+    while True:
+        await asyncio.sleep(FLUSH_SECONDS)
+        try:
+            for channel_id in list(_buffers):
+                _flush(channel_id)
+            is_active()
+        except Exception as e:
+            logging.error(f"[DIGEST] Ошибка публикации сводки: {e}", exc_info=True)
+
+
+def get_digest_stats() -> Dict:
+    return {
+        'active': _active,
+        'buffered': sum(len(items) for items in _buffers.values()),
+    }
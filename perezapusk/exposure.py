@@ -0,0 +1,202 @@
+"""Риск казны по принятым ставкам и динамический лимит ставки.
+
+Для каждой ожидающей и играющейся ставки хранится её худший исход для казны:
+выплата с наибольшим множителем и реферальной частью за вычетом суммы ставки.
+Суммы по играм и общая сумма поддерживаются при приёме и расчёте ставок,
+поэтому проверка лимита при приёме — несколько обращений к словарям.
+Риск ставки занимается резервом (reserve) до первого await обработчика:
+иначе несколько одновременных ставок прошли бы проверку на один и тот же остаток.
+Периодически баланс казны запрашивается у CryptoBot, а открытые ставки
+пересчитываются из БД — так учитываются ставки других процессов и перезапуски.
+"""
+import asyncio
+import logging
+from decimal import ROUND_DOWN, Decimal
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+from money import Money, ZERO
+from payouts import REFERRAL_SHARE
+from rules import RuleSet, current as current_rules, for_version as rules_for_version
+
+CENT = Decimal('0.01')
+
+# Эти переменные будут установлены при инициализации
+db = None
+crypto_pay = None
+TREASURY_SHARE = Decimal('0.5')
+GAME_SHARE = Decimal('0.25')
+REFRESH_SECONDS = 30.0
+
+# Баланс казны в USDT; None — ещё не получен, тогда действуют только лимиты из правил
+_treasury: Optional[Decimal] = None
+_wagers: Dict[int, Tuple[str, Decimal]] = {}
+# Резервы ставок, которые ещё не созданы в БД; пересборка из БД их не трогает
+_reserved: Dict[Hashable, Tuple[str, Decimal]] = {}
+_by_game: Dict[str, Decimal] = {}
+_total = ZERO
+# Ставки, рассчитанные во время пересборки из БД: в прочитанных строках они ещё открыты
+_released: Set[int] = set()
+
+
+async def init_exposure(db_instance, crypto_pay_instance, treasury_share: float = 0.5,
+                        game_share: float = 0.25, refresh_seconds: float = 30.0):
+    """Инициализация учёта риска казны"""
+    global db, crypto_pay, TREASURY_SHARE, GAME_SHARE, REFRESH_SECONDS
+    db = db_instance
+    crypto_pay = crypto_pay_instance
+    TREASURY_SHARE = Decimal(str(treasury_share))
+    GAME_SHARE = Decimal(str(game_share))
+    REFRESH_SECONDS = refresh_seconds
+    await refresh()
+    logging.info(f"[EXPOSURE] Казна {_treasury}$, открытых ставок {len(_wagers)}, риск {_total:.2f}$")
+
+
+def _factor(game: str, bet_type: Optional[str], rules: RuleSet) -> Decimal:
+    """Худший исход казны на единицу суммы ставки."""
+    mult = rules.max_multiplier(game, bet_type)
+    if game != 'custom':
+        # Реферальная часть начисляется сверх выигрыша
+        mult = mult * (1 + REFERRAL_SHARE)
+    return mult - 1
+
+
+def liability(game: str, bet_type: Optional[str], amount: Decimal, rules: Optional[RuleSet] = None) -> Decimal:
+    """Сколько казна потеряет, если ставка сыграет с наибольшим множителем. У серии
+    автоставок amount — резерв на все раунды, и худший случай — выигрыш в каждом."""
+    return max(Money(amount) * _factor(game, bet_type, rules or current_rules()), ZERO)
+
+
+def _count(game: str, value: Decimal):
+    global _total
+    _by_game[game] = _by_game.get(game, ZERO) + value
+    _total += value
+
+
+def add(wager_id: int, game: str, value: Decimal):
+    if wager_id in _wagers:
+        return
+    _wagers[wager_id] = (game, value)
+    _count(game, value)
+
+
+def reserve(key: Hashable, game: str, value: Decimal) -> bool:
+    """Проверка лимита и резерв риска одним синхронным шагом; False — лимит исчерпан.
+    Резерв переходит к ставке через confirm или снимается через cancel."""
+    if not can_accept(game, value):
+        return False
+    _reserved[key] = (game, value)
+    _count(game, value)
+    return True
+
+
+def confirm(key: Hashable, wager_id: int):
+    """Ставка создана в БД: резерв становится её риском."""
+    entry = _reserved.pop(key, None)
+    if entry is None:
+        return
+    if wager_id in _wagers or wager_id in _released:
+        # Ставку уже учла пересборка из БД или она уже рассчитана
+        _count(entry[0], -entry[1])
+        return
+    _wagers[wager_id] = entry
+
+
+def cancel(key: Hashable):
+    """Снимает резерв ставки, которая не была создана; после confirm ничего не делает."""
+    entry = _reserved.pop(key, None)
+    if entry is not None:
+        _count(entry[0], -entry[1])
+
+
+def release(wager_id: int):
+    """Ставка рассчитана или возвращена; повторный вызов ничего не меняет."""
+    _released.add(wager_id)
+    entry = _wagers.pop(wager_id, None)
+    if entry is None:
+        return
+    game, value = entry
+    _count(game, -value)
+
+
+def room(game: str) -> Optional[Decimal]:
+    """Сколько риска ещё можно принять по игре; None — баланс казны неизвестен."""
+    if _treasury is None:
+        return None
+    return max(min(_treasury * TREASURY_SHARE - _total, _treasury * GAME_SHARE - _by_game.get(game, ZERO)), ZERO)
+
+
+def can_accept(game: str, value: Decimal) -> bool:
+    available = room(game)
+    return available is None or value <= available
+
+
+def max_bet(game: str, bet_type: Optional[str], rules: Optional[RuleSet] = None) -> Decimal:
+    """Наибольшая сумма ставки: лимит из правил, уменьшенный под свободный риск казны."""
+    rules = rules or current_rules()
+    static = rules.limits(game)[1]
+    available = room(game)
+    factor = _factor(game, bet_type, rules)
+    if available is None or factor <= 0:
+        return static
+    return min(static, (available / factor).quantize(CENT, rounding=ROUND_DOWN))
+
+
+async def _fetch_treasury() -> Optional[Decimal]:
+    try:
+        balance_data = await crypto_pay.get_balance()
+    except Exception as e:
+        logging.error(f"[EXPOSURE] Баланс казны не получен: {e}")
+        return _treasury
+    if not balance_data.get('ok'):
+        logging.error(f"[EXPOSURE] Баланс казны не получен: {balance_data.get('error')}")
+        return _treasury
+    return next(
+        (Decimal(balance.get('available', '0')) for balance in balance_data.get('result', [])
+         if balance.get('currency_code', '').upper() == 'USDT'),
+        Decimal('0')
+    )
+
+
+async def refresh():
+    """Обновляет баланс казны и пересобирает риск по открытым ставкам из БД."""
+    global _treasury, _total
+    known = set(_wagers)
+    _released.clear()
+    treasury = await _fetch_treasury()
+    wagers = {}
+    for wager in await db.get_open_wagers():
+        if wager['id'] in _released:
+            continue
+        rules = await rules_for_version(wager['rules_version'])
+        wagers[wager['id']] = (wager['game'], liability(wager['game'], wager['bet_type'], wager['amount'], rules))
+    # Ставки, принятые во время чтения, сохраняются; остальные берутся из БД —
+    # так снимаются и ставки, которые рассчитал другой процесс
+    wagers.update((wager_id, entry) for wager_id, entry in _wagers.items()
+                  if wager_id not in known and wager_id not in wagers and wager_id not in _released)
+    _treasury = treasury
+    _wagers.clear()
+    _by_game.clear()
+    _total = ZERO
+    for wager_id, (game, value) in wagers.items():
+        add(wager_id, game, value)
+    for game, value in _reserved.values():
+        _count(game, value)
+
+
+async def exposure_loop():
+    while True:
+        await asyncio.sleep(REFRESH_SECONDS)
+        try:
+            await refresh()
+        except Exception as e:
+            logging.error(f"[EXPOSURE] Ошибка обновления риска: {e}", exc_info=True)
+
+
+def get_exposure_stats() -> Dict:
+    return {
+        'treasury': _treasury,
+        'total': _total,
+        'room': None if _treasury is None else max(_treasury * TREASURY_SHARE - _total, ZERO),
+        'open': len(_wagers) + len(_reserved),
+        'games': {game: value for game, value in _by_game.items() if value > 0},
+    }
@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import re
+import secrets
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from rules import RuleSet, current as current_rules
+
+# Эти переменные будут установлены при инициализации
+db = None
+SECRET = b""
+REVEAL_DELAY = 60.0
+
+# У каждого игрока своя пара сидов: client seed он задаёт сам (/fair seed),
+# а server seed — HMAC секрета по номеру игрока и пары, поэтому в БД лежит
+# только его хеш. Номера исходов идут подряд внутри пары; при смене пары
+# старая закрывается, и через REVEAL_DELAY её server seed раскрывается.
+# Номера резервируются пачками по BUFFER_SIZE, а их числа r считаются заранее:
+# ставка берёт готовое r из буфера игрока без обращения к БД. Буфер живёт
+# меньше REVEAL_DELAY, чтобы не выдавать исходы пары, закрытой другим процессом,
+# после раскрытия её server seed
+CLIENT_SEED_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,32}")
+BUFFER_SIZE = 32
+MAX_BUFFERS = 10000
+_locks: Dict[int, asyncio.Lock] = {}
+_buffers: Dict[int, "_Buffer"] = {}
+
+
+def sha256_hex(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def load_secret(value: Optional[str], path: str) -> str:
+    """Секрет сидов из переменной окружения или из файла рядом с ботом; файл
+    создаётся при первом запуске. Секрет не должен попадать в БД и её копии."""
+    if value:
+        return value
+    if os.path.exists(path):
+        with open(path) as f:
+            return f.read().strip()
+    secret = secrets.token_hex(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(secret)
+    logging.warning(f"[FAIR] Создан новый секрет сидов {path}")
+    return secret
+
+
+def server_seed_for(user_id: int, seed_index: int) -> str:
+    return hmac.new(SECRET, f"{user_id}:{seed_index}".encode(), hashlib.sha256).hexdigest()
+
+
+def roll(server_seed: str, client_seed: str, nonce: int) -> float:
+    """Число r из [0, 1): первые 52 бита HMAC-SHA256(server_seed, "client_seed:nonce")."""
+    digest = hmac.new(server_seed.encode(), f"{client_seed}:{nonce}".encode(), hashlib.sha256).digest()
+    return (int.from_bytes(digest[:7], "big") >> 4) / 2 ** 52
+
+
+def outcome_from_seed(server_seed: str, client_seed: str, nonce: int, game_key: str,
+                      rules: Optional[RuleSet] = None) -> int:
+    """Исход по сидам и номеру — см. roll и outcome_from_roll."""
+    return outcome_from_roll(roll(server_seed, client_seed, nonce), game_key, rules)
+
+
+def outcome_from_roll(r: float, game_key: str, rules: Optional[RuleSet] = None) -> int:
+    """Авторская игра (game_key — ставка): коэффициент, если r < шанса, иначе
+    равномерно одно из остальных значений. Остальные игры: 1 + floor(r * faces) —
+    грань кубика, для КНБ 1 — камень, 2 — ножницы, 3 — бумага."""
+    rules = rules or current_rules()
+    if game_key not in rules.custom_games:
+        return 1 + int(r * rules.games[game_key].faces)
+    _, coef, chance = rules.custom_games[game_key]
+    if r < chance:
+        return coef
+    return 1 + min(coef - 2, int((r - chance) / (1 - chance) * (coef - 1)))
+
+
+def verify(server_seed: str, seed_hash: str, client_seed: str, nonce: int, game_key: str, value: int,
+           rules: Optional[RuleSet] = None) -> bool:
+    """Проверка ставки: сид совпадает с опубликованным хешем и даёт тот же исход."""
+    return (sha256_hex(server_seed) == seed_hash
+            and outcome_from_seed(server_seed, client_seed, nonce, game_key, rules) == value)
+
+
+async def init_fairness(db_instance, secret: str, reveal_delay: float = 60.0):
+    """Инициализация честной генерации исходов"""
+    global db, SECRET, REVEAL_DELAY
+    db = db_instance
+    SECRET = secret.encode()
+    REVEAL_DELAY = reveal_delay
+    logging.info(f"[FAIR] Секрет сидов загружен, отпечаток {sha256_hex(secret)[:8]}, "
+                 f"раскрытие через {reveal_delay:.0f} с")
+
+
+def revealed_server_seed(seed: Dict) -> Optional[str]:
+    """Server seed закрытой пары, если задержка раскрытия уже прошла."""
+    if seed['closed_at'] is None or seed['closed_at'] + REVEAL_DELAY > time.time():
+        return None
+    return server_seed_for(seed['user_id'], seed['seed_index'])
+
+
+class _Buffer:
+    __slots__ = ("seed", "nonce", "rolls", "expires")
+
+    def __init__(self, seed: Dict, nonce: int, rolls: deque):
+        self.seed = seed
+        self.nonce = nonce
+        self.rolls = rolls
+        self.expires = time.monotonic() + REVEAL_DELAY / 2
+
+    def usable(self, count: int) -> bool:
+        return len(self.rolls) >= count and time.monotonic() < self.expires
+
+    def take(self, count: int) -> Tuple[Dict, int, List[float]]:
+        start = self.nonce
+        self.nonce += count
+        return self.seed, start, [self.rolls.popleft() for _ in range(count)]
+
+
+def _lock(user_id: int) -> asyncio.Lock:
+    return _locks.setdefault(user_id, asyncio.Lock())
+
+
+async def _open_seed(user_id: int, seed_index: int, client_seed: Optional[str] = None):
+    server_seed = server_seed_for(user_id, seed_index)
+    await db.create_fair_seed(user_id, seed_index, sha256_hex(server_seed),
+                              client_seed or secrets.token_hex(8))
+
+
+async def active_seed(user_id: int) -> Dict:
+    """Действующая пара сидов игрока; первая создаётся при первой ставке."""
+    seed = await db.get_fair_seed(user_id)
+    if seed is None:
+        await _open_seed(user_id, 1)
+        seed = await db.get_fair_seed(user_id)
+    return seed
+
+
+def _prune():
+    now = time.monotonic()
+    for user_id, buffer in list(_buffers.items()):
+        if buffer.expires <= now:
+            del _buffers[user_id]
+
+
+async def _refill(user_id: int, count: int) -> _Buffer:
+    seed = await db.reserve_fair_nonces(user_id, count)
+    if seed is None:
+        await active_seed(user_id)
+        seed = await db.reserve_fair_nonces(user_id, count)
+    start = seed['next_nonce'] - count
+    server_seed = server_seed_for(user_id, seed['seed_index'])
+    buffer = _Buffer(seed, start, deque(roll(server_seed, seed['client_seed'], nonce)
+                                        for nonce in range(start, start + count)))
+    if len(_buffers) >= MAX_BUFFERS:
+        _prune()
+    _buffers[user_id] = buffer
+    return buffer
+
+
+async def _take(user_id: int, count: int) -> Tuple[Dict, int, List[float]]:
+    buffer = _buffers.get(user_id)
+    if buffer is None or not buffer.usable(count):
+        async with _lock(user_id):
+            buffer = _buffers.get(user_id)
+            if buffer is None or not buffer.usable(count):
+                # Остаток старого буфера пропадает: номера в паре идут с пропуском
+                buffer = await _refill(user_id, max(BUFFER_SIZE, count))
+    return buffer.take(count)
+
+
+async def draw(user_id: int, game_key: str, rules: Optional[RuleSet] = None) -> Tuple[int, int, int]:
+    """Следующий исход игры по сидам игрока: (значение, пара сидов, номер)."""
+    seed, nonce, rolls = await _take(user_id, 1)
+    return outcome_from_roll(rolls[0], game_key, rules), seed['id'], nonce
+
+
+async def rotate(user_id: int, client_seed: Optional[str] = None) -> Tuple[Optional[Dict], Dict]:
+    """Закрывает действующую пару игрока и открывает новую с client_seed
+    (по умолчанию — прежним): (закрытая пара или None, новая пара). Server seed
+    закрытой пары раскрывается через REVEAL_DELAY."""
+    async with _lock(user_id):
+        _buffers.pop(user_id, None)
+        current = await active_seed(user_id)
+        server_seed = server_seed_for(user_id, current['seed_index'] + 1)
+        closed = None
+        if await db.rotate_fair_seed(current['id'], user_id, current['seed_index'] + 1,
+                                     sha256_hex(server_seed), client_seed or current['client_seed']):
+            closed = await db.get_fair_seed_by_id(current['id'])
+        return closed, await db.get_fair_seed(user_id)
+
+
+def verify_series(server_seed: str, seed_hash: str, client_seed: str, start: int, game_key: str,
+                  values: List[int], rules: Optional[RuleSet] = None) -> bool:
+    """Проверка серии автоставок: все её значения — подряд идущие номера пары сидов."""
+    return (sha256_hex(server_seed) == seed_hash
+            and series_values(server_seed, client_seed, start, len(values), game_key, rules) == values)
+
+
+def series_values(server_seed: str, client_seed: str, start: int, count: int, game_key: str,
+                  rules: Optional[RuleSet] = None) -> List[int]:
+    return [outcome_from_seed(server_seed, client_seed, nonce, game_key, rules)
+            for nonce in range(start, start + count)]
+
+
+async def draw_series(user_id: int, game_key: str, count: int,
+                      rules: Optional[RuleSet] = None) -> Tuple[List[int], int, int]:
+    """count исходов подряд идущих номеров пары сидов игрока — для серии автоставок:
+    (значения, пара сидов, первый номер)."""
+    seed, start, rolls = await _take(user_id, count)
+    return [outcome_from_roll(r, game_key, rules) for r in rolls], seed['id'], start
@@ -0,0 +1,84 @@
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+# Эти переменные будут установлены при инициализации
+db = None
+
+# Ошибки, после которых сохранённый file_id больше не годится; остальные
+# (неверная подпись, удалённый чат и т.п.) не связаны с файлом
+FILE_ID_ERRORS = ("wrong file identifier", "wrong remote file identifier", "file reference expired")
+
+_file_ids: Dict[str, str] = {}
+_hashes: Dict[str, Tuple[float, int, str]] = {}
+
+
+async def init_media(db_instance):
+    """Загружает сохранённые file_id из базы"""
+    global db
+    db = db_instance
+    _file_ids.update(await db.get_media_file_ids())
+    logging.info(f"[MEDIA] Загружено file_id: {len(_file_ids)}")
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def _file_hash(path: str) -> str:
+    # Хеш пересчитывается только при изменении размера или времени файла
+    stat = os.stat(path)
+    cached = _hashes.get(path)
+    if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+        return cached[2]
+    file_hash = await asyncio.to_thread(_sha256, path)
+    _hashes[path] = (stat.st_mtime, stat.st_size, file_hash)
+    return file_hash
+
+
+def _is_file_id_error(error: TelegramBadRequest) -> bool:
+    text = error.message.lower().replace("_", " ")
+    return any(marker in text for marker in FILE_ID_ERRORS)
+
+
+def _extract_file_id(message: Message) -> Optional[str]:
+    if message.video:
+        return message.video.file_id
+    if message.animation:
+        return message.animation.file_id
+    if message.photo:
+        return message.photo[-1].file_id
+    if message.document:
+        return message.document.file_id
+    return None
+
+
+async def send_media(send, path: str, field: str = "video", **kwargs) -> Message:
+    """Отправляет файл через send (bot.send_video, message.answer_video и т.п.).
+    Файл загружается один раз, дальше используется сохранённый file_id."""
+    file_hash = await _file_hash(path)
+    file_id = _file_ids.get(file_hash)
+    if file_id:
+        try:
+            return await send(**{field: file_id}, **kwargs)
+        except TelegramBadRequest as e:
+            if not _is_file_id_error(e):
+                raise
+            logging.warning(f"[MEDIA] file_id для {path} не принят, загружаем заново: {e}")
+            _file_ids.pop(file_hash, None)
+            await db.delete_media_file_id(file_hash)
+    message = await send(**{field: FSInputFile(path)}, **kwargs)
+    file_id = _extract_file_id(message)
+    if file_id:
+        _file_ids[file_hash] = file_id
+        await db.set_media_file_id(file_hash, path, file_id)
+    return message
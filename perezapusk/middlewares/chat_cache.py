@@ -0,0 +1,21 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from chat_cache import remember_user
+
+
+class ChatCacheMiddleware(BaseMiddleware):
+    """Обновляет кеш чатов по отправителю каждого входящего апдейта."""
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is not None and not user.is_bot:
+            remember_user(user)
+        return await handler(event, data)
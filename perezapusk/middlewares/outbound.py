@@ -0,0 +1,172 @@
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+
+# Классы приоритета: чем меньше число, тем раньше уходит запрос
+BET_RESULT = 0
+DM = 1
+BROADCAST = 2
+CONTEST = 3
+
+_priority: ContextVar[int] = ContextVar("outbound_priority", default=DM)
+
+# Лимитируются только запросы, которые пишут в чат
+_LIMITED_PREFIXES = ("Send", "Edit", "Copy", "Forward")
+
+
+@contextmanager
+def priority(level: int):
+    """Задаёт класс приоритета исходящих запросов в текущем контексте."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _Bucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def wait_time(self, now: float) -> float:
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class OutboundScheduler(BaseRequestMiddleware):
+    """Ограничивает исходящие запросы к Telegram общим и початовыми токен-бакетами.
+
+    Ожидающие запросы выдаются по приоритету; запрос в чат, чей бакет пуст,
+    не задерживает запросы в другие чаты. TelegramRetryAfter блокирует чат
+    и общий бакет на указанное время — флуд-контроль Telegram действует на весь
+    бот, — и запрос повторяется.
+    """
+
+    def __init__(self, global_rate: float = 30, private_rate: float = 1, private_burst: float = 3,
+                 group_per_minute: float = 20, group_burst: float = 5, max_retries: int = 3):
+        self.private_rate = private_rate
+        self.private_burst = private_burst
+        self.group_rate = group_per_minute / 60
+        self.group_burst = group_burst
+        self.max_retries = max_retries
+        self._global = _Bucket(global_rate, global_rate)
+        self._chats: Dict[object, _Bucket] = {}
+        self._waiters: List[list] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _chat_bucket(self, chat_id) -> _Bucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) > 10000:
+                self._prune()
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            if is_group:
+                bucket = _Bucket(self.group_rate, self.group_burst)
+            else:
+                bucket = _Bucket(self.private_rate, self.private_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _prune(self):
+        now = time.monotonic()
+        for chat_id, bucket in list(self._chats.items()):
+            if bucket.wait_time(now) == 0 and bucket.tokens >= bucket.capacity:
+                del self._chats[chat_id]
+
+    async def _acquire(self, chat_id, level: int):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append([level, next(self._seq), chat_id, future])
+        self._wakeup.set()
+        await future
+
+    async def _dispatch(self):
+        while True:
+            if not self._waiters:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = time.monotonic()
+            delay = self._global.wait_time(now)
+            if delay == 0:
+                self._waiters.sort()
+                granted = None
+                delays = []
+                for waiter in self._waiters:
+                    future = waiter[3]
+                    if future.done():
+                        continue
+                    bucket = self._chat_bucket(waiter[2])
+                    wait = bucket.wait_time(now)
+                    if wait == 0:
+                        bucket.take()
+                        self._global.take()
+                        future.set_result(None)
+                        granted = waiter
+                        break
+                    delays.append(wait)
+                self._waiters = [w for w in self._waiters if not w[3].done()]
+                if granted is not None:
+                    continue
+                delay = min(delays) if delays else 0
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def __call__(self, make_request: NextRequestMiddlewareType[TelegramType], bot: Bot,
+                       method: TelegramMethod[TelegramType]):
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None or not type(method).__name__.startswith(_LIMITED_PREFIXES):
+            return await make_request(bot, method)
+        attempt = 0
+        while True:
+            await self._acquire(chat_id, _priority.get())
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                until = time.monotonic() + e.retry_after
+                self._chat_bucket(chat_id).blocked_until = until
+                self._global.blocked_until = max(self._global.blocked_until, until)
+                logging.warning(f"[OUTBOUND] {type(method).__name__} в {chat_id}: флуд-контроль {e.retry_after}с, повтор {attempt}")
+
+    def get_stats(self) -> Dict:
+        waiting = [w for w in self._waiters if not w[3].done()]
+        return {
+            'waiting': len(waiting),
+            'by_priority': {level: sum(1 for w in waiting if w[0] == level) for level in (BET_RESULT, DM, BROADCAST, CONTEST)},
+            'chats': len(self._chats),
+        }
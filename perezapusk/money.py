@@ -0,0 +1,84 @@
+from decimal import Decimal, ROUND_HALF_EVEN
+
+PRECISION = 8
+QUANTUM = Decimal(1).scaleb(-PRECISION)
+
+
+class Money(Decimal):
+    """Неизменяемая денежная сумма с фиксированной точностью.
+
+    Значение с более чем 8 знаками после точки округляется до 8 при создании
+    и после каждой операции, поэтому шум от REAL-хранения в SQLite отсекается
+    один раз на входе. Более короткая запись сохраняется, и str() совпадает
+    с Decimal: "1.00" остаётся "1.00". Money(Money) возвращает тот же объект
+    без повторной конвертации.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, value=0):
+        if type(value) is cls:
+            return value
+        if value is None:
+            value = 0
+        elif isinstance(value, float):
+            value = repr(value)
+        elif isinstance(value, bytes):
+            value = value.decode()
+        if not isinstance(value, Decimal):
+            value = Decimal(value)
+        exponent = value.as_tuple().exponent
+        if isinstance(exponent, int) and exponent < -PRECISION:
+            value = value.quantize(QUANTUM, ROUND_HALF_EVEN)
+        if not value:
+            value = abs(value)
+        return Decimal.__new__(cls, value)
+
+    def __add__(self, other):
+        result = Decimal.__add__(self, other)
+        return result if result is NotImplemented else Money(result)
+
+    def __radd__(self, other):
+        result = Decimal.__radd__(self, other)
+        return result if result is NotImplemented else Money(result)
+
+    def __sub__(self, other):
+        result = Decimal.__sub__(self, other)
+        return result if result is NotImplemented else Money(result)
+
+    def __rsub__(self, other):
+        result = Decimal.__rsub__(self, other)
+        return result if result is NotImplemented else Money(result)
+
+    def __mul__(self, other):
+        result = Decimal.__mul__(self, other)
+        return result if result is NotImplemented else Money(result)
+
+    def __rmul__(self, other):
+        result = Decimal.__rmul__(self, other)
+        return result if result is NotImplemented else Money(result)
+
+    def __truediv__(self, other):
+        result = Decimal.__truediv__(self, other)
+        if result is NotImplemented or isinstance(other, Money):
+            return result
+        return Money(result)
+
+    def __neg__(self):
+        return Money(Decimal.__neg__(self))
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return Money(Decimal.__abs__(self))
+
+    def __repr__(self):
+        return f"Money('{self!s}')"
+
+
+ZERO = Money(0)
+
+
+def format_money(value, places: int = 2) -> str:
+    return f"{Money(value):.{places}f}"
@@ -0,0 +1,60 @@
+import ast
+from decimal import Decimal
+from fractions import Fraction
+from itertools import product
+from typing import Callable, Dict, List, Sequence, Tuple
+
+Outcome = Tuple[int, ...]
+Condition = Callable[[Outcome], bool]
+
+NO_PAYOUT = Decimal('0')
+# Доля выигрыша, которая сверх выплаты игроку начисляется его рефереру;
+# в авторских играх реферальная часть не начисляется
+REFERRAL_SHARE = Decimal('0.15')
+
+# Условия в game_rules.json — выражения над значениями кубиков a и b:
+# сравнения, арифметика, and/or/not и проверка вхождения в кортеж
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Mod, ast.FloorDiv,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.Name, ast.Load, ast.Constant, ast.Tuple,
+)
+_VARIABLES = ('a', 'b')
+
+
+def compile_condition(expression: str, dice: int) -> Condition:
+    tree = ast.parse(expression, mode='eval')
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"недопустимое выражение в условии: {expression!r}")
+        if isinstance(node, ast.Name) and node.id not in _VARIABLES[:dice]:
+            raise ValueError(f"неизвестная переменная {node.id!r} в условии: {expression!r}")
+        if isinstance(node, ast.Constant) and type(node.value) is not int:
+            raise ValueError(f"в условии допустимы только целые числа: {expression!r}")
+    code = compile(tree, '<game_rules>', 'eval')
+    return lambda o: bool(eval(code, {'__builtins__': {}}, dict(zip(_VARIABLES, o))))
+
+
+def outcome_space(faces: int, dice: int) -> Tuple[Outcome, ...]:
+    """Все исходы ставки: значения кубика Telegram (или выбора бота) на каждый бросок."""
+    return tuple(product(range(1, faces + 1), repeat=dice))
+
+
+def compile_payouts(space: Sequence[Outcome], rules: List[Tuple[Decimal, Condition]]) -> Dict[Outcome, Decimal]:
+    """Срабатывает первое подходящее правило; исход без правила — проигрыш и не хранится."""
+    compiled = {}
+    for outcome in space:
+        for mult, condition in rules:
+            if condition(outcome):
+                if mult:
+                    compiled[outcome] = mult
+                break
+    return compiled
+
+
+def custom_distribution(coef: int, chance: float) -> List[Tuple[Outcome, Fraction]]:
+    """В авторских играх выигрышное значение выпадает с шансом chance, остальные — поровну."""
+    win = Fraction(str(chance))
+    lose = (1 - win) / (coef - 1)
+    return [((v,), win if v == coef else lose) for v in range(1, coef + 1)]
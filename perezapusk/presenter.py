@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+
+from middlewares.outbound import BET_RESULT, priority
+
+# Эти переменные будут установлены при инициализации
+WORKERS = 4
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 2.0
+
+_queue: Optional[asyncio.Queue] = None
+_tasks: List[asyncio.Task] = []
+_retrying = 0
+
+Step = Callable[[], Awaitable]
+
+
+def init_presenter(workers: int = 4, max_attempts: int = 5, retry_delay: float = 2.0):
+    """Инициализация очереди показа результатов"""
+    global WORKERS, MAX_ATTEMPTS, RETRY_DELAY, _queue
+    WORKERS = max(1, workers)
+    MAX_ATTEMPTS = max_attempts
+    RETRY_DELAY = retry_delay
+    _queue = asyncio.Queue()
+    for _ in range(WORKERS):
+        _tasks.append(asyncio.create_task(_worker()))
+    logging.info(f"[PRESENTER] Очередь показа запущена: {WORKERS} обработчиков")
+
+
+def present(name: str, steps: List[Step], level: int = BET_RESULT):
+    """Ставит в очередь шаги показа одной ставки; шаги выполняются по порядку,
+    упавший шаг повторяется отдельно, не задерживая другие ставки."""
+    if steps:
+        _queue.put_nowait({'name': name, 'steps': deque(steps), 'attempts': 0, 'priority': level})
+
+
+def _requeue(job: Dict):
+    global _retrying
+    _retrying -= 1
+    _queue.put_nowait(job)
+
+
+async def _worker():
+    global _retrying
+    loop = asyncio.get_running_loop()
+    while True:
+        job = await _queue.get()
+        steps = job['steps']
+        while steps:
+            try:
+                with priority(job['priority']):
+                    await steps[0]()
+            except (TelegramBadRequest, TelegramForbiddenError) as e:
+                # Повтор не поможет: сообщение удалено, бот заблокирован и т.п.
+                logging.warning(f"[PRESENTER] {job['name']}: шаг пропущен: {e}")
+            except Exception as e:
+                job['attempts'] += 1
+                if job['attempts'] < MAX_ATTEMPTS:
+                    delay = RETRY_DELAY * 2 ** (job['attempts'] - 1)
+                    logging.warning(f"[PRESENTER] {job['name']}: ошибка шага, повтор через {delay:.0f}с: {e}")
+                    _retrying += 1
+                    loop.call_later(delay, _requeue, job)
+                    break
+                logging.error(f"[PRESENTER] {job['name']}: шаг пропущен после {MAX_ATTEMPTS} попыток: {e}")
+            steps.popleft()
+            job['attempts'] = 0
+
+
+def get_presenter_stats() -> Dict:
+    return {
+        'queued': _queue.qsize() if _queue else 0,
+        'retrying': _retrying,
+    }
@@ -0,0 +1,177 @@
+import logging
+import re
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Tuple
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+
+
+def normalize_sql(sql: str) -> str:
+    sql = _WHITESPACE_RE.sub(" ", sql).strip()
+    sql = _STRING_RE.sub("?", sql)
+    return _NUMBER_RE.sub("?", sql)
+
+
+def params_shape(params) -> str:
+    if not params:
+        return "()"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items()) + "}"
+    return "(" + ", ".join(type(v).__name__ for v in params) + ")"
+
+
+class SlowQueryLog:
+    """Пишет медленные запросы с планом выполнения в отдельный ротируемый файл.
+    Файл открывается при первом медленном запросе."""
+
+    def __init__(self, threshold_ms: float, path: str = "slow_queries.log",
+                 max_bytes: int = 5 * 1024 * 1024, backup_count: int = 3):
+        self.threshold = threshold_ms / 1000
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._plans: Dict[str, Tuple[str, bool]] = {}
+        self.logger = logging.getLogger("slow_queries")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+
+    def _open(self):
+        handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backup_count,
+                                      encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        self.logger.addHandler(handler)
+
+    async def _explain(self, conn, sql: str, params) -> Tuple[str, bool]:
+        if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+            return "-", False
+        try:
+            cursor = await conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ())
+            rows = await cursor.fetchall()
+            await cursor.close()
+        except Exception as e:
+            return f"EXPLAIN failed: {e}", False
+        details = [row[3] if isinstance(row, tuple) else row["detail"] for row in rows]
+        full_scan = any(detail.startswith("SCAN ") and " USING " not in detail for detail in details)
+        return " | ".join(details), full_scan
+
+    async def record(self, conn, sql: str, params, elapsed: float):
+        shape = normalize_sql(sql)
+        plan = self._plans.get(shape)
+        if plan is None:
+            plan = await self._explain(conn, sql, params)
+            self._plans[shape] = plan
+        detail, full_scan = plan
+        if not self.logger.handlers:
+            self._open()
+        self.logger.info(
+            f"{elapsed * 1000:.1f}ms{' FULL_SCAN' if full_scan else ''} "
+            f"params={params_shape(params)} sql={shape} plan={detail}"
+        )
+
+
+class _TimedCursor:
+    """Курсор, к времени запроса которого добавляется время выборки строк:
+    у SELECT основная работа идёт в fetch*, а не в execute."""
+
+    __slots__ = ("_cursor", "_conn", "_log", "_sql", "_params", "_elapsed", "_logged")
+
+    def __init__(self, cursor, conn, log: SlowQueryLog, sql: str, params, elapsed: float):
+        self._cursor = cursor
+        self._conn = conn
+        self._log = log
+        self._sql = sql
+        self._params = params
+        self._elapsed = elapsed
+        self._logged = False
+
+    async def _check(self):
+        # Запрос пишется в лог один раз — когда общее время впервые превысило порог
+        if self._logged or self._elapsed < self._log.threshold:
+            return
+        self._logged = True
+        try:
+            await self._log.record(self._conn, self._sql, self._params, self._elapsed)
+        except Exception as e:
+            logging.error(f"[SLOW_QUERY] Не удалось записать запрос: {e}")
+
+    async def _timed(self, fetch, *args):
+        start = time.perf_counter()
+        result = await fetch(*args)
+        self._elapsed += time.perf_counter() - start
+        await self._check()
+        return result
+
+    def fetchone(self):
+        return self._timed(self._cursor.fetchone)
+
+    def fetchall(self):
+        return self._timed(self._cursor.fetchall)
+
+    def fetchmany(self, size=None):
+        return self._timed(self._cursor.fetchmany, *(() if size is None else (size,)))
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _TimedStatement:
+    __slots__ = ("_conn", "_log", "_sql", "_params", "_many", "_cursor")
+
+    def __init__(self, conn, log: SlowQueryLog, sql: str, params, many: bool = False):
+        self._conn = conn
+        self._log = log
+        self._sql = sql
+        self._params = params
+        self._many = many
+        self._cursor = None
+
+    async def _run(self):
+        start = time.perf_counter()
+        if self._many:
+            # План и форма параметров берутся по первому набору
+            params = list(self._params)
+            cursor = await self._conn.executemany(self._sql, params)
+            first = params[0] if params else None
+        else:
+            cursor = await self._conn.execute(self._sql, self._params)
+            first = self._params
+        timed = _TimedCursor(cursor, self._conn, self._log, self._sql, first, time.perf_counter() - start)
+        await timed._check()
+        return timed
+
+    def __await__(self):
+        return self._run().__await__()
+
+    async def __aenter__(self):
+        self._cursor = await self._run()
+        return self._cursor
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._cursor.close()
+
+
+class ProfiledConnection:
+    """Обёртка над соединением aiosqlite, замеряющая время execute и executemany
+    вместе с выборкой строк из курсора."""
+
+    __slots__ = ("_conn", "_log")
+
+    def __init__(self, conn, log: SlowQueryLog):
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_log", log)
+
+    def execute(self, sql: str, parameters=None):
+        return _TimedStatement(self._conn, self._log, sql, parameters)
+
+    def executemany(self, sql: str, parameters):
+        return _TimedStatement(self._conn, self._log, sql, parameters, many=True)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
@@ -0,0 +1,154 @@
+import keyword
+import sqlite3
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from money import Money
+
+
+class Record:
+    """Строка БД со слотами вместо словаря; поддерживает чтение как dict."""
+
+    __slots__ = ("_extra",)
+    _fields: Tuple[str, ...] = ()
+    _index: FrozenSet[str] = frozenset()
+    _coerce: Tuple[int, ...] = ()
+    _decimal_fields: FrozenSet[str] = frozenset()
+
+    def __init__(self, values):
+        if self._coerce:
+            values = list(values)
+            for i in self._coerce:
+                value = values[i]
+                if value is not None and type(value) is not Money:
+                    values[i] = Money(value)
+        for name, value in zip(self._fields, values):
+            setattr(self, name, value)
+        self._extra = None
+
+    def __getitem__(self, key):
+        if key in self._index:
+            return getattr(self, key)
+        if isinstance(key, int):
+            return getattr(self, self._fields[key])
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self._index:
+            setattr(self, key, value)
+            return
+        if self._extra is None:
+            self._extra = {}
+        self._extra[key] = value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except (KeyError, IndexError):
+            return default
+
+    def __contains__(self, key):
+        return key in self._index or (self._extra is not None and key in self._extra)
+
+    def keys(self):
+        if self._extra:
+            return list(self._fields) + list(self._extra)
+        return list(self._fields)
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self._fields) + len(self._extra or ())
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+
+class UserRecord(Record):
+    __slots__ = ()
+    _decimal_fields = frozenset({
+        "balance", "bonus_balance", "bonus_wager_left", "bonus_wager_total",
+        "ref_balance", "ref_earnings", "last_claimed_turnover", "total_turnover"
+    })
+
+
+class CheckRecord(Record):
+    __slots__ = ()
+    _decimal_fields = frozenset({"amount", "required_turnover", "wagering_multiplier", "wagering_left"})
+
+
+class WagerRecord(Record):
+    __slots__ = ()
+    _decimal_fields = frozenset({"amount", "payout", "ref_reward", "stop_loss", "take_profit"})
+
+
+class ContestRecord(Record):
+    __slots__ = ()
+
+
+class ParticipantRecord(Record):
+    __slots__ = ()
+    _decimal_fields = frozenset({"value"})
+
+
+_RESERVED = frozenset(dir(Record))
+_variants: Dict[Tuple[type, Tuple[str, ...]], Optional[type]] = {}
+
+
+def _record_class(base: type, names: Tuple[str, ...]) -> Optional[type]:
+    key = (base, names)
+    if key in _variants:
+        return _variants[key]
+    cls = None
+    valid = all(
+        name.isidentifier() and not keyword.iskeyword(name) and name not in _RESERVED
+        for name in names
+    )
+    if valid and len(set(names)) == len(names):
+        cls = type(base.__name__, (base,), {
+            "__slots__": names,
+            "_fields": names,
+            "_index": frozenset(names),
+            "_coerce": tuple(i for i, name in enumerate(names) if name in base._decimal_fields),
+        })
+    _variants[key] = cls
+    return cls
+
+
+def record_factory(base: type = Record):
+    """Фабрика строк для aiosqlite: класс записи строится один раз на набор колонок."""
+    last = (None, None)
+
+    def factory(cursor, row):
+        nonlocal last
+        description = cursor.description
+        cached_description, cls = last
+        if cached_description is not description:
+            cls = _record_class(base, tuple(column[0] for column in description))
+            last = (description, cls)
+        if cls is None:
+            return sqlite3.Row(cursor, row)
+        return cls(row)
+
+    return factory
+
+
+records = record_factory(Record)
+user_records = record_factory(UserRecord)
+check_records = record_factory(CheckRecord)
+wager_records = record_factory(WagerRecord)
+contest_records = record_factory(ContestRecord)
+participant_records = record_factory(ParticipantRecord)
@@ -0,0 +1,110 @@
+"""Точный расчёт RTP и преимущества казино по текущим правилам игр (game_rules.json).
+
+Запуск: python rtp_exact.py [--game cube] [--csv rtp.csv]
+        python rtp_exact.py --check  # сверка с RTP, посчитанными вручную (rtp_sim.KNOWN_RTP)
+Перебирает все исходы каждой ставки с их точными вероятностями (Fraction).
+"""
+import argparse
+import csv
+import sys
+from fractions import Fraction
+from typing import Dict, List, Optional
+
+from payouts import REFERRAL_SHARE
+from rules import RuleSet, current
+from rtp_sim import KNOWN_RTP
+
+COLUMNS = (
+    'game', 'bet', 'rtp', 'house_edge', 'house_edge_ref', 'max_payout', 'max_exposure',
+    'win_chance', 'volatility'
+)
+
+_cache: Dict[int, List[Dict]] = {}
+
+
+def analyse_bet(game: str, bet: str, rules: Optional[RuleSet] = None) -> Dict:
+    """Ожидаемая выплата на 1$ ставки и её разброс; *_ref — если у игрока есть реферер."""
+    rules = rules or current()
+    referral = Fraction(REFERRAL_SHARE) if game != 'custom' else Fraction(0)
+    expected = Fraction(0)
+    second_moment = Fraction(0)
+    win_chance = Fraction(0)
+    max_payout = Fraction(0)
+    for outcome, probability in rules.outcome_distribution(game, bet):
+        mult = Fraction(rules.payouts.get((game, bet, outcome), 0))
+        expected += probability * mult
+        second_moment += probability * mult * mult
+        if mult:
+            win_chance += probability
+            max_payout = max(max_payout, mult)
+    return {
+        'game': game,
+        'bet': bet,
+        'rtp': expected,
+        'house_edge': 1 - expected,
+        # Реферальная часть платится сверх выигрыша, поэтому это расход казино
+        'house_edge_ref': 1 - expected * (1 + referral),
+        'max_payout': max_payout,
+        'max_exposure': max_payout * (1 + referral) - 1,
+        'win_chance': win_chance,
+        'variance': second_moment - expected * expected,
+        'volatility': float(second_moment - expected * expected) ** 0.5,
+    }
+
+
+def analyse_all() -> List[Dict]:
+    """Все ставки всех игр; результат кэшируется по версии правил."""
+    rules = current()
+    results = _cache.get(rules.version)
+    if results is None:
+        results = [analyse_bet(game, bet, rules) for game, bets in rules.tables.items() for bet in bets]
+        _cache[rules.version] = results
+    return results
+
+
+def export_csv(path: str, game: Optional[str] = None):
+    version = current().version
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(('rules_version',) + COLUMNS)
+        for r in analyse_all():
+            if game and r['game'] != game:
+                continue
+            writer.writerow((version,) + tuple(
+                r[c] if c in ('game', 'bet') else f"{float(r[c]):.6f}" for c in COLUMNS
+            ))
+
+
+def check() -> bool:
+    """Точный RTP должен в точности совпасть с посчитанным вручную."""
+    ok = True
+    for (game, bet), expected in KNOWN_RTP.items():
+        rtp = analyse_bet(game, bet)['rtp']
+        ok = ok and rtp == expected
+        print(f"{'OK ' if rtp == expected else 'ERR'} {game:<12} {bet:<10} {float(rtp):.4%} ожидается {float(expected):.4%}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Точный RTP игр по таблицам выплат")
+    parser.add_argument("--game", help="только одна игра, например cube")
+    parser.add_argument("--csv", help="сохранить таблицу в CSV")
+    parser.add_argument("--check", action="store_true", help="сверить RTP с посчитанными вручную")
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(0 if check() else 1)
+    print(f"Правила v{current().version}; edge+ref — преимущество с учётом {REFERRAL_SHARE * 100:.0f}% рефереру")
+    print(f"{'игра':<20} {'ставка':<15} {'RTP':>9} {'edge':>8} {'edge+ref':>9} {'макс.':>7} {'шанс':>7} {'σ':>7}")
+    for r in analyse_all():
+        if args.game and r['game'] != args.game:
+            continue
+        print(f"{r['game']:<20} {r['bet']:<15} {float(r['rtp']):>9.4%} {float(r['house_edge']):>8.2%} "
+              f"{float(r['house_edge_ref']):>9.2%} {float(r['max_payout']):>7.2f} "
+              f"{float(r['win_chance']):>7.2%} {r['volatility']:>7.3f}")
+    if args.csv:
+        export_csv(args.csv, args.game)
+        print(f"Таблица сохранена: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Монте-Карло проверка RTP по текущим правилам игр (game_rules.json).
+
+Запуск: python rtp_sim.py [--rounds 1000000] [--game cube] [--seed 1]
+        python rtp_sim.py --check  # сверка с RTP, посчитанными вручную
+Исходы разыгрываются массивами NumPy (есть в requirements.txt). Запасной путь
+через random.choices нужен только для запуска без NumPy: он медленнее
+и с тем же --seed даёт другие исходы.
+"""
+import argparse
+import math
+import random
+import sys
+import time
+from collections import Counter
+from fractions import Fraction
+from typing import Dict, List, Optional
+
+from rules import current
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+Z95 = 1.959963984540054
+# Для --check: расхождение больше 4σ считается ошибкой, случайно это почти невозможно
+Z_CHECK = 4.0
+
+# RTP, посчитанные вручную: доля выигрышных граней × множитель. У 🏀 и ⚽
+# Telegram выдаёт значения 1–5, у остальных кубиков — 1–6
+KNOWN_RTP = {
+    ('basketball', 'гол'): Fraction(2, 5) * Fraction('1.85'),        # 4, 5
+    ('basketball', 'мимо'): Fraction(3, 5) * Fraction('1.4'),        # 1, 2, 3
+    ('basketball', 'чистыйгол'): Fraction(1, 5) * Fraction('3.5'),   # 5
+    ('basketball', 'застрял'): Fraction(1, 5) * Fraction('3.5'),     # 3
+    ('football', 'футгол'): Fraction(3, 5) * Fraction('1.4'),        # 3, 4, 5
+    ('football', 'футпромах'): Fraction(2, 5) * Fraction('1.85'),    # 1, 2
+    ('cube', 'чет'): Fraction(1, 2) * Fraction('1.85'),
+    ('cube', '1'): Fraction(1, 6) * 4,
+    ('darts', 'яблочко'): Fraction(1, 6) * Fraction('2.5'),
+    ('two_dice', 'ничья'): Fraction(6, 36) * 3,
+}
+
+
+def _table(game: str, bet: str):
+    rules = current()
+    distribution = rules.outcome_distribution(game, bet)
+    multipliers = [float(rules.payouts.get((game, bet, outcome), 0)) for outcome, _ in distribution]
+    probabilities = [float(p) for _, p in distribution]
+    return multipliers, probabilities
+
+
+def simulate(game: str, bet: str, rounds: int = 1_000_000, seed: Optional[int] = None) -> Dict:
+    """Разыгрывает rounds ставок по 1$ и возвращает RTP, дисперсию и 95% интервал."""
+    multipliers, probabilities = _table(game, bet)
+    if np is not None:
+        rng = np.random.default_rng(seed)
+        values = np.asarray(multipliers)[rng.choice(len(multipliers), size=rounds, p=probabilities)]
+        mean = float(values.mean())
+        variance = float(values.var(ddof=1))
+        hit_rate = float((values > 0).mean())
+    else:
+        # Множителей немного, поэтому суммы считаются по частотам, а не по каждой ставке
+        rng = random.Random(seed)
+        counts = Counter(rng.choices(multipliers, weights=probabilities, k=rounds))
+        mean = math.fsum(v * n for v, n in counts.items()) / rounds
+        variance = math.fsum((v - mean) ** 2 * n for v, n in counts.items()) / (rounds - 1)
+        hit_rate = sum(n for v, n in counts.items() if v > 0) / rounds
+    margin = Z95 * math.sqrt(variance / rounds)
+    return {
+        'game': game,
+        'bet': bet,
+        'rounds': rounds,
+        'rtp': mean,
+        'variance': variance,
+        'ci_low': mean - margin,
+        'ci_high': mean + margin,
+        'hit_rate': hit_rate,
+    }
+
+
+def simulate_all(rounds: int = 1_000_000, seed: Optional[int] = None, game: Optional[str] = None) -> List[Dict]:
+    results = []
+    for game_key, bets in current().tables.items():
+        if game and game_key != game:
+            continue
+        for bet in bets:
+            results.append(simulate(game_key, bet, rounds, None if seed is None else seed + len(results)))
+    return results
+
+
+def check(rounds: int, seed: Optional[int]) -> bool:
+    """Сверяет симуляцию с KNOWN_RTP; False — хотя бы одна ставка вне интервала."""
+    ok = True
+    for (game, bet), expected in KNOWN_RTP.items():
+        r = simulate(game, bet, rounds, seed)
+        margin = Z_CHECK * math.sqrt(r['variance'] / rounds)
+        passed = abs(r['rtp'] - float(expected)) <= margin
+        ok = ok and passed
+        print(f"{'OK ' if passed else 'ERR'} {game:<12} {bet:<10} {r['rtp']:.4f} ожидается {float(expected):.4f} ±{margin:.4f}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка RTP игр методом Монте-Карло")
+    parser.add_argument("--rounds", type=int, default=1_000_000, help="ставок на каждый тип")
+    parser.add_argument("--game", help="только одна игра, например cube")
+    parser.add_argument("--seed", type=int, help="зерно генератора для воспроизводимости")
+    parser.add_argument("--check", action="store_true", help="сверить RTP с посчитанными вручную")
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(0 if check(args.rounds, args.seed) else 1)
+    started = time.monotonic()
+    results = simulate_all(args.rounds, args.seed, args.game)
+    print(f"Правила v{current().version}, {args.rounds} ставок на тип, "
+          f"{'NumPy' if np is not None else 'random (NumPy не установлен, расчёт медленнее)'}")
+    print(f"{'игра':<20} {'ставка':<15} {'RTP':>8} {'95% интервал':>19} {'дисперсия':>10} {'выплат':>7}")
+    for r in results:
+        print(f"{r['game']:<20} {r['bet']:<15} {r['rtp']:>8.4f} "
+              f"{r['ci_low']:>9.4f}-{r['ci_high']:<9.4f} {r['variance']:>10.4f} {r['hit_rate']:>7.2%}")
+    print(f"Готово за {time.monotonic() - started:.1f}с")
+
+
+if __name__ == "__main__":
+    main()
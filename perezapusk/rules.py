@@ -0,0 +1,309 @@
+"""Правила игр из game_rules.json: ставки, синонимы, таблицы выплат, меню и лимиты.
+
+Файл компилируется в неизменяемый RuleSet. Перезагрузка подменяет текущий
+набор одним присваиванием, а ставки, принятые по прошлой версии, доигрываются
+по ней: версия записывается в ставку, а текст каждой версии хранится в БД.
+"""
+import asyncio
+import json
+import logging
+import os
+from decimal import Decimal
+from fractions import Fraction
+from typing import Dict, List, Optional, Tuple
+
+from bet_aliases import AliasIndex, BetSpec, normalize
+from payouts import (
+    NO_PAYOUT, Condition, Outcome, compile_condition, compile_payouts, custom_distribution, outcome_space
+)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'game_rules.json')
+# Мульти-ставка — несколько исходов одной игры на один бросок, например "чет+больше"
+MULTI_SEPARATOR = '+'
+MAX_LEGS = 4
+# Значения, которые выдаёт bot.send_dice для каждого эмодзи. Серии автоставок
+# и расчёты RTP разыгрывают 1..faces, поэтому у игры с таким эмодзи faces
+# обязан совпадать с диапазоном Telegram
+DICE_FACES = {'🎲': 6, '🎯': 6, '🎳': 6, '🏀': 5, '⚽': 5, '🎰': 64}
+
+
+class GameDef:
+    __slots__ = ("key", "name", "title", "button", "emoji", "faces", "columns", "layout",
+                 "fixed_bet", "multi", "min_bet", "max_bet", "bets")
+
+    def __init__(self, key: str, config: dict, limits: dict):
+        self.key = key
+        self.name = config['name']
+        self.title = config.get('title', self.name)
+        self.emoji = config.get('emoji', '🎲')
+        self.button = config.get('button', self.emoji)
+        self.faces = int(config.get('faces', 6))
+        self.columns = int(config.get('columns', 2))
+        self.layout = config.get('layout')
+        self.fixed_bet = config.get('fixed_bet')
+        self.multi = bool(config.get('multi', True))
+        limits = {**limits, **config.get('limits', {})}
+        self.min_bet = Decimal(str(limits.get('min_bet', '0.30')))
+        self.max_bet = Decimal(str(limits.get('max_bet', '1000')))
+        self.bets: Dict[str, BetSpec] = {}
+
+
+class RuleSet:
+    def __init__(self, config: dict, source: str = ''):
+        self.version = int(config['version'])
+        self.source = source
+        self.games: Dict[str, GameDef] = {}
+        # игра -> ставка -> [(множитель, условие)], срабатывает первое подходящее
+        self.tables: Dict[str, Dict[str, List[Tuple[Decimal, Condition]]]] = {}
+        # (игра, ставка, исход) -> множитель; хранятся только выигрышные исходы
+        self.payouts: Dict[Tuple[str, str, Outcome], Decimal] = {}
+        # ключ авторской игры -> (эмодзи, коэффициент, шанс выигрыша)
+        self.custom_games: Dict[str, Tuple[str, int, float]] = {}
+        self._spaces: Dict[Tuple[str, str], Tuple[Outcome, ...]] = {}
+        self._resolved: Dict[Tuple[str, Optional[str]], Optional[str]] = {}
+        self._multi: Dict[Tuple[str, str], Optional[BetSpec]] = {}
+        self._max: Dict[Tuple[str, Optional[str]], Decimal] = {}
+        # (игра, ставка) -> наибольший множитель, для оценки худшего исхода
+        self.max_multipliers: Dict[Tuple[str, str], Decimal] = {}
+        specs = []
+        game_names = {}
+        comment_games = []
+        for key, game_config in config['games'].items():
+            game = self.games[key] = GameDef(key, game_config, config.get('limits', {}))
+            live_faces = DICE_FACES.get(game.emoji)
+            if live_faces is not None and game.faces != live_faces:
+                raise ValueError(f"{key}: faces {game.faces}, а кубик {game.emoji} в Telegram выдаёт 1–{live_faces}")
+            for name in [key] + game_config.get('aliases', []):
+                game_names[name] = game.name
+            if game_config.get('comment', True):
+                comment_games.append(key)
+            table = self.tables[key] = {}
+            for bet in game_config['bets']:
+                spec = BetSpec(key, bet['id'], bet['name'], int(bet.get('dice', 1)), bet.get('label'),
+                               bet.get('emoji'), bet.get('coef'), bet.get('chance'))
+                if spec.bet in game.bets:
+                    raise ValueError(f"{key}: ставка {spec.bet!r} описана дважды")
+                if spec.coef is not None:
+                    if spec.coef < 2 or not 0 < spec.chance < 1:
+                        raise ValueError(f"{key}/{spec.bet}: нужен coef >= 2 и 0 < chance < 1")
+                    rules = [(Decimal(spec.coef), lambda o, c=spec.coef: o[0] == c)]
+                    space = outcome_space(spec.coef, 1)
+                    self.custom_games[spec.bet] = (spec.emoji, spec.coef, spec.chance)
+                else:
+                    rules = [(Decimal(str(mult)), compile_condition(expression, spec.dice))
+                             for mult, expression in bet['rules']]
+                    space = outcome_space(game.faces, spec.dice)
+                game.bets[spec.bet] = spec
+                table[spec.bet] = rules
+                self._spaces[(key, spec.bet)] = space
+                best = NO_PAYOUT
+                for outcome, mult in compile_payouts(space, rules).items():
+                    self.payouts[(key, spec.bet, outcome)] = mult
+                    best = max(best, mult)
+                self.max_multipliers[(key, spec.bet)] = best
+                specs.append((spec, tuple(bet.get('aliases', ()))))
+            if game.fixed_bet is not None and game.fixed_bet not in game.bets:
+                raise ValueError(f"{key}: fixed_bet {game.fixed_bet!r} не описана")
+            for row in game.layout or ():
+                for bet_id in row:
+                    if bet_id not in game.bets:
+                        raise ValueError(f"{key}: в layout неизвестная ставка {bet_id!r}")
+        self.menu = [list(row) for row in config.get('menu') or [list(self.games)[i:i + 4] for i in range(0, len(self.games), 4)]]
+        for row in self.menu:
+            for key in row:
+                if key not in self.games:
+                    raise ValueError(f"в menu неизвестная игра {key!r}")
+        # Лимиты для ставок, чья игра не описана (например, устаревших)
+        self._default_game = GameDef('', {'name': ''}, config.get('limits', {}))
+        self.aliases = AliasIndex(specs, game_names, comment_games)
+
+    def lookup(self, game: str, bet_type: Optional[str]) -> Optional[BetSpec]:
+        """Ставка по id или синониму; для мульти-ставки — общая запись с id "чет+больше"."""
+        spec = self.aliases.lookup(game, bet_type)
+        if spec is None and bet_type and MULTI_SEPARATOR in bet_type:
+            key = (game, normalize(bet_type))
+            if key not in self._multi:
+                self._multi[key] = self._combine(game, key[1].split(MULTI_SEPARATOR))
+            spec = self._multi[key]
+        return spec
+
+    def _combine(self, game: str, parts: List[str]) -> Optional[BetSpec]:
+        definition = self.games.get(game)
+        if definition is None or not definition.multi:
+            return None
+        legs: List[BetSpec] = []
+        for part in parts:
+            spec = self.aliases.lookup(game, part)
+            if spec is None:
+                return None
+            if spec not in legs:
+                legs.append(spec)
+        # Все исходы разыгрываются одним броском, поэтому число кубиков у них общее
+        if len(legs) > MAX_LEGS or len({spec.dice for spec in legs}) != 1:
+            return None
+        if len(legs) == 1:
+            return legs[0]
+        return BetSpec(game, MULTI_SEPARATOR.join(spec.bet for spec in legs),
+                       " + ".join(spec.name for spec in legs), legs[0].dice,
+                       " + ".join(spec.label for spec in legs))
+
+    def legs(self, game: str, bet_type: Optional[str]) -> Optional[Tuple[BetSpec, ...]]:
+        """Исходы ставки: один для обычной ставки, несколько для мульти-ставки."""
+        spec = self.lookup(game, bet_type)
+        if spec is None:
+            return None
+        return tuple(self.games[game].bets[bet] for bet in spec.bet.split(MULTI_SEPARATOR))
+
+    def parse_comment(self, comment: str) -> Optional[BetSpec]:
+        """Игра и ставка по комментарию к переводу, в том числе "чет+больше"."""
+        spec = self.aliases.parse_comment(comment)
+        if spec is None and MULTI_SEPARATOR in comment:
+            first = self.aliases.parse_comment(comment.split(MULTI_SEPARATOR, 1)[0])
+            if first is not None:
+                spec = self.lookup(first.game, comment)
+        return spec
+
+    def display_names(self, game: Optional[str], bet_type: Optional[str]) -> Tuple[str, Optional[str]]:
+        if not game:
+            return "—", bet_type
+        spec = self.lookup(game, bet_type)
+        return self.aliases.game_names.get(game, str(game).lower()), spec.name if spec else bet_type
+
+    def resolve_bet(self, game: str, bet_type: Optional[str]) -> Optional[str]:
+        """Каноническое имя ставки из таблиц или None для неизвестной ставки."""
+        key = (game, bet_type)
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+        definition = self.games.get(game)
+        if definition is not None and definition.fixed_bet:
+            # В слотах исход не зависит от ставки
+            resolved = definition.fixed_bet
+        else:
+            spec = self.lookup(game, bet_type)
+            resolved = spec.bet if spec else None
+        self._resolved[key] = resolved
+        return resolved
+
+    def multiplier(self, game: str, bet_type: Optional[str], outcome: Outcome) -> Decimal:
+        return self.payouts.get((game, self.resolve_bet(game, bet_type), outcome), NO_PAYOUT)
+
+    def max_multiplier(self, game: str, bet_type: Optional[str]) -> Decimal:
+        """Наибольшая выплата на единицу суммы ставки; у мульти-ставки сумма делится
+        поровну, а худший случай — все исходы сыграли с наибольшим множителем."""
+        key = (game, bet_type)
+        try:
+            return self._max[key]
+        except KeyError:
+            pass
+        definition = self.games.get(game)
+        if definition is not None and definition.fixed_bet:
+            legs = (definition.bets[definition.fixed_bet],)
+        else:
+            legs = self.legs(game, bet_type) or ()
+        best = NO_PAYOUT
+        if legs:
+            best = sum((self.max_multipliers[(game, spec.bet)] for spec in legs), NO_PAYOUT) / len(legs)
+        self._max[key] = best
+        return best
+
+    def outcome_space(self, game: str, bet: str) -> Tuple[Outcome, ...]:
+        return self._spaces[(game, bet)]
+
+    def outcome_distribution(self, game: str, bet: str) -> List[Tuple[Outcome, Fraction]]:
+        """Исходы ставки и их точные вероятности: кубики Telegram и выбор бота
+        равновероятны, в авторских играх — по шансу из конфигурации."""
+        spec = self.games[game].bets[bet]
+        if spec.coef is not None:
+            return custom_distribution(spec.coef, spec.chance)
+        outcomes = self._spaces[(game, bet)]
+        p = Fraction(1, len(outcomes))
+        return [(o, p) for o in outcomes]
+
+    def limits(self, game: Optional[str]) -> Tuple[Decimal, Decimal]:
+        definition = self.games.get(game) or self._default_game
+        return definition.min_bet, definition.max_bet
+
+    def bet_rows(self, game: str) -> List[List[BetSpec]]:
+        """Кнопки выбора ставки: по layout, иначе по columns в ряд."""
+        definition = self.games[game]
+        if definition.layout:
+            return [[definition.bets[bet] for bet in row] for row in definition.layout]
+        specs = list(definition.bets.values())
+        return [specs[i:i + definition.columns] for i in range(0, len(specs), definition.columns)]
+
+
+def load(path: str) -> RuleSet:
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    return RuleSet(json.loads(source), source)
+
+
+# Эти переменные будут установлены при инициализации
+db = None
+PATH = DEFAULT_PATH
+_mtime: Optional[float] = None
+_versions: Dict[int, RuleSet] = {}
+_current: RuleSet = load(DEFAULT_PATH)
+_versions[_current.version] = _current
+
+
+def current() -> RuleSet:
+    return _current
+
+
+async def for_version(version: Optional[int]) -> RuleSet:
+    """Правила, по которым была принята ставка; для старых ставок без версии — текущие."""
+    if version is None:
+        return _current
+    ruleset = _versions.get(version)
+    if ruleset is None and db is not None:
+        source = await db.get_game_rules(version)
+        if source:
+            ruleset = _versions[version] = RuleSet(json.loads(source), source)
+    return ruleset or _current
+
+
+async def init_rules(db_instance, path: Optional[str] = None):
+    """Инициализация правил игр"""
+    global db, PATH
+    db = db_instance
+    PATH = path or DEFAULT_PATH
+    if not await reload(force=True):
+        await db.save_game_rules(_current.version, _current.source)
+    logging.info(f"[RULES] Правила игр v{_current.version} из {PATH}")
+
+
+async def reload(force: bool = False) -> bool:
+    """Перечитывает файл правил; новая версия подменяет текущую целиком или не применяется вовсе."""
+    global _current, _mtime
+    try:
+        _mtime = os.stat(PATH).st_mtime
+        ruleset = load(PATH)
+    except (OSError, ValueError, KeyError, TypeError, SyntaxError) as e:
+        logging.error(f"[RULES] Не удалось загрузить {PATH}: {e}")
+        return False
+    if not force and ruleset.version <= _current.version:
+        if ruleset.source != _current.source:
+            logging.warning(f"[RULES] {PATH} изменён без увеличения version ({ruleset.version}), изменения не применены")
+        return False
+    stored = await db.get_game_rules(ruleset.version)
+    if stored is not None and stored != ruleset.source:
+        logging.warning(f"[RULES] Версия {ruleset.version} уже сохранена с другим содержимым, применяется файл")
+    await db.save_game_rules(ruleset.version, ruleset.source)
+    _versions[ruleset.version] = ruleset
+    _current = ruleset
+    logging.info(f"[RULES] Загружены правила игр v{ruleset.version}")
+    return True
+
+
+async def rules_loop(interval: float = 10):
+    """Применяет изменения файла правил без перезапуска."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if os.stat(PATH).st_mtime != _mtime:
+                await reload()
+        except OSError as e:
+            logging.error(f"[RULES] Файл правил недоступен: {e}")
@@ -0,0 +1,88 @@
+from typing import Callable, Dict
+
+# Язык по умолчанию; шаблоны других языков добавляются в TEMPLATES,
+# отсутствующие в них ключи берутся из языка по умолчанию. Пока есть только
+# русские шаблоны, и все вызовы render используют язык по умолчанию: язык
+# игрока не хранится, а каналы ставок общие
+DEFAULT_LOCALE = "ru"
+
+TEMPLATES: Dict[str, Dict[str, str]] = {
+    "ru": {
+        "bet_accepted": (
+            "<b>Принята новая ставка!</b>\n\n"
+            "<blockquote>"
+            "👤 <i>Игрок:</i> <b>{user_link}</b>\n"
+            "💰 <i>Сумма:</i> <b>{amount:.2f} $</b>\n"
+            "🕹️ <i>Игра:</i> <b>{game}</b>\n"
+            "✨ <i>Исход:</i> <b>{bet}</b>\n\n"
+            "<b>⌛️ Ставка обрабатывается...</b>"
+            "</blockquote>"
+        ),
+        "bet_win": (
+            "🎰 <b>Победа!</b>\n"
+            "<b>{user_link} выиграл {amount:.2f}$ в игре {game}.</b>\n\n"
+            "<blockquote><b>⚡️ Его выигрыш зачислен на баланс в <a href='{bot_link}'>боте</a>.</b></blockquote>"
+        ),
+        "bet_draw": (
+            "🤝 <b>Ничья</b>!\n"
+            "<b>{user_link} выиграл {amount:.2f}$ в игре {game}.</b>\n\n"
+            "<blockquote><b>⚡️ Его выигрыш с комиссией 30 процентов зачислен на баланс в <a href='{bot_link}'>боте</a>.</b></blockquote>"
+        ),
+        "bet_lose": (
+            "🚫 <b>Поражение!</b>\n"
+            "<b>{user_link} проиграл в игре {game}.</b>\n\n"
+            "<blockquote><b>😔 Не расстраивайся, {phrase}.</b></blockquote>"
+        ),
+        "custom_win": (
+            "🎰 <b>Победа!</b>\n<b>{user_link} выиграл {amount:.2f}$ в игре {game}.</b>\n\n"
+            "<blockquote><b>Выпало: {value} из {coef}, нужно было: {win_value}</b></blockquote>"
+        ),
+        "custom_lose": (
+            "🚫 <b>Поражение!</b>\n<b>{user_link} проиграл в игре {game}.</b>\n\n"
+            "<blockquote><b>Выпало: {value} из {coef}, нужно было: {win_value}</b></blockquote>"
+        ),
+        "multi_legs": "\n\n<blockquote>{lines}</blockquote>",
+        "multi_leg_win": "✅ {bet} — {amount:.2f}$ (x{mult:g})",
+        "multi_leg_lose": "❌ {bet}",
+        "result_caption": "{text}\n\n{links}",
+        "digest": "📋 <b>Итоги ставок: {count}</b>\n\n<blockquote>{lines}</blockquote>\n\n{links}",
+        "digest_win": "🎰 {user_link} • {game}, {bet} • {amount:.2f}$ → <b>+{payout:.2f}$</b>{outcome}",
+        "digest_lose": "🚫 {user_link} • {game}, {bet} • {amount:.2f}${outcome}",
+        "digest_outcome": " • выпало {value}",
+        "autobet_summary": (
+            "🤖 <b>Автоставка завершена</b>{reason}\n\n"
+            "<blockquote>"
+            "🎮 <b>Игра:</b> {game}\n"
+            "🎯 <b>Ставка:</b> {bet}\n"
+            "🔢 <b>Раундов:</b> {played} из {rounds}, выигрышных: {wins}\n"
+            "💰 <b>Поставлено:</b> {staked:.2f}$\n"
+            "🏆 <b>Выигрыш:</b> {payout:.2f}$\n"
+            "📊 <b>Итог:</b> {net:+.2f}$"
+            "</blockquote>{refund_text}{ref_text}"
+        ),
+        "autobet_reason_stop": " — сработал стоп-лосс",
+        "autobet_reason_take": " — сработал тейк-профит",
+        "autobet_refund": "\n↩️ <b>Возвращено за несыгранные раунды: {amount:.2f}$</b>",
+        "autobet_channel": "🤖 {user_link} • {game}, {bet} • автоставка {played} × {stake:.2f}$ → <b>{payout:.2f}$</b>",
+        "win_credited": "✅ <b>На ваш баланс зачислен выигрыш</b>\n💰 <b>Сумма: {amount:.2f}$</b>{ref_text}",
+        "ref_cut": "\n<b>15% ({amount:.2f}$) от выигрыша отправлено вашему рефереру: {referrer}.</b>",
+        "ref_credited": "💵 Ваш Реф.Баланс пополнен на <code>{amount:.2f}$</code> из-за выигрыша <code>{name}</code>",
+    },
+}
+
+
+def _compile() -> Dict[str, Dict[str, Callable[..., str]]]:
+    default = TEMPLATES[DEFAULT_LOCALE]
+    return {
+        locale: {key: {**default, **templates}[key].format for key in default}
+        for locale, templates in TEMPLATES.items()
+    }
+
+
+# Для каждого языка и ключа хранится готовый str.format, рендер — один вызов
+_compiled = _compile()
+
+
+def render(key: str, locale: str = DEFAULT_LOCALE, **values) -> str:
+    """Подставляет значения в шаблон key на языке locale."""
+    return _compiled.get(locale, _compiled[DEFAULT_LOCALE])[key](**values)